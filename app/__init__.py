@@ -16,19 +16,61 @@ def create_app(config_class=Config):
     app = Flask(__name__, static_folder='static', template_folder='templates')
     app.config.from_object(config_class)
 
+    # Uploaded files stream to disk, hashed and type-checked as they arrive
+    from app.uploads import UploadRequest
+    app.request_class = UploadRequest
+
     # Initialize extensions
+    from app.database import configure_database, init_database
+    configure_database(app)
     db.init_app(app)
     login_manager.init_app(app)
+    with app.app_context():
+        init_database(app)  # SQLite pragmas (WAL, busy_timeout, ...)
 
     # Ensure upload folder exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # Photo variant filenames for templates: {{ name|photo_variant('thumb') }}
+    from app.images import variant_name
+    app.jinja_env.filters['photo_variant'] = variant_name
+
+    # Opt-in request/SQL/template timing (PROFILING=1)
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    # Generation-keyed fragment cache and ETags for dashboards, bills, reports
+    from app.cache import init_cache
+    init_cache(app)
+
     # Import routes and register blueprint
     from app import routes
     app.register_blueprint(routes.bp)   # ✅ 'bp' is the blueprint in routes.py
 
+    # Versioned JSON API for the staff phones
+    from app import api
+    app.register_blueprint(api.bp)
+
     # Create database tables
     with app.app_context():
         db.create_all()
 
+        # Apply schema changes create_all() cannot (indexes on existing tables, ...)
+        from app.migrations import upgrade
+        upgrade()
+
+    # Daily order rollups, kept current by an after_flush hook
+    from app import rollups  # noqa: F401
+
+    # Order change feed for the admin SSE stream, also written from after_flush
+    from app import events  # noqa: F401
+
+    # Order search index (FTS5 / tsvector)
+    from app.search import init_search
+    init_search(app)
+
+    # CLI commands (flask --app run <command>)
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
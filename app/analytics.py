@@ -0,0 +1,228 @@
+"""
+Rental analytics for the reports page charts.
+
+Everything for a date range comes from one columnar fetch (load_columns):
+a single SELECT of the few order columns the figures need, timestamps
+converted to epoch seconds in SQL, turned into one array per column. The
+analyses then work on whole columns at once:
+
+    weekly        orders, booked value and completed revenue per ISO week
+    durations     rental length statistics and histogram
+    utilisation   booked unit-days per product against its stock
+    aging         outstanding amount_pending by how overdue it is
+
+NumPy does the work (boolean masks, bincount, searchsorted);
+tests/test_analytics.py checks its figures against a per-row pure-Python
+reference. Results are cached per data generation (app.cache), so charts
+reloading an unchanged range cost one cache read.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import extract, func, or_, select
+from app import db
+from app.database import read_bind
+from app.models import Order, Product
+from app.rollups import order_total
+
+import numpy as np
+
+SECTIONS = ('weekly', 'durations', 'utilisation', 'aging')
+
+# statuses whose orders were (or will be) actually rented out
+RENTED_STATUSES = ('pending', 'approved', 'completed')
+
+DURATION_EDGES = (0, 1, 2, 3, 5, 7, 14, 30)          # days; last bucket is open-ended
+AGING_EDGES = (0, 8, 31, 61, 91)                      # days overdue; negative = not yet due
+AGING_LABELS = ('not due', '0-7 days', '8-30 days', '31-60 days', '61-90 days', 'over 90 days')
+
+_DAY = 86400.0
+_EPOCH = date(1970, 1, 1)
+
+
+def _epoch(column, dialect):
+    """Seconds since 1970 for a DateTime column, computed by the database (NULL stays NULL)."""
+    if dialect == 'sqlite':
+        return (func.julianday(column) - 2440587.5) * _DAY
+    return extract('epoch', column)
+
+
+def _timestamp(value):
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+class OrderColumns:
+    """
+    One list (or NumPy array) per order column. Products and statuses are
+    stored as integer codes into `products` / `statuses`; missing
+    timestamps are None (NaN in arrays).
+    """
+    fields = ('created', 'delivery', 'returned', 'product', 'status', 'total', 'pending', 'quantity')
+
+    def __init__(self, rows=(), start=None, end=None):
+        self.start, self.end = start, end
+        self.products, self.statuses = [], []
+        product_index, status_index = {}, {}
+        columns = list(zip(*rows)) if rows else [()] * len(self.fields)
+        for name, values in zip(self.fields, columns):
+            setattr(self, name, list(values))
+        self.product = [product_index.setdefault(p, len(product_index)) for p in self.product]
+        self.status = [status_index.setdefault(s, len(status_index)) for s in self.status]
+        self.products = list(product_index)
+        self.statuses = list(status_index)
+
+    def __len__(self):
+        return len(self.created)
+
+    def status_codes(self, names):
+        return [i for i, s in enumerate(self.statuses) if s in names]
+
+    def arrays(self):
+        """The columns as NumPy arrays (floats with NaN for missing values, int codes)."""
+        return {
+            'created': np.array(self.created, dtype=float),
+            'delivery': np.array(self.delivery, dtype=float),
+            'returned': np.array(self.returned, dtype=float),
+            'product': np.array(self.product, dtype=np.int64),
+            'status': np.array(self.status, dtype=np.int64),
+            'total': np.array(self.total, dtype=float),
+            'pending': np.array(self.pending, dtype=float),
+            'quantity': np.array(self.quantity, dtype=float),
+        }
+
+
+def load_columns(start, end):
+    """
+    Orders created in [start, end), plus earlier ones still out on rent
+    after start (for utilisation), in one SELECT.
+    """
+    bind_arguments = read_bind()
+    dialect = (bind_arguments or {}).get('bind', db.engine).dialect.name
+    stmt = select(
+        _epoch(Order.created_at, dialect), _epoch(Order.delivery_datetime, dialect),
+        _epoch(Order.return_datetime, dialect), Order.product_name, Order.status,
+        func.coalesce(order_total, 0.0), func.coalesce(Order.amount_pending, 0.0),
+        func.coalesce(Order.quantity, 1),
+    ).where(Order.created_at < end, or_(Order.created_at >= start, Order.return_datetime >= start))
+    # Core rather than ORM execution: plain tuples, no per-row ORM processing
+    rows = db.session.connection(bind_arguments=bind_arguments).execute(stmt).all()
+    return OrderColumns(rows, start, end)
+
+
+def _week_start(week):
+    """Monday of week number `week` counted from the week of 1970-01-01 (a Thursday)."""
+    return _EPOCH + timedelta(days=week * 7 - 3)
+
+
+def _round(value):
+    return round(float(value), 2)
+
+
+def _stock():
+    return dict(db.session.execute(select(Product.name, Product.stock), bind_arguments=read_bind()).all())
+
+
+# --- Analysis ---
+
+def _analyse(cols, now, stock):
+    a = cols.arrays()
+    start_ts, end_ts = _timestamp(cols.start), _timestamp(cols.end)
+    in_range = a['created'] >= start_ts
+    rented = in_range & np.isin(a['status'], cols.status_codes(RENTED_STATUSES))
+    completed = in_range & np.isin(a['status'], cols.status_codes(('completed',)))
+
+    # weekly series
+    week = np.floor((np.floor(a['created'] / _DAY) + 3) / 7).astype(np.int64)
+    first = int(week[in_range].min()) if in_range.any() else 0
+    n = int(week[in_range].max()) - first + 1 if in_range.any() else 0
+    w = week[in_range] - first
+    counts = np.bincount(w, minlength=n)
+    booked = np.bincount(w, weights=a['total'][in_range] * rented[in_range], minlength=n)
+    revenue = np.bincount(w, weights=a['total'][in_range] * completed[in_range], minlength=n)
+    weekly = [{'week': _week_start(first + i).isoformat(), 'orders': int(counts[i]),
+               'booked': _round(booked[i]), 'revenue': _round(revenue[i])} for i in range(n)]
+
+    # rental durations
+    length = (a['returned'] - a['delivery']) / _DAY
+    timed = rented & (length > 0)   # NaN compares False
+    days = length[timed]
+    edges = np.array(DURATION_EDGES + (np.inf,), dtype=float)
+    hist = np.histogram(days, bins=edges)[0] if days.size else np.zeros(len(DURATION_EDGES), dtype=int)
+    durations = {
+        'rentals': int(days.size),
+        'mean_days': _round(days.mean()) if days.size else None,
+        'median_days': _round(np.median(days)) if days.size else None,
+        'p90_days': _round(np.percentile(days, 90, method='lower')) if days.size else None,
+        'histogram': [{'bucket': _bucket_label(i), 'rentals': int(c)} for i, c in enumerate(hist)],
+    }
+
+    # utilisation: unit-days each product is out within [start, end)
+    out = np.isin(a['status'], cols.status_codes(RENTED_STATUSES)) & (length > 0)
+    overlap = np.clip(np.minimum(a['returned'], end_ts) - np.maximum(a['delivery'], start_ts), 0, None) / _DAY
+    overlap = np.where(out, overlap, 0.0)
+    m = len(cols.products)
+    unit_days = np.bincount(a['product'], weights=overlap * a['quantity'], minlength=m)
+    rentals = np.bincount(a['product'], weights=(overlap > 0), minlength=m)
+    product_revenue = np.bincount(a['product'], weights=a['total'] * completed, minlength=m)
+    length_sum = np.bincount(a['product'], weights=np.where(timed, length, 0.0), minlength=m)
+    length_n = np.bincount(a['product'], weights=timed, minlength=m)
+    utilisation = _utilisation_rows(cols, stock, unit_days, rentals, product_revenue, length_sum, length_n)
+
+    # aging of outstanding amounts
+    owing = in_range & (a['pending'] > 0.005) & \
+        ~np.isin(a['status'], cols.status_codes(('rejected', 'canceled')))
+    due = np.where(np.isnan(a['returned']), np.where(np.isnan(a['delivery']), a['created'], a['delivery']),
+                   a['returned'])
+    age = (_timestamp(now) - due[owing]) / _DAY
+    bucket = np.searchsorted(np.array(AGING_EDGES, dtype=float), age, side='right')
+    aging_counts = np.bincount(bucket, minlength=len(AGING_LABELS))
+    aging_amounts = np.bincount(bucket, weights=a['pending'][owing], minlength=len(AGING_LABELS))
+    aging = _aging_rows(aging_counts, aging_amounts)
+
+    return {'weekly': weekly, 'durations': durations, 'utilisation': utilisation, 'aging': aging}
+
+
+# --- Formatting ---
+
+def _bucket_label(i):
+    low = DURATION_EDGES[i]
+    if i + 1 == len(DURATION_EDGES):
+        return f'{low}+ days'
+    return f'{low}-{DURATION_EDGES[i + 1]} days'
+
+
+def _utilisation_rows(cols, stock, unit_days, rentals, revenue, length_sum, length_n):
+    range_days = (cols.end - cols.start).total_seconds() / _DAY
+    rows = []
+    for i, name in enumerate(cols.products):
+        if not unit_days[i] and not revenue[i]:
+            continue
+        units = stock.get(name)
+        rows.append({
+            'product': name,
+            'rentals': int(rentals[i]),
+            'unit_days': _round(unit_days[i]),
+            'stock': units,
+            'utilisation': _round(unit_days[i] / (units * range_days)) if units and range_days else None,
+            'revenue': _round(revenue[i]),
+            'mean_days': _round(length_sum[i] / length_n[i]) if length_n[i] else None,
+        })
+    rows.sort(key=lambda r: (-r['unit_days'], r['product']))
+    return rows
+
+
+def _aging_rows(counts, amounts):
+    return [{'bucket': label, 'orders': int(counts[i]), 'amount': _round(amounts[i])}
+            for i, label in enumerate(AGING_LABELS)]
+
+
+def analyse(cols, now=None):
+    """Every section for already-loaded columns."""
+    now = now or datetime.utcnow()
+    result = _analyse(cols, now, _stock())
+    result['range'] = {'start': cols.start.date().isoformat(), 'end': cols.end.date().isoformat(),
+                       'orders': sum(w['orders'] for w in result['weekly'])}
+    return result
+
+
+def rental_analytics(start, end, now=None):
+    """All sections for orders created in [start, end)."""
+    return analyse(load_columns(start, end), now)
@@ -0,0 +1,287 @@
+"""
+Versioned JSON API (/api/v1) for orders, customers and staff stats.
+
+Meant for the staff phones: responses carry only the requested columns
+(?fields=id,status,total), lists are keyset-paginated newest first
+(?after= / ?before= cursors, ?per_page=), and every response has a weak
+ETag so an unchanged order, page or summary costs a 304 with no body.
+Order ETags are derived from Order.updated_at (created_at until the first
+edit) plus any joined customer/staff values requested. Bodies over
+API_COMPRESS_MIN_BYTES are brotli- or gzip-encoded per Accept-Encoding.
+
+Rows are read with column-restricted SELECTs and serialized straight from
+the result rows; no ORM objects are loaded. Staff only see their own
+orders and the customers of those orders; admins see everything. Errors
+are JSON {'error': ...} with the matching status code.
+"""
+import gzip
+import hashlib
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import func, select
+from app import db
+from app.models import User, Customer, Order
+from app.pagination import keyset_paginate, page_size_arg
+from app.rollups import order_total
+from app.search import filter_orders
+from app.stats import ORDER_STATUSES, order_summary, staff_performance
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+API_VERSION = 'v1'
+
+bp = Blueprint('api', __name__, url_prefix=f'/api/{API_VERSION}')
+
+_staff_name = func.coalesce(func.nullif(User.full_name, ''), User.username)
+
+# field name -> (column expression, join it needs)
+ORDER_FIELDS = {
+    'id': (Order.id, None),
+    'created_at': (Order.created_at, None),
+    'updated_at': (Order.updated_at, None),
+    'status': (Order.status, None),
+    'product_name': (Order.product_name, None),
+    'product_details': (Order.product_details, None),
+    'price': (Order.price, None),
+    'quantity': (Order.quantity, None),
+    'total': (order_total, None),
+    'amount_advance': (Order.amount_advance, None),
+    'amount_pending': (Order.amount_pending, None),
+    'delivery_datetime': (Order.delivery_datetime, None),
+    'return_datetime': (Order.return_datetime, None),
+    'staff_id': (Order.staff_id, None),
+    'customer_id': (Order.customer_id, None),
+    'customer_name': (Customer.name, 'customer'),
+    'customer_phone': (Customer.phone, 'customer'),
+    'staff_name': (_staff_name, 'staff'),
+}
+ORDER_DEFAULT_FIELDS = ('id', 'created_at', 'status', 'product_name', 'total', 'amount_pending',
+                        'customer_name', 'delivery_datetime', 'return_datetime')
+
+_customer_orders = select(func.count(Order.id)).where(Order.customer_id == Customer.id).correlate(Customer)
+
+CUSTOMER_FIELDS = {
+    'id': Customer.id,
+    'name': Customer.name,
+    'phone': Customer.phone,
+    'address': Customer.address,
+    'created_at': Customer.created_at,
+    'orders': _customer_orders.scalar_subquery(),  # staff see only their own (_customer_query)
+}
+CUSTOMER_DEFAULT_FIELDS = ('id', 'name', 'phone', 'address')
+
+
+class FieldError(ValueError):
+    pass
+
+
+def api_login_required(view):
+    """login_required that answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def requested_fields(available, default):
+    """The ?fields= list (validated against `available`), or `default`."""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in available]
+    if unknown or not fields:
+        raise FieldError(f"unknown fields: {', '.join(unknown) or '(none)'}; available: {', '.join(available)}")
+    return fields
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _serialize(row, fields):
+    return {f: _value(row._mapping[f]) for f in fields}
+
+
+def _etag(*parts):
+    raw = ':'.join(str(p) for p in (API_VERSION,) + parts)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _conditional(payload, etag):
+    """JSON response with a weak ETag; 304 without a body when If-None-Match matches."""
+    response = jsonify(payload)
+    response.set_etag(etag, weak=True)  # weak: the same ETag covers gzip/br encodings
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+# --- Orders ---
+
+def _order_query(fields):
+    """Column-restricted query for the given order fields (plus id and the change stamps)."""
+    names = list(dict.fromkeys(['id', 'created_at', 'updated_at'] + fields))
+    query = db.session.query(*(ORDER_FIELDS[n][0].label(n) for n in names)).select_from(Order)
+    joins = {ORDER_FIELDS[n][1] for n in names}
+    if 'customer' in joins:
+        query = query.outerjoin(Customer, Customer.id == Order.customer_id)
+    if 'staff' in joins:
+        query = query.outerjoin(User, User.id == Order.staff_id)
+    if not current_user.is_admin:
+        query = query.filter(Order.staff_id == current_user.id)
+    return query
+
+
+def _order_stamp(row):
+    return (row.updated_at or row.created_at).isoformat() if (row.updated_at or row.created_at) else ''
+
+
+def _joined_values(row, fields):
+    return [row._mapping[f] for f in fields if ORDER_FIELDS[f][1] is not None]
+
+
+@bp.route('/orders')
+@api_login_required
+def list_orders():
+    """Orders newest first. ?fields=, ?status=, ?q=, ?per_page=, ?after= / ?before=."""
+    try:
+        fields = requested_fields(ORDER_FIELDS, ORDER_DEFAULT_FIELDS)
+    except FieldError as exc:
+        return jsonify({'error': str(exc)}), 400
+    query = _order_query(fields)
+    status = request.args.get('status')
+    if status:
+        if status not in ORDER_STATUSES:
+            return jsonify({'error': f"status must be one of {', '.join(ORDER_STATUSES)}"}), 400
+        query = query.filter(Order.status == status)
+    query = filter_orders(query, request.args.get('q'))
+    page = keyset_paginate(query, Order.created_at, Order.id, per_page=page_size_arg(request.args),
+                           after=request.args.get('after'), before=request.args.get('before'))
+    payload = {'data': [_serialize(row, fields) for row in page],
+               'next': page.next_cursor, 'prev': page.prev_cursor}
+    etag = _etag('orders', request.full_path, current_user.get_id(), page.next_cursor, page.prev_cursor,
+                 *((row.id, _order_stamp(row), *_joined_values(row, fields)) for row in page))
+    return _conditional(payload, etag)
+
+
+@bp.route('/orders/<int:order_id>')
+@api_login_required
+def get_order(order_id):
+    try:
+        fields = requested_fields(ORDER_FIELDS, ORDER_DEFAULT_FIELDS)
+    except FieldError as exc:
+        return jsonify({'error': str(exc)}), 400
+    row = _order_query(fields).filter(Order.id == order_id).first()
+    if row is None:
+        return jsonify({'error': 'order not found'}), 404
+    etag = _etag('order', order_id, _order_stamp(row), ','.join(fields), *_joined_values(row, fields))
+    return _conditional(_serialize(row, fields), etag)
+
+
+# --- Customers ---
+
+def _customer_query(fields):
+    names = list(dict.fromkeys(['id', 'created_at'] + fields))
+    columns = dict(CUSTOMER_FIELDS)
+    if not current_user.is_admin:
+        columns['orders'] = _customer_orders.where(Order.staff_id == current_user.id).scalar_subquery()
+    query = db.session.query(*(columns[n].label(n) for n in names)).select_from(Customer)
+    if not current_user.is_admin:
+        query = query.filter(Customer.id.in_(select(Order.customer_id).where(Order.staff_id == current_user.id)))
+    return query
+
+
+def _customer_etag(rows, fields, *parts):
+    # customers have no updated_at; their requested values are small enough to hash
+    return _etag('customers', current_user.get_id(), ','.join(fields), *parts,
+                 *(tuple(row._mapping[f] for f in fields) for row in rows))
+
+
+@bp.route('/customers')
+@api_login_required
+def list_customers():
+    """Customers newest first. ?fields=, ?per_page=, ?after= / ?before=."""
+    try:
+        fields = requested_fields(CUSTOMER_FIELDS, CUSTOMER_DEFAULT_FIELDS)
+    except FieldError as exc:
+        return jsonify({'error': str(exc)}), 400
+    page = keyset_paginate(_customer_query(fields), Customer.created_at, Customer.id,
+                           per_page=page_size_arg(request.args),
+                           after=request.args.get('after'), before=request.args.get('before'))
+    payload = {'data': [_serialize(row, fields) for row in page],
+               'next': page.next_cursor, 'prev': page.prev_cursor}
+    return _conditional(payload, _customer_etag(page, fields, request.full_path))
+
+
+@bp.route('/customers/<int:customer_id>')
+@api_login_required
+def get_customer(customer_id):
+    try:
+        fields = requested_fields(CUSTOMER_FIELDS, CUSTOMER_DEFAULT_FIELDS)
+    except FieldError as exc:
+        return jsonify({'error': str(exc)}), 400
+    row = _customer_query(fields).filter(Customer.id == customer_id).first()
+    if row is None:
+        return jsonify({'error': 'customer not found'}), 404
+    return _conditional(_serialize(row, fields), _customer_etag([row], fields, customer_id))
+
+
+# --- Stats ---
+
+@bp.route('/stats')
+@api_login_required
+def my_stats():
+    """Order summary for the current user; admins get the shop total plus every staff member."""
+    if not current_user.is_admin:
+        summary = order_summary(staff_id=current_user.id)
+        return _conditional(summary, _etag('stats', current_user.id, *sorted(summary.items())))
+    summary = order_summary()
+    staff = [{'id': p['staff'].id, 'username': p['staff'].username, 'orders': p['orders'],
+              'approved': p['approved'], 'revenue': p['revenue']} for p in staff_performance()]
+    payload = {'summary': summary, 'staff': staff}
+    return _conditional(payload, _etag('stats', 'all', *sorted(summary.items()),
+                                       *(tuple(s.values()) for s in staff)))
+
+
+@bp.route('/staff/<int:staff_id>/stats')
+@api_login_required
+def staff_stats(staff_id):
+    if not current_user.is_admin and staff_id != current_user.id:
+        return jsonify({'error': 'forbidden'}), 403
+    if db.session.get(User, staff_id) is None:
+        return jsonify({'error': 'staff not found'}), 404
+    summary = order_summary(staff_id=staff_id)
+    return _conditional(summary, _etag('stats', staff_id, *sorted(summary.items())))
+
+
+# --- Compression ---
+
+@bp.after_request
+def compress(response):
+    """brotli or gzip for JSON bodies above API_COMPRESS_MIN_BYTES, per Accept-Encoding."""
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    body = response.get_data()
+    if len(body) < current_app.config.get('API_COMPRESS_MIN_BYTES', 512):
+        return response
+    accepted = request.accept_encodings
+    if BROTLI_AVAILABLE and accepted['br']:
+        body, encoding = brotli.compress(body, quality=5), 'br'
+    elif accepted['gzip']:
+        body, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+    else:
+        return response
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,112 @@
+"""
+Stock availability for rentable products.
+
+An order holds `quantity` units of its product from delivery_datetime up to
+(not including) return_datetime while its status is pending or approved.
+Overlapping rentals are fetched with one range query on the partial index
+ix_orders_active_window (product, return, delivery), which only contains
+reserving orders, so past rentals are never scanned. The peak number of
+units out at once is then found with a sweep over the window. Products
+without a Product row (or orders without both datetimes) are not tracked.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from app import db
+from app.models import Order, Product, RESERVING_SQL
+
+
+def overlap_stmt(names, start, end, exclude_order_id=None):
+    """(product_name, delivery, return, quantity) of reserving orders overlapping [start, end)."""
+    stmt = select(Order.product_name, Order.delivery_datetime, Order.return_datetime, Order.quantity) \
+        .where(Order.product_name.in_(names),
+               text(RESERVING_SQL),  # literal, so the partial index's WHERE is implied
+               Order.return_datetime > start,
+               Order.delivery_datetime < end)
+    if exclude_order_id is not None:
+        stmt = stmt.where(Order.id != exclude_order_id)
+    return stmt
+
+
+def _overlapping(names, start, end, exclude_order_id=None):
+    return db.session.execute(overlap_stmt(names, start, end, exclude_order_id)).all()
+
+
+def _peaks(intervals, bounds):
+    """
+    Peak concurrent units in each bucket [bounds[i], bounds[i+1]) for
+    (start, end, quantity) intervals. Ends sort before starts at the same
+    instant, so back-to-back rentals do not count as overlapping.
+    """
+    lo, hi = bounds[0], bounds[-1]
+    events = []
+    for start, end, qty in intervals:
+        start, end = max(start, lo), min(end, hi)
+        if start < end:
+            events.append((start, 1, qty or 1))
+            events.append((end, 0, -(qty or 1)))
+    events.sort()
+
+    buckets = len(bounds) - 1
+    peaks = [0] * buckets
+    level = 0
+    i = 0
+    for t, _, delta in events:
+        while i < buckets and t >= bounds[i + 1]:
+            i += 1
+            if i < buckets and t > bounds[i]:
+                peaks[i] = max(peaks[i], level)  # level carried into this bucket
+        level += delta
+        if i < buckets:
+            peaks[i] = max(peaks[i], level)
+    return peaks
+
+
+def free_units(product_name, start, end, exclude_order_id=None):
+    """
+    Units of a product free for the whole of [start, end), or None when the
+    product is not tracked. exclude_order_id leaves an order being edited
+    out of the count.
+    """
+    product = Product.query.filter_by(name=product_name, is_active=True).first()
+    if product is None:
+        return None
+    rows = _overlapping([product_name], start, end, exclude_order_id)
+    peak = _peaks([(d, r, q) for _, d, r, q in rows], [start, end])[0]
+    return max(product.stock - peak, 0)
+
+
+def overbooking_error(product_name, start, end, quantity, exclude_order_id=None):
+    """A message when booking `quantity` units for [start, end) would exceed stock, else None."""
+    if not product_name or start is None or end is None:
+        return None
+    if end <= start:
+        return 'Return datetime must be after delivery datetime'
+    free = free_units(product_name, start, end, exclude_order_id)
+    if free is None or (quantity or 1) <= free:
+        return None
+    return (f"Only {free} unit(s) of {product_name} free between "
+            f"{start.strftime('%Y-%m-%d %H:%M')} and {end.strftime('%Y-%m-%d %H:%M')}")
+
+
+def availability_calendar(start_day=None, days=7, limit=50):
+    """
+    Free units per product per day for `days` days from start_day (today by
+    default), from one query over all tracked products. Returns
+    (dates, [{'product': Product, 'free': [units per day]}]).
+    """
+    if start_day is None:
+        start_day = datetime.utcnow().date()
+    start = datetime.combine(start_day, datetime.min.time())
+    bounds = [start + timedelta(days=i) for i in range(days + 1)]
+    products = Product.query.filter_by(is_active=True).order_by(Product.name).limit(limit).all()
+
+    intervals = {p.name: [] for p in products}
+    if products:
+        for name, d, r, q in _overlapping(list(intervals), bounds[0], bounds[-1]):
+            intervals[name].append((d, r, q))
+
+    rows = []
+    for p in products:
+        peaks = _peaks(intervals[p.name], bounds)
+        rows.append({'product': p, 'free': [max(p.stock - used, 0) for used in peaks]})
+    return [b.date() for b in bounds[:-1]], rows
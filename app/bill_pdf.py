@@ -0,0 +1,242 @@
+"""
+Native bill PDFs drawn with reportlab, without xhtml2pdf.
+
+pisa.CreatePDF parses admin/bill.html and its stylesheet for every bill,
+although the bill's layout never changes. This module draws the same bill
+(same text in the same order, Helvetica on A4, sizes taken from the
+template's CSS) straight onto a reportlab canvas. Everything that does not
+depend on the order, such as page geometry, column and table positions,
+and the widths of labels and static lines, is compiled once per font pair
+into a BillLayout. Per bill, only the order's values are measured and
+placed. String widths go through a per-process cache, and TTF fonts
+(BILL_PDF_FONT / BILL_PDF_FONT_BOLD) are registered once, so both stay
+warm across requests.
+
+render_bill(fields) takes app.bills.bill_fields(order) and returns PDF
+bytes. It needs no app context and takes a few milliseconds, so callers
+run it in the request thread rather than in the render pool.
+"""
+import io
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen.canvas import Canvas
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+# Bumped whenever the drawing changes, so cached native PDFs are re-rendered.
+LAYOUT_VERSION = 1
+
+PX = 0.75  # CSS px -> pt, as the bill.html stylesheet is written in px
+
+_CUSTOMER_LABELS = ('Name:', 'Phone:', 'Address:')
+_ORDER_LABELS = ('Product:', 'Delivery:', 'Return:', 'Status:')
+_TABLE_HEADER = ('Product', 'Rent Price', 'Quantity', 'Total')
+
+
+@lru_cache(maxsize=None)
+def register_fonts(regular=None, bold=None):
+    """(regular, bold) font names; TTF paths are registered with reportlab once per process."""
+    if not regular:
+        return 'Helvetica', 'Helvetica-Bold'
+    pdfmetrics.registerFont(TTFont('BillFont', regular))
+    pdfmetrics.registerFont(TTFont('BillFont-Bold', bold or regular))
+    return 'BillFont', 'BillFont-Bold'
+
+
+@lru_cache(maxsize=16384)
+def text_width(text, font, size):
+    return pdfmetrics.stringWidth(text, font, size)
+
+
+def wrap(text, font, size, first_width, width):
+    """Split text at spaces into lines no wider than first_width, then width."""
+    space = text_width(' ', font, size)
+    lines, line, used, limit = [], [], 0.0, first_width
+    for word in text.split():
+        w = text_width(word, font, size)
+        if line and used + space + w > limit:
+            lines.append(' '.join(line))
+            line, used, limit = [word], w, width
+        else:
+            used += (space if line else 0.0) + w
+            line.append(word)
+    lines.append(' '.join(line))
+    return lines
+
+
+class BillLayout:
+    """Page geometry, fonts and static text widths for one font pair, computed once."""
+
+    def __init__(self, regular, bold):
+        self.regular, self.bold = regular, bold
+        self.page_w, self.page_h = A4
+        self.box_x, self.box_top = 40.0, self.page_h - 40.0
+        self.box_w = self.page_w - 80.0
+        self.x0 = self.box_x + 20 * PX
+        self.x1 = self.box_x + self.box_w - 20 * PX
+        self.width = self.x1 - self.x0
+
+        self.title = ('Rental Bill', bold, 26 * PX)
+        self.title_x = self.x0 + (self.width - text_width('Rental Bill', bold, 26 * PX)) / 2
+        self.company_size = 24 * PX        # <h2> inside .company
+        self.date_size = 18.72 * PX        # <h3>
+        self.heading_size = 18 * PX        # .section h3
+        self.text_size = 14 * PX           # p, th, td
+        self.total_size = 16 * PX          # .total
+        self.footer_size = 13 * PX         # .footer
+        self.leading = self.text_size * 1.4
+
+        gap = 20 * PX
+        self.col_w = (self.width - gap) / 2
+        self.columns = (self.x0, self.x0 + self.col_w + gap)
+        self.label_widths = {label: text_width(label + ' ', bold, self.text_size)
+                             for label in _CUSTOMER_LABELS + _ORDER_LABELS}
+        self.heading_widths = {h: text_width(h, bold, self.heading_size)
+                               for h in ('Customer Details', 'Order Details')}
+
+        self.cell_pad = 8 * PX
+        self.cell_w = self.width / len(_TABLE_HEADER)
+        self.cell_x = [self.x0 + i * self.cell_w for i in range(len(_TABLE_HEADER))]
+        self.cell_text_w = self.cell_w - 2 * self.cell_pad
+
+        self.border = HexColor('#cccccc')
+        self.rule = HexColor('#333333')
+        self.header_fill = HexColor('#eeeeee')
+        self.muted = HexColor('#555555')
+
+
+@lru_cache(maxsize=None)
+def compiled_layout(regular=None, bold=None):
+    return BillLayout(*register_fonts(regular, bold))
+
+
+def _date(value):
+    return datetime.fromisoformat(value).strftime('%d-%m-%Y') if value else None
+
+
+def bill_values(fields):
+    """The strings admin/bill.html prints for bill_fields(order), formatted the same way."""
+    customer = fields['customer'] or ('', '', '')
+    price, quantity = fields['price'], fields['quantity']
+    total = fields['total_amount'] or (price * quantity if price is not None and quantity is not None else None)
+    return {
+        'company': fields['company_name'],
+        'date': _date(fields['created_at']) or '',
+        'customer': [(label, '' if value is None else str(value)) for label, value in zip(_CUSTOMER_LABELS, customer)],
+        'order': [('Product:', str(fields['product_name'])),
+                  ('Delivery:', _date(fields['delivery_datetime']) or 'N/A'),
+                  ('Return:', _date(fields['return_datetime']) or 'N/A'),
+                  ('Status:', str(fields['status']))],
+        'row': (str(fields['product_name']), f'{price} Rs', str(quantity), f'{total} Rs'),
+        'totals': (f"Advance Paid: {fields['amount_advance'] or 0} Rs",
+                   f"Pending: {fields['amount_pending'] or 0} Rs",
+                   f'Grand Total: {total} Rs'),
+    }
+
+
+def _centered(c, layout, text, font, size, y):
+    c.setFont(font, size)
+    c.drawString(layout.x0 + (layout.width - text_width(text, font, size)) / 2, y, text)
+
+
+def _right(c, layout, text, font, size, y):
+    c.setFont(font, size)
+    c.drawString(layout.x1 - text_width(text, font, size), y, text)
+
+
+def _section(c, layout, x, y, heading, pairs):
+    """A .section column: ruled heading, then bold labels with wrapped values. Returns the bottom y."""
+    L = layout
+    y -= L.heading_size
+    c.setFont(L.bold, L.heading_size)
+    c.drawString(x, y, heading)
+    y -= 5 * PX + 2
+    c.setStrokeColor('black')
+    c.setLineWidth(1 * PX)
+    c.line(x, y, x + L.col_w, y)
+    y -= 10 * PX
+    for label, value in pairs:
+        label_w = L.label_widths[label]
+        lines = wrap(value, L.regular, L.text_size, L.col_w - label_w, L.col_w)
+        y -= L.leading
+        c.setFont(L.bold, L.text_size)
+        c.drawString(x, y, label)
+        c.setFont(L.regular, L.text_size)
+        c.drawString(x + label_w, y, lines[0])
+        for line in lines[1:]:
+            y -= L.leading
+            c.drawString(x, y, line)
+        y -= 5 * PX
+    return y
+
+
+def _table_row(c, layout, y, cells, font, fill=None):
+    """One bordered table row; cells wrap within their column. Returns the bottom y."""
+    L = layout
+    wrapped = [wrap(text, font, L.text_size, L.cell_text_w, L.cell_text_w) for text in cells]
+    height = max(len(lines) for lines in wrapped) * L.leading + 2 * L.cell_pad
+    bottom = y - height
+    if fill is not None:
+        c.setFillColor(fill)
+        c.rect(L.x0, bottom, L.width, height, stroke=0, fill=1)
+        c.setFillColor('black')
+    c.setStrokeColor(L.rule)
+    c.setLineWidth(1 * PX)
+    c.setFont(font, L.text_size)
+    for x, lines in zip(L.cell_x, wrapped):
+        c.rect(x, bottom, L.cell_w, height, stroke=1, fill=0)
+        ty = y - L.cell_pad - L.text_size
+        for line in lines:
+            c.drawString(x + L.cell_pad, ty, line)
+            ty -= L.leading
+    return bottom
+
+
+def render_bill(fields, font=None, bold_font=None):
+    """PDF bytes for one bill from bill_fields(order). Identical fields give identical bytes."""
+    L = compiled_layout(font, bold_font)
+    v = bill_values(fields)
+    out = io.BytesIO()
+    c = Canvas(out, pagesize=A4, invariant=True, pageCompression=1)
+    c.setTitle(f"Rental Bill - Order #{fields['id']}")
+
+    y = L.box_top - 20 * PX - L.title[2]
+    c.setFont(L.bold, L.title[2])
+    c.drawString(L.title_x, y, L.title[0])
+    y -= 10 * PX + L.company_size + 4
+    _centered(c, L, v['company'], L.bold, L.company_size, y)
+    y -= 10 * PX + L.date_size + 6
+    _right(c, L, f"Date: {v['date']}", L.bold, L.date_size, y)
+    y -= 20 * PX + 6
+
+    left = _section(c, L, L.columns[0], y, 'Customer Details', v['customer'])
+    right = _section(c, L, L.columns[1], y, 'Order Details', v['order'])
+    y = min(left, right) - 20 * PX
+
+    y = _table_row(c, L, y, _TABLE_HEADER, L.bold, fill=L.header_fill)
+    y = _table_row(c, L, y, v['row'], L.regular)
+
+    for line in v['totals']:
+        y -= 10 * PX + L.total_size
+        _right(c, L, line, L.bold, L.total_size, y)
+
+    c.setFillColor(L.muted)
+    y -= 30 * PX + L.footer_size
+    _centered(c, L, f"Thank you for choosing {v['company']}!", L.regular, L.footer_size, y)
+    y -= L.footer_size * 1.4
+    _centered(c, L, 'Visit again!', L.regular, L.footer_size, y)
+
+    bottom = y - 20 * PX
+    c.setStrokeColor(L.border)
+    c.setLineWidth(1 * PX)
+    c.roundRect(L.box_x, bottom, L.box_w, L.box_top - bottom, 8 * PX, stroke=1, fill=0)
+    c.showPage()
+    c.save()
+    return out.getvalue()
@@ -0,0 +1,284 @@
+"""
+Bill PDF rendering with an on-disk cache and a process pool.
+
+A rendered PDF is stored as <order_id>_<hash>.pdf, where the hash covers
+every field admin/bill.html prints plus the template source itself, so a
+bill is only re-rendered when something on it changes. Bulk downloads
+render cache misses across a process pool and stream the ZIP to the
+client as each entry finishes. Single bills render in the same pool, so the
+request thread only waits and a threaded worker keeps serving others.
+
+Two renderers produce the PDF (BILL_RENDERER, or ?renderer= per request):
+'html' (the default) runs admin/bill.html through xhtml2pdf in the pool.
+'native' draws the bill with reportlab from a precompiled layout
+(app.bill_pdf) in a few milliseconds, in the calling thread. Both return
+None on a render error, and the bill is then left out. The cache key
+covers the renderer, so the two never serve each other's files.
+"""
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, render_template
+from app.bill_pdf import LAYOUT_VERSION, REPORTLAB_AVAILABLE, render_bill
+
+try:
+    import xhtml2pdf  # noqa: F401
+    XHTML2PDF_AVAILABLE = True
+except Exception:
+    XHTML2PDF_AVAILABLE = False
+
+RENDERERS = ('native', 'html')
+
+_executor = None
+_executor_workers = None
+_render_slots = None
+_pool_lock = threading.Lock()
+_template_digest = None
+
+
+def _render_pdf(html):
+    """Render HTML to PDF bytes (runs inside pool workers). Returns None on error."""
+    from xhtml2pdf import pisa
+    out = io.BytesIO()
+    status = pisa.CreatePDF(html, dest=out)
+    if status.err:
+        return None
+    return out.getvalue()
+
+
+def _pool():
+    global _executor, _executor_workers, _render_slots
+    workers = current_app.config.get('BILL_RENDER_WORKERS') or 1
+    with _pool_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+            _render_slots = threading.BoundedSemaphore(2 * workers)
+        return _executor
+
+
+def render_pdf(html):
+    """
+    Render one bill in the process pool and wait for it. At most 2x workers
+    single renders are queued per process; None (as for a render error) when
+    no slot or result arrives within BILL_RENDER_TIMEOUT.
+    """
+    global _executor
+    if not current_app.config.get('BILL_RENDER_OFFLOAD', True):
+        return _render_pdf(html)
+    timeout = current_app.config.get('BILL_RENDER_TIMEOUT', 60)
+    pool = _pool()
+    slots = _render_slots
+    if not slots.acquire(timeout=timeout):
+        return None
+    try:
+        return pool.submit(_render_pdf, html).result(timeout=timeout)
+    except TimeoutError:
+        return None
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _executor is pool:
+                _executor = None  # a worker died; start a fresh pool next time
+        return None
+    finally:
+        slots.release()
+
+
+def _cache_dir():
+    folder = current_app.config['BILL_CACHE_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _template_hash():
+    global _template_digest
+    if _template_digest is None or current_app.debug:
+        source = current_app.jinja_env.loader.get_source(current_app.jinja_env, 'admin/bill.html')[0]
+        _template_digest = hashlib.sha256(source.encode()).hexdigest()
+    return _template_digest
+
+
+def _fmt(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def bill_fields(order):
+    """The values admin/bill.html renders for an order."""
+    customer = order.customer
+    return {
+        'id': order.id,
+        'created_at': _fmt(order.created_at),
+        'product_name': order.product_name,
+        'delivery_datetime': _fmt(order.delivery_datetime),
+        'return_datetime': _fmt(order.return_datetime),
+        'status': order.status,
+        'price': order.price,
+        'quantity': order.quantity,
+        'total_amount': order.total_amount,
+        'amount_advance': order.amount_advance,
+        'amount_pending': order.amount_pending,
+        'customer': [customer.name, customer.phone, customer.address] if customer else None,
+        'company_name': current_app.config['COMPANY_NAME'],
+    }
+
+
+def bill_renderer(name=None):
+    """`name` if it is a known renderer, else the configured BILL_RENDERER."""
+    if name in RENDERERS:
+        return name
+    return current_app.config.get('BILL_RENDERER', 'html')
+
+
+def renderer_available(renderer):
+    return REPORTLAB_AVAILABLE if renderer == 'native' else XHTML2PDF_AVAILABLE
+
+
+def _cache_key(order_id, fields, renderer):
+    version = f"native{LAYOUT_VERSION}" if renderer == 'native' else _template_hash()
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    digest = hashlib.sha256((version + payload).encode()).hexdigest()[:20]
+    return f"{order_id}_{digest}"
+
+
+def bill_cache_key(order, renderer=None):
+    return _cache_key(order.id, bill_fields(order), bill_renderer(renderer))
+
+
+def _render_native(fields):
+    """PDF bytes from the native renderer, or None (as from _render_pdf) on error."""
+    if not REPORTLAB_AVAILABLE:
+        return None
+    config = current_app.config
+    try:
+        return render_bill(fields, config.get('BILL_PDF_FONT'), config.get('BILL_PDF_FONT_BOLD'))
+    except Exception:
+        current_app.logger.exception('Native bill render failed for order %s', fields['id'])
+        return None
+
+
+def _cache_path(key):
+    return os.path.join(_cache_dir(), f"{key}.pdf")
+
+
+def _read_cached(key):
+    try:
+        with open(_cache_path(key), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _store(order_id, key, pdf):
+    """Write atomically and drop stale renders of the same order."""
+    folder = _cache_dir()
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf)
+    path = _cache_path(key)
+    os.replace(tmp, path)
+    for old in glob.glob(os.path.join(folder, f"{order_id}_*.pdf")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def render_bill_html(order, pdf=True):
+    return render_template('admin/bill.html', order=order,
+                           company_name=current_app.config['COMPANY_NAME'], pdf=pdf)
+
+
+def get_bill_pdf(order, renderer=None):
+    """PDF bytes for one order from the cache, rendering on a miss. None on render error."""
+    renderer = bill_renderer(renderer)
+    fields = bill_fields(order)
+    key = _cache_key(order.id, fields, renderer)
+    pdf = _read_cached(key)
+    if pdf is None:
+        pdf = _render_native(fields) if renderer == 'native' else render_pdf(render_bill_html(order))
+        if pdf is not None:
+            _store(order.id, key, pdf)
+    return pdf
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink that lets zipfile write to an unseekable stream we drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_bills_zip(orders, renderer=None):
+    """
+    Yield a ZIP of bill PDFs for `orders` in chunks as entries finish.
+    Cached bills go out immediately. With the html renderer, misses render
+    in the process pool with at most 2x workers in flight so memory stays
+    bounded; native misses render inline.
+    """
+    renderer = bill_renderer(renderer)
+    sink = _ZipStream()
+    zipf = zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED)
+    pool = _pool() if renderer == 'html' else None
+    limit = 2 * _executor_workers if pool is not None else 0
+    in_flight = {}
+
+    def finish(done):
+        for fut in done:
+            order_id, key = in_flight.pop(fut)
+            pdf = fut.result()
+            if pdf is None:
+                continue
+            _store(order_id, key, pdf)
+            zipf.writestr(f"bill_order_{order_id}.pdf", pdf)
+
+    for order in orders:
+        fields = bill_fields(order)
+        key = _cache_key(order.id, fields, renderer)
+        pdf = _read_cached(key)
+        if pdf is None and pool is None:
+            pdf = _render_native(fields)
+            if pdf is None:
+                continue  # left out, as a failed html render is
+            _store(order.id, key, pdf)
+        if pdf is not None:
+            zipf.writestr(f"bill_order_{order.id}.pdf", pdf)
+        else:
+            in_flight[pool.submit(_render_pdf, render_bill_html(order))] = (order.id, key)
+            if len(in_flight) >= limit:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                finish(done)
+        data = sink.drain()
+        if data:
+            yield data
+
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        finish(done)
+        data = sink.drain()
+        if data:
+            yield data
+
+    zipf.close()
+    yield sink.drain()
@@ -0,0 +1,215 @@
+"""
+Bulk order import and batch status changes.
+
+Imports take CSV (with a header row) or JSON (a list of objects) using the
+CustomerOrderForm field names, plus optional `status` and `created_at`
+columns for back-filling old orders. Every row is validated through that
+form; valid rows are written in chunks of IMPORT_CHUNK_SIZE, one
+transaction per chunk: customers are matched by normalized phone
+(app.customers) and upserted with one executemany, so known customers take
+the file's name and address as they would from an order edit
+(assign_customer), then the chunk's orders are inserted with another,
+RETURNING their ids.
+Invalid rows are skipped and reported with their line numbers.
+
+Batch status changes update a whole selection of orders with one UPDATE,
+recomputing amount_pending in SQL on approval as admin_approve does.
+Orders already in the target status are left alone, and events are
+recorded only for the ids the UPDATE returned.
+
+Both write through Core and so bypass the session hooks; they keep the
+daily rollups, the search index, the order event feed and the response
+cache in step themselves.
+Imports do not check stock availability.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+from werkzeug.datastructures import MultiDict
+from app import db
+from app.cache import bump_generation
+from app.events import record_events
+from app.forms import CustomerOrderForm
+from app.models import Customer, Order
+from app.rollups import add_orders, order_total, tracking
+from app.search import reindex_orders
+from app.stats import ORDER_STATUSES
+from app.utils import normalize_phone, parse_datetime_str
+
+IMPORT_FIELDS = ('customer_name', 'phone', 'address', 'product_name', 'product_details', 'price', 'quantity',
+                 'delivery_datetime', 'return_datetime', 'amount_advance', 'status', 'created_at')
+
+# batch action -> resulting status
+BATCH_ACTIONS = {'approve': 'approved', 'complete': 'completed', 'cancel': 'canceled'}
+
+
+def read_rows(data, filename=''):
+    """Rows (dicts) from CSV or JSON bytes/text. Raises ValueError when the file cannot be parsed."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if filename.lower().endswith('.json') or data.lstrip().startswith('['):
+        try:
+            rows = json.loads(data)
+        except ValueError as exc:
+            raise ValueError(f'Invalid JSON: {exc}')
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError('JSON must be a list of objects')
+        return rows
+    reader = csv.DictReader(io.StringIO(data))
+    if not reader.fieldnames or 'phone' not in reader.fieldnames:
+        raise ValueError('CSV needs a header row with at least customer_name, phone, product_name, price')
+    return list(reader)
+
+
+def validate_row(row):
+    """(values, errors) for one row, using CustomerOrderForm's validators."""
+    formdata = MultiDict({k: '' if v is None else str(v) for k, v in row.items() if k in IMPORT_FIELDS})
+    form = CustomerOrderForm(formdata=formdata, meta={'csrf': False})
+    form.validate()
+    errors = {name: list(messages) for name, messages in form.errors.items()}
+
+    values = {name: getattr(form, name).data for name in
+              ('customer_name', 'phone', 'address', 'product_name', 'product_details', 'price', 'quantity')}
+    values['amount_advance'] = form.amount_advance.data or 0.0
+    values['phone_normalized'] = normalize_phone(values['phone'])
+    if values['phone'] and values['phone_normalized'] is None:
+        errors.setdefault('phone', []).append('Must contain digits')
+    for name in ('delivery_datetime', 'return_datetime', 'created_at'):
+        raw = formdata.get(name, '').strip()
+        values[name] = parse_datetime_str(raw)
+        if raw and values[name] is None:
+            errors.setdefault(name, []).append('Not a valid datetime (YYYY-MM-DD HH:MM)')
+    status = formdata.get('status', '').strip().lower() or 'pending'
+    if status not in ORDER_STATUSES:
+        errors.setdefault('status', []).append(f"Must be one of {', '.join(ORDER_STATUSES)}")
+    values['status'] = status
+    return values, errors
+
+
+_CUSTOMER_COLUMNS = ('name', 'phone', 'address')
+
+
+def _upsert_customers(conn, rows):
+    """Insert customer rows, updating name, phone and address where the normalized phone exists."""
+    table = Customer.__table__
+    if conn.dialect.name in ('sqlite', 'postgresql'):
+        if conn.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.phone_normalized],
+                                          set_={name: stmt.excluded[name] for name in _CUSTOMER_COLUMNS})
+        conn.execute(stmt, rows)
+        return
+    for row in rows:
+        result = conn.execute(table.update().where(table.c.phone_normalized == row['phone_normalized'])
+                              .values({name: row[name] for name in _CUSTOMER_COLUMNS}))
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(row))
+
+
+def _customer_ids(rows):
+    """
+    (normalized phone -> customer id, customers created, ids of existing
+    customers whose details changed) for a chunk. The last row for a phone
+    sets that customer's name and address.
+    """
+    latest = {r['phone_normalized']: {'name': r['customer_name'], 'phone': r['phone'],
+                                      'phone_normalized': r['phone_normalized'], 'address': r['address']}
+              for r in rows}
+    existing = {row.phone_normalized: row for row in db.session.execute(
+        select(Customer.phone_normalized, Customer.id, *(Customer.__table__.c[n] for n in _CUSTOMER_COLUMNS))
+        .where(Customer.phone_normalized.in_(latest))).all()}
+    new = [v for key, v in latest.items() if key not in existing]
+    changed = [v for key, v in latest.items()
+               if key in existing and tuple(existing[key][1:]) != tuple(v[n] for n in _CUSTOMER_COLUMNS)]
+    if new or changed:
+        _upsert_customers(db.session.connection(), new + changed)
+    ids = dict(db.session.execute(
+        select(Customer.phone_normalized, Customer.id).where(Customer.phone_normalized.in_(latest))).all())
+    return ids, len(new), [existing[v['phone_normalized']].id for v in changed]
+
+
+def _order_row(values, customer_id, staff_id, now):
+    total = (values['price'] or 0.0) * (values['quantity'] or 1)
+    return {
+        'customer_id': customer_id, 'staff_id': staff_id,
+        'product_name': values['product_name'], 'product_details': values['product_details'],
+        'price': values['price'], 'quantity': values['quantity'],
+        'delivery_datetime': values['delivery_datetime'], 'return_datetime': values['return_datetime'],
+        'amount_advance': values['amount_advance'], 'total_amount': total,
+        'amount_pending': total - values['amount_advance'],
+        'status': values['status'], 'created_at': values['created_at'] or now,
+    }
+
+
+def import_orders(rows, staff_id, chunk_size=None):
+    """
+    Validate and insert order rows attributed to staff_id. Returns
+    {'orders': created, 'customers': created, 'errors': [{'line', 'errors'}]}
+    (customers counts new ones only; known ones are updated in place);
+    line numbers count a CSV header as line 1.
+    """
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+    valid, errors = [], []
+    for line, row in enumerate(rows, start=2):
+        values, row_errors = validate_row(row)
+        if row_errors:
+            errors.append({'line': line, 'errors': row_errors})
+        else:
+            valid.append(values)
+
+    created = customers = 0
+    now = datetime.utcnow()
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        ids, new_customers, changed_customers = _customer_ids(chunk)
+        order_rows = [_order_row(v, ids[v['phone_normalized']], staff_id, now) for v in chunk]
+        new_orders = db.session.execute(
+            insert(Order).returning(Order.id, Order.status, sort_by_parameter_order=True), order_rows).all()
+
+        conn = db.session.connection()
+        add_orders(conn, order_rows)
+        reindex = [i for i, _ in new_orders]
+        if changed_customers:
+            # their earlier orders are indexed under the old name
+            reindex += db.session.execute(select(Order.id).where(Order.customer_id.in_(changed_customers),
+                                                                 Order.id.not_in(reindex))).scalars().all()
+        reindex_orders(reindex, conn)
+        record_events(conn, new_orders, 'created')
+        db.session.commit()
+        created += len(order_rows)
+        customers += new_customers
+
+    if created:
+        bump_generation()
+    return {'orders': created, 'customers': customers, 'errors': errors}
+
+
+def set_status(order_ids, action):
+    """
+    Apply a BATCH_ACTIONS action to the given order ids with one UPDATE.
+    Returns the number of orders changed; ids that do not exist or are
+    already in that status are skipped.
+    """
+    status = BATCH_ACTIONS[action]
+    ids = sorted({int(i) for i in order_ids})
+    if not ids:
+        return 0
+    values = {'status': status}
+    if action == 'approve':
+        values['amount_pending'] = order_total - func.coalesce(Order.amount_advance, 0)
+    condition = Order.id.in_(ids)
+    conn = db.session.connection()
+    with tracking(conn, condition):
+        changed = conn.execute(update(Order).where(condition, Order.status.is_distinct_from(status)).values(values)
+                               .returning(Order.id)).scalars().all()
+    record_events(conn, [(i, status) for i in sorted(changed)], 'status')
+    db.session.commit()
+    if changed:
+        bump_generation()
+    return len(changed)
@@ -0,0 +1,237 @@
+"""
+Response and fragment cache.
+
+Cached values are keyed by a data generation: a token stored in
+RESPONSE_CACHE_DIR/generation that is replaced after every commit touching
+orders, customers, users, photos or products. Reads therefore never see
+stale data, and entries from older generations simply stop being used
+(and are evicted as the cache fills). Writes that bypass the ORM session
+(Core UPDATEs, bulk inserts) must call bump_generation() themselves.
+
+Backends (RESPONSE_CACHE):
+    memory   per-process LRU of RESPONSE_CACHE_SIZE entries (default)
+    disk     pickled entries under RESPONSE_CACHE_DIR, shared by every
+             gunicorn worker on the host
+    none     caching off; ETags are still sent
+
+@conditional pages get an ETag derived from the generation, the user and
+the URL, and answer a matching If-None-Match with 304 without running the
+view. Hit, miss and 304 counts are reported through the profiler.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from flask import current_app, has_app_context, make_response, request, session
+from flask.globals import request_ctx
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import User, Customer, Order, OrderPhoto, Product
+
+_TRACKED = (Order, Customer, User, OrderPhoto, Product)
+
+
+class MemoryBackend:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class DiskBackend:
+    """One pickle per key; the oldest files are pruned once there are more than maxsize."""
+
+    def __init__(self, folder, maxsize):
+        self.folder = os.path.join(folder, 'entries')
+        self.maxsize = maxsize
+        self._writes = 0
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.folder, hashlib.sha1(key.encode()).hexdigest() + '.pkl')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                stored_key, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return value if stored_key == key else None
+
+    def set(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path(key))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def prune(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.folder, '*.pkl')):
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.maxsize, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ResponseCache:
+    def __init__(self, app):
+        config = app.config
+        self.folder = config['RESPONSE_CACHE_DIR']
+        os.makedirs(self.folder, exist_ok=True)
+        kind = config.get('RESPONSE_CACHE', 'memory')
+        size = config.get('RESPONSE_CACHE_SIZE', 512)
+        if kind == 'disk':
+            self.backend = DiskBackend(self.folder, size)
+        elif kind == 'memory':
+            self.backend = MemoryBackend(size)
+        else:
+            self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        # entries and ETags never outlive a deploy or cross databases
+        self.namespace = hashlib.sha1((config['SQLALCHEMY_DATABASE_URI'] + _code_version(app)).encode()) \
+            .hexdigest()[:12]
+        self._generation_path = os.path.join(self.folder, 'generation')
+
+    def generation(self):
+        try:
+            with open(self._generation_path) as f:
+                return f.read().strip() or '0'
+        except FileNotFoundError:
+            return '0'
+
+    def bump(self):
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp, self._generation_path)
+
+    def get_or_set(self, key, fn):
+        if self.backend is None:
+            return fn()
+        full_key = f"{self.namespace}:{self.generation()}:{key}"
+        value = self.backend.get(full_key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = fn()
+        if value is not None:
+            self.backend.set(full_key, value)
+        return value
+
+    def etag(self, *parts):
+        raw = ':'.join(str(p) for p in (self.namespace, self.generation()) + parts)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _code_version(app):
+    """Changes whenever a template or module of the app is modified."""
+    newest = 0.0
+    for pattern in ('*.py', 'templates/**/*.html'):
+        for path in glob.glob(os.path.join(app.root_path, pattern), recursive=True):
+            newest = max(newest, os.path.getmtime(path))
+    return str(newest)
+
+
+def _cache():
+    return current_app.extensions['response_cache']
+
+
+def cached(key, fn):
+    """fn() cached under `key` for the current data generation (fn must return picklable data)."""
+    return _cache().get_or_set(key, fn)
+
+
+def bump_generation():
+    if has_app_context() and 'response_cache' in current_app.extensions:
+        _cache().bump()
+
+
+def conditional(view):
+    """
+    ETag/304 for an HTML view whose output depends only on the data, the
+    user, the URL and the date. Pages with flashed messages are never
+    cached by the browser.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('_flashes'):
+            return view(*args, **kwargs)
+        cache = _cache()
+        etag = cache.etag(current_user.get_id(), request.full_path, datetime.utcnow().date())
+        if etag in request.if_none_match:
+            cache.not_modified += 1
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        response = make_response(view(*args, **kwargs))
+        flashed = session.get('_flashes') or getattr(request_ctx, 'flashes', None)
+        if response.status_code == 200 and response.mimetype == 'text/html' and not flashed:
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True  # revalidate every time
+        return response
+    return wrapper
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _TRACKED):
+            session.info['_cache_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    if session.info.pop('_cache_dirty', False):
+        bump_generation()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changes(session, previous_transaction):
+    session.info.pop('_cache_dirty', None)
+
+
+def init_cache(app):
+    cache = ResponseCache(app)
+    app.extensions['response_cache'] = cache
+    profiler = app.extensions.get('profiler')
+    if profiler is not None:
+        profiler.add_counter('response_cache_hits_total', 'Cached fragments reused.', lambda: cache.hits)
+        profiler.add_counter('response_cache_misses_total', 'Cached fragments computed.', lambda: cache.misses)
+        profiler.add_counter('http_not_modified_total', 'Conditional requests answered with 304.',
+                             lambda: cache.not_modified)
+    return cache
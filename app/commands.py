@@ -0,0 +1,121 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Backfill the order search index from the orders table."""
+    from app.search import rebuild_search_index, search_backend
+    count = rebuild_search_index()
+    click.echo(f"Indexed {count} orders ({search_backend()} backend)")
+
+
+@click.command('rebuild-rollups')
+@click.option('--check', is_flag=True, help='Only report rows that differ from the orders table.')
+@with_appcontext
+def rebuild_rollups_command(check):
+    """Recompute the daily order rollups from the orders table."""
+    from app.rollups import rebuild_rollups, rollup_drift
+    if check:
+        drift = rollup_drift()
+        for day, staff_id, status in drift:
+            click.echo(f"drift {day} staff={staff_id} {status}")
+        click.echo(f"{len(drift)} rollup rows out of date")
+        if drift:
+            raise SystemExit(1)
+        return
+    click.echo(f"Rebuilt {rebuild_rollups()} rollup rows")
+
+
+@click.command('db-upgrade')
+@with_appcontext
+def db_upgrade_command():
+    """Apply pending schema migrations."""
+    from app.migrations import upgrade
+    applied = upgrade()
+    click.echo(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Verify the hot queries are planned through their indexes."""
+    from app.query_plans import check_query_plans
+    failed = 0
+    for name, index, ok, plan in check_query_plans():
+        click.echo(f"{'ok  ' if ok else 'FAIL'} {name} ({index})")
+        if not ok:
+            failed += 1
+            for line in plan:
+                click.echo(f"       {line}")
+    if failed:
+        raise SystemExit(1)
+
+
+@click.command('run-jobs')
+@click.option('--workers', default=1, show_default=True, help='Worker processes.')
+@click.option('--poll', default=1.0, show_default=True, help='Seconds between polls when idle.')
+@click.option('--once', is_flag=True, help='Exit once the queue is empty.')
+@click.option('--config', default='config.Config', show_default=True,
+              help='Import path of the config class worker processes build their app from.')
+@with_appcontext
+def run_jobs_command(workers, poll, once, config):
+    """Run background job workers (bulk reports and bill ZIPs)."""
+    from flask import current_app
+    from app.jobs import run_workers
+    run_workers(current_app._get_current_object(), workers=workers, poll=poll, once=once, config=config)
+
+
+@click.command('cleanup-jobs')
+@with_appcontext
+def cleanup_jobs_command():
+    """Delete expired job artifacts."""
+    from app.jobs import cleanup_expired
+    click.echo(f"Expired {cleanup_expired()} jobs")
+
+
+@click.command('backfill-uploads')
+@click.option('--delete-originals', is_flag=True, help='Remove legacy files once converted.')
+@with_appcontext
+def backfill_uploads_command(delete_originals):
+    """Re-encode legacy uploads into content-addressed variants and update orders."""
+    from app.images import backfill_uploads, PILLOW_AVAILABLE
+    if not PILLOW_AVAILABLE:
+        raise click.ClickException('Pillow is not installed')
+    files, orders = backfill_uploads(delete_originals=delete_originals)
+    click.echo(f"Converted {files} files, updated {orders} orders")
+
+
+@click.command('merge-customers')
+@click.option('--dry-run', is_flag=True, help='Only report the duplicates that would be merged.')
+@with_appcontext
+def merge_customers_command(dry_run):
+    """Fold customers sharing a phone number into one and repoint their orders."""
+    from app import db
+    from app.cache import bump_generation
+    from app.customers import backfill_normalized_phones, merge_duplicate_customers
+    with db.engine.connect() as conn:
+        trans = conn.begin()
+        backfill_normalized_phones(conn)  # the report needs it too; rolled back on a dry run
+        result = merge_duplicate_customers(conn, dry_run=dry_run)
+        if dry_run:
+            trans.rollback()
+        else:
+            trans.commit()
+    verb = 'Would merge' if dry_run else 'Merged'
+    click.echo(f"{verb} {result['customers']} duplicate customers in {result['groups']} groups "
+               f"({result['orders']} orders moved)")
+    if result['customers'] and not dry_run:
+        bump_generation()
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(run_jobs_command)
+    app.cli.add_command(cleanup_jobs_command)
+    app.cli.add_command(backfill_uploads_command)
+    app.cli.add_command(merge_customers_command)
@@ -0,0 +1,185 @@
+"""
+Customer matching, autocomplete and duplicate merging.
+
+Customers are identified by Customer.phone_normalized (utils.normalize_phone),
+which has a unique index, so '+91 98765 43210' and '9876543210' are the
+same customer. Orders pick their customer with customer_for() or
+assign_customer() rather than filtering on the raw phone.
+
+lookup_customers() answers the order form's autocomplete: digits are a
+prefix of the normalized phone, anything else a prefix of lower(name). Both
+are range scans on an index, so a keystroke costs one short index read.
+
+merge_duplicate_customers() folds customers that share a normalized phone
+into the oldest one (migration 6, `flask merge-customers`).
+"""
+import re
+from flask import current_app
+from sqlalchemy import delete, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Customer, Order
+from app.utils import normalize_phone
+
+_LETTERS = re.compile(r'[^\W\d_]')
+
+
+def find_customer(phone):
+    """The customer with this phone number (in any formatting), or None."""
+    key = normalize_phone(phone)
+    if key is None:
+        return None
+    return Customer.query.filter_by(phone_normalized=key).first()
+
+
+def customer_for(name, phone, address):
+    """The existing customer with this phone number, or a newly added one."""
+    customer = find_customer(phone)
+    if customer is not None:
+        return customer
+    customer = Customer(name=name, phone=phone, address=address)
+    try:
+        with db.session.begin_nested():
+            db.session.add(customer)
+    except IntegrityError:
+        # another request added the same number meanwhile
+        customer = find_customer(phone)
+    return customer
+
+
+def assign_customer(order, name, phone, address):
+    """
+    Edit an order's customer details. A phone number that belongs to another
+    customer moves the order to that customer instead of creating a duplicate.
+    """
+    owner = find_customer(phone)
+    if owner is not None:
+        order.customer = owner
+    elif order.customer is None:
+        order.customer = customer_for(name, phone, address)
+    customer = order.customer
+    customer.name = name
+    customer.phone = phone
+    customer.address = address
+    return customer
+
+
+# --- Autocomplete ---
+
+def _phone_prefix(q):
+    """Digits of a partly typed number, with the same prefixes dropped as normalize_phone."""
+    digits = re.sub(r'\D', '', q)
+    country_code = current_app.config.get('PHONE_COUNTRY_CODE', '91')
+    if digits.startswith('00'):
+        digits = digits[2:]
+        international = True
+    else:
+        international = q.lstrip().startswith('+')
+        if digits.startswith('0'):
+            digits = digits[1:]
+    if international and country_code and digits.startswith(country_code):
+        digits = digits[len(country_code):]
+    return digits
+
+
+def _digits_upper_bound(prefix):
+    """Smallest digit string above every string starting with prefix ('98769' -> '98770')."""
+    if set(prefix) == {'9'}:
+        return None
+    return str(int(prefix) + 1).zfill(len(prefix))
+
+
+def _text_upper_bound(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def lookup_stmt(q, limit=10):
+    """SELECT for the customers matching a typed prefix, or None if q is too short."""
+    q = (q or '').strip()
+    columns = (Customer.id, Customer.name, Customer.phone, Customer.address)
+    if not _LETTERS.search(q):
+        prefix = _phone_prefix(q)
+        if len(prefix) < 3:
+            return None
+        upper = _digits_upper_bound(prefix)
+        stmt = select(*columns).where(Customer.phone_normalized >= prefix)
+        if upper is not None:
+            stmt = stmt.where(Customer.phone_normalized < upper)
+        return stmt.order_by(Customer.phone_normalized).limit(limit)
+    prefix = ' '.join(q.lower().split())
+    if len(prefix) < 2:
+        return None
+    name = func.lower(Customer.name)
+    return select(*columns).where(name >= prefix, name < _text_upper_bound(prefix)) \
+        .order_by(name).limit(limit)
+
+
+def lookup_customers(q, limit=None):
+    """Customers whose phone or name starts with q, as dicts for the autocomplete."""
+    stmt = lookup_stmt(q, limit or current_app.config.get('CUSTOMER_LOOKUP_LIMIT', 10))
+    if stmt is None:
+        return []
+    return [dict(row._mapping) for row in db.session.execute(stmt)]
+
+
+# --- Merging duplicates ---
+
+def backfill_normalized_phones(conn, batch=1000):
+    """Fill phone_normalized for customers written before it existed. Returns the rows updated."""
+    table = Customer.__table__
+    rows = conn.execute(select(table.c.id, table.c.phone).where(table.c.phone_normalized.is_(None))).all()
+    params = [{'cid': cid, 'key': normalize_phone(phone)} for cid, phone in rows]
+    params = [p for p in params if p['key'] is not None]
+    stmt = update(table).where(table.c.id == db.bindparam('cid')).values(phone_normalized=db.bindparam('key'))
+    for start in range(0, len(params), batch):
+        conn.execute(stmt, params[start:start + batch])
+    return len(params)
+
+
+def duplicate_groups(conn):
+    """[(phone_normalized, [customer ids, oldest first])] for numbers held by more than one customer."""
+    c = Customer.__table__.c
+    shared = select(c.phone_normalized).where(c.phone_normalized.is_not(None)) \
+        .group_by(c.phone_normalized).having(func.count() > 1)
+    groups = {}
+    for key, cid in conn.execute(select(c.phone_normalized, c.id).where(c.phone_normalized.in_(shared))
+                                 .order_by(c.phone_normalized, c.id)):
+        groups.setdefault(key, []).append(cid)
+    return list(groups.items())
+
+
+def merge_duplicate_customers(conn, dry_run=False):
+    """
+    Fold every group of customers sharing a phone number into its oldest
+    member: their orders are repointed to it, it takes the newest non-empty
+    name and address, and the others are deleted. Returns
+    {'groups', 'customers' (removed), 'orders' (moved)}.
+    """
+    customers, orders = Customer.__table__, Order.__table__
+    groups = duplicate_groups(conn)
+    result = {'groups': len(groups), 'customers': 0, 'orders': 0}
+    moved_ids = []
+    for _, ids in groups:
+        keep, dups = ids[0], ids[1:]
+        moved = [i for (i,) in conn.execute(select(orders.c.id).where(orders.c.customer_id.in_(dups)))]
+        result['customers'] += len(dups)
+        result['orders'] += len(moved)
+        if dry_run:
+            continue
+        details = {}
+        for name, address in conn.execute(select(customers.c.name, customers.c.address)
+                                          .where(customers.c.id.in_(ids)).order_by(customers.c.id)):
+            if name:
+                details['name'] = name
+            if address:
+                details['address'] = address
+        conn.execute(update(orders).where(orders.c.customer_id.in_(dups)).values(customer_id=keep))
+        conn.execute(delete(customers).where(customers.c.id.in_(dups)))
+        if details:
+            conn.execute(update(customers).where(customers.c.id == keep).values(**details))
+        moved_ids.extend(moved)
+
+    if moved_ids and inspect(conn).has_table('order_search'):
+        from app.search import reindex_orders
+        reindex_orders(moved_ids, conn)
+    return result
@@ -0,0 +1,90 @@
+"""
+Database engine configuration.
+
+SQLite connections are switched to WAL with synchronous=NORMAL, a busy
+timeout, mmap and a larger page cache, so readers no longer block the
+writer and concurrent writers wait instead of failing with "database is
+locked". PostgreSQL gets a sized connection pool with pre-ping and
+recycling. With DATABASE_REPLICA_URL set, report queries can be routed to
+a read replica through read_bind().
+"""
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from app import db
+
+
+def normalize_database_url(url):
+    """Render and Heroku hand out postgres:// URLs, which SQLAlchemy 1.4+ rejects."""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url, config):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL."""
+    backend = make_url(url).get_backend_name()
+    if backend == 'postgresql':
+        return {
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+        }
+    if backend == 'sqlite':
+        # the driver's own lock wait; busy_timeout below covers the same for SQLite itself
+        return {'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0}}
+    return {}
+
+
+def configure_database(app):
+    """Fill in engine options and the replica bind before db.init_app()."""
+    config = app.config
+    config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(config['SQLALCHEMY_DATABASE_URI'])
+    if not config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config['SQLALCHEMY_DATABASE_URI'], config)
+    replica = normalize_database_url(config.get('DATABASE_REPLICA_URL'))
+    if replica:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds['replica'] = dict(engine_options(replica, config), url=replica)
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def _sqlite_pragmas(config):
+    pragmas = [
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+        ('cache_size', -int(config.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))),  # negative = KiB
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+        ('temp_store', 'MEMORY'),
+    ]
+    if config.get('SQLITE_WAL', True):
+        pragmas[:0] = [('journal_mode', 'WAL'), ('synchronous', 'NORMAL')]
+    return pragmas
+
+
+def init_database(app):
+    """Register per-connection setup on the app's engines. Needs an app context."""
+    pragmas = _sqlite_pragmas(app.config)
+    for engine in db.engines.values():
+        if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+            continue
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_conn, connection_record):
+            cursor = dbapi_conn.cursor()
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+
+def read_bind():
+    """bind_arguments that send a statement to the read replica, or None without one."""
+    engine = db.engines.get('replica')
+    return {'bind': engine} if engine is not None else None
+
+
+def optimize():
+    """Refresh planner statistics that have gone stale (SQLite PRAGMA optimize)."""
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            conn.execute(text('PRAGMA optimize'))
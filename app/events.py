@@ -0,0 +1,238 @@
+"""
+Order change feed and the admin server-sent events stream.
+
+Every flush that inserts an order, changes its status or edits it appends
+a row to order_events (OrderEvent) in the same transaction; Core writes
+(app.bulk) call record_events themselves. The table is append-only and
+its id is the stream's cursor, so a reconnecting client resumes with
+Last-Event-ID. Ids are taken at insert but become visible at commit, and
+on PostgreSQL a transaction that commits late can show a lower id after
+the stream has passed it. Missing ids below the cursor are therefore kept
+as gaps for EVENTS_LATE_SECONDS and delivered if they turn up. The SSE id
+carries them ('<last id>.<gap>.<gap>...', see format_cursor) so they
+survive a reconnect; gaps left by rolled-back transactions just expire.
+
+event_stream() serves one admin connection. It only queries the feed when
+the cache generation (app.cache) has changed, i.e. after some commit, or
+every EVENTS_KEEPALIVE seconds, and then reads at most EVENTS_MAX_BACKLOG
+events; nothing accumulates per connection. A client further behind than
+that, or behind the retention window, gets a `reset` event and reloads.
+Each batch of `order` events is followed by one `counters` event with the
+dashboard totals (from the rollups). Streams end after
+EVENTS_STREAM_SECONDS so a gthread worker's threads are not held forever;
+the browser reconnects on its own. At most EVENTS_MAX_STREAMS streams run
+per process (see acquire_stream), by default a quarter of its threads.
+Events older than EVENTS_RETENTION_DAYS are pruned by the job workers.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Customer, Order, OrderEvent
+from app.rollups import order_total
+from app.stats import order_summary
+
+_ORDER_FIELDS = ('product_name', 'product_details', 'price', 'quantity', 'delivery_datetime', 'return_datetime',
+                 'amount_advance', 'amount_pending', 'total_amount', 'customer_id', 'staff_id')
+
+_streams = None
+_streams_lock = threading.Lock()
+
+
+def record_events(conn, orders, kind):
+    """Append one `kind` event per (order_id, status) pair, for writes that bypass the session."""
+    now = datetime.utcnow()
+    rows = [{'order_id': i, 'kind': kind, 'status': status, 'created_at': now} for i, status in orders]
+    if rows:
+        conn.execute(insert(OrderEvent), rows)
+
+
+def _history_changed(state, field):
+    return state.attrs[field].history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_order_events(session, flush_context):
+    """Append feed rows for the orders inserted, edited, re-statused or deleted in this flush."""
+    now = datetime.utcnow()
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, Order):
+            rows.append({'order_id': obj.id, 'kind': 'created', 'status': obj.status, 'created_at': now})
+    for obj in session.dirty:
+        if not isinstance(obj, Order):
+            continue
+        state = inspect(obj)
+        if _history_changed(state, 'status'):
+            rows.append({'order_id': obj.id, 'kind': 'status', 'status': obj.status, 'created_at': now})
+        elif any(_history_changed(state, f) for f in _ORDER_FIELDS):
+            rows.append({'order_id': obj.id, 'kind': 'updated', 'status': obj.status, 'created_at': now})
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            rows.append({'order_id': obj.id, 'kind': 'deleted', 'status': None, 'created_at': now})
+    if rows:
+        session.connection().execute(insert(OrderEvent), rows)
+
+
+def latest_event_id():
+    return db.session.execute(select(func.max(OrderEvent.id))).scalar() or 0
+
+
+def prune_events(now=None):
+    """Delete events older than EVENTS_RETENTION_DAYS. Returns the rows removed."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=current_app.config['EVENTS_RETENTION_DAYS'])
+    result = db.session.execute(delete(OrderEvent).where(OrderEvent.created_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+def _order_rows(order_ids):
+    """Current list-row fields of the given orders, from one column-restricted query."""
+    stmt = select(
+        Order.id, Order.status, Order.created_at, Order.product_name, order_total, Order.amount_pending,
+        Customer.name, func.coalesce(func.nullif(User.full_name, ''), User.username),
+    ).outerjoin(Customer, Customer.id == Order.customer_id) \
+     .outerjoin(User, User.id == Order.staff_id) \
+     .where(Order.id.in_(order_ids))
+    return {
+        row[0]: {'status': row[1], 'created_at': row[2].strftime('%Y-%m-%d %H:%M') if row[2] else None,
+                 'product_name': row[3], 'total': float(row[4] or 0.0), 'amount_pending': float(row[5] or 0.0),
+                 'customer': row[6], 'staff': row[7]}
+        for row in db.session.execute(stmt)
+    }
+
+
+def _sse(data, event_name=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event_name:
+        lines.append(f'event: {event_name}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _counters():
+    summary = order_summary()
+    return {'total': summary['total'], 'pending': summary['pending'], 'approved': summary['approved'],
+            'revenue': summary['revenue']}
+
+
+def format_cursor(last_id, gaps=()):
+    """The SSE event id for a position in the feed: '<last id>' plus '.<gap>' per missing lower id."""
+    return '.'.join(str(i) for i in [last_id, *sorted(gaps)])
+
+
+def parse_cursor(value):
+    """(last_id, [gap ids]) from a format_cursor() string, or None if it is not one."""
+    try:
+        last_id, *gaps = (int(part) for part in value.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    return last_id, [i for i in gaps if i < last_id]
+
+
+def _event_rows(condition, limit=None):
+    stmt = select(OrderEvent.id, OrderEvent.order_id, OrderEvent.kind, OrderEvent.status) \
+        .where(condition).order_by(OrderEvent.id)
+    return db.session.execute(stmt if limit is None else stmt.limit(limit)).all()
+
+
+def poll_events(last_id, limit, gaps=None):
+    """
+    (messages, new_last_id) for the events after last_id: SSE `order`
+    messages followed by one `counters` message that carries the cursor,
+    or a single `reset` when more than `limit` events are waiting or some
+    were already pruned. Order fields in the messages are the order's
+    current values.
+
+    `gaps` maps missing ids below last_id to the time.monotonic() at which
+    to give up on them. It is updated in place: events that fill a gap are
+    delivered with this batch, and ids skipped by this batch become gaps.
+    """
+    gaps = {} if gaps is None else gaps
+    now = time.monotonic()
+    for i in [i for i, give_up in gaps.items() if give_up < now]:
+        del gaps[i]
+    late = _event_rows(OrderEvent.id.in_(list(gaps))) if gaps else []
+    for e in late:
+        del gaps[e.id]
+    events = _event_rows(OrderEvent.id > last_id, limit + 1)
+    if not events and not late:
+        return [], last_id
+    if events:
+        oldest = db.session.execute(select(func.min(OrderEvent.id))).scalar()
+        if len(events) > limit or (last_id and oldest > last_id + 1):
+            newest = latest_event_id()
+            gaps.clear()
+            return [_sse({'reason': 'behind'}, 'reset', newest)], newest
+        seen = {e.id for e in events}
+        give_up = now + current_app.config['EVENTS_LATE_SECONDS']
+        for i in range(last_id + 1, events[-1].id):
+            if i not in seen:
+                gaps[i] = give_up
+        for i in sorted(gaps)[:-limit]:
+            del gaps[i]  # keep the newest `limit`
+        last_id = events[-1].id
+
+    batch = late + events
+    details = _order_rows({e.order_id for e in batch if e.kind != 'deleted'})
+    messages = []
+    for e in batch:
+        data = {'order_id': e.order_id, 'kind': e.kind, 'status': e.status}
+        data.update(details.get(e.order_id) or {})
+        messages.append(_sse(data, 'order'))
+    messages.append(_sse(_counters(), 'counters', format_cursor(last_id, gaps)))
+    return messages, last_id
+
+
+def acquire_stream():
+    """Claim one of this process's EVENTS_MAX_STREAMS slots; returns a release function or None."""
+    global _streams
+    with _streams_lock:
+        if _streams is None:
+            _streams = threading.BoundedSemaphore(current_app.config['EVENTS_MAX_STREAMS'])
+    if not _streams.acquire(blocking=False):
+        return None
+    return _streams.release
+
+
+def event_stream(last_id=None, gaps=()):
+    """
+    Generator of SSE text for one connection, starting after last_id (or
+    at the current end of the feed), still watching the `gaps` ids of a
+    resumed cursor. Run it under stream_with_context.
+    """
+    config = current_app.config
+    poll = config['EVENTS_POLL_INTERVAL']
+    keepalive = config['EVENTS_KEEPALIVE']
+    limit = config['EVENTS_MAX_BACKLOG']
+    cache = current_app.extensions.get('response_cache')
+    deadline = time.monotonic() + config['EVENTS_STREAM_SECONDS']
+    give_up = time.monotonic() + config['EVENTS_LATE_SECONDS']
+    gaps = {i: give_up for i in sorted(gaps)[-limit:]} if last_id is not None else {}
+
+    yield f"retry: {config['EVENTS_RETRY_MS']}\n\n"
+    try:
+        if last_id is None:
+            last_id = latest_event_id()
+            yield _sse(_counters(), 'counters', format_cursor(last_id))
+        generation, checked = None, 0.0
+        while time.monotonic() < deadline:
+            current = cache.generation() if cache is not None else None
+            if current != generation or current is None or time.monotonic() - checked >= keepalive:
+                generation, checked = current, time.monotonic()
+                messages, last_id = poll_events(last_id, limit, gaps)
+                db.session.rollback()  # end the read transaction between polls
+                if messages:
+                    yield ''.join(messages)
+                else:
+                    yield ': keepalive\n\n'
+            time.sleep(poll)
+    finally:
+        db.session.remove()
@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, BooleanField, SubmitField, FloatField, IntegerField, TextAreaField, MultipleFileField
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, PasswordField, BooleanField, SubmitField, FloatField, IntegerField, TextAreaField, MultipleFileField, SelectField
 from wtforms.validators import DataRequired, Length, Optional, NumberRange
 
 class LoginForm(FlaskForm):
@@ -14,11 +15,19 @@ class CreateStaffForm(FlaskForm):
     is_admin = BooleanField('Admin')  # allow creating another admin if needed
     submit = SubmitField('Create Staff')
 
+class ProductForm(FlaskForm):
+    name = StringField('Product name', validators=[DataRequired(), Length(max=200)],
+                       filters=[lambda v: v.strip() if v else v])
+    stock = IntegerField('Units in stock', default=1, validators=[DataRequired(), NumberRange(min=1)])
+    is_active = BooleanField('Track availability', default=True)
+    submit = SubmitField('Save Product')
+
 class CustomerOrderForm(FlaskForm):
     customer_name = StringField('Customer name', validators=[DataRequired()])
     phone = StringField('Phone', validators=[DataRequired(), Length(min=6, max=30)])
     address = StringField('Address', validators=[Optional()])
-    product_name = StringField('Product name', validators=[DataRequired()])
+    product_name = StringField('Product name', validators=[DataRequired()],
+                               filters=[lambda v: v.strip() if v else v])  # must match Product.name
     product_details = TextAreaField('Product details', validators=[Optional()])
     price = FloatField('Price', validators=[DataRequired(), NumberRange(min=0)])
     quantity = IntegerField('Quantity', default=1, validators=[DataRequired(), NumberRange(min=1)])
@@ -27,3 +36,13 @@ class CustomerOrderForm(FlaskForm):
     return_datetime = StringField('Return datetime (YYYY-MM-DD HH:MM)', validators=[Optional()])
     amount_advance = FloatField('Advance amount', default=0.0, validators=[Optional()])
     submit = SubmitField('Save Order')
+
+class OrderImportForm(FlaskForm):
+    file = FileField('CSV or JSON file', validators=[FileRequired(), FileAllowed(['csv', 'json'], 'CSV or JSON only')])
+    submit = SubmitField('Import Orders')
+
+class BatchStatusForm(FlaskForm):
+    # the selected orders arrive as repeated order_ids checkboxes
+    action = SelectField('With selected', choices=[('approve', 'Approve'), ('complete', 'Mark completed'),
+                                                   ('cancel', 'Cancel')])
+    submit = SubmitField('Apply')
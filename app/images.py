@@ -0,0 +1,183 @@
+"""
+Image ingestion for uploaded product photos.
+
+Uploads are decoded with Pillow, rotated per EXIF orientation, stripped of
+metadata, downscaled to UPLOAD_IMAGE_MAX_SIZE and re-encoded (WebP by
+default), plus a fixed-size thumbnail. Files are content-addressed by the
+SHA-256 of the original bytes, so the same photo uploaded twice is stored
+once:
+
+    <hash>.webp         display variant (the name stored on the order)
+    <hash>_thumb.webp   thumbnail
+"""
+import hashlib
+import os
+import re
+import tempfile
+from flask import current_app
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except Exception:
+    PILLOW_AVAILABLE = False
+
+HASH_LENGTH = 32
+VARIANTS = ('full', 'thumb')
+_HASHED_RE = re.compile(r'^([0-9a-f]{%d})\.(webp|jpg)$' % HASH_LENGTH)
+_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def is_hashed_name(name):
+    return bool(name and _HASHED_RE.match(name))
+
+
+def variant_base(name):
+    """The display filename a variant belongs to ('<hash>_thumb.webp' -> '<hash>.webp')."""
+    m = re.match(r'^([0-9a-f]{%d})_[a-z]+\.(webp|jpg)$' % HASH_LENGTH, name or '')
+    return f"{m.group(1)}.{m.group(2)}" if m else name
+
+
+def variant_name(name, variant='full'):
+    """
+    Filename of a stored photo's variant. Legacy (pre-ingestion) files have
+    no variants, so every variant falls back to the file itself.
+    """
+    m = _HASHED_RE.match(name or '')
+    if not m or variant == 'full':
+        return name
+    return f"{m.group(1)}_{variant}.{m.group(2)}"
+
+
+def image_info(filename):
+    """
+    Width, height, byte size and SHA-256 of a file in UPLOAD_FOLDER, keyed
+    like the OrderPhoto columns. Missing files or data give None values.
+    """
+    info = {'width': None, 'height': None, 'byte_size': None, 'content_hash': None}
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    try:
+        with open(path, 'rb') as f:
+            h = hashlib.sha256()
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+            info['byte_size'] = f.tell()
+            info['content_hash'] = h.hexdigest()
+            if PILLOW_AVAILABLE:
+                f.seek(0)
+                with Image.open(f) as img:  # reads the header only
+                    info['width'], info['height'] = img.size
+    except (OSError, ValueError):
+        pass
+    return info
+
+
+def _settings():
+    cfg = current_app.config
+    fmt = cfg.get('UPLOAD_IMAGE_FORMAT', 'WEBP').upper()
+    return {
+        'format': fmt,
+        'ext': _EXTENSIONS.get(fmt, 'jpg'),
+        'max_size': cfg.get('UPLOAD_IMAGE_MAX_SIZE', 1600),
+        'thumb_size': cfg.get('UPLOAD_THUMB_SIZE', 320),
+        'quality': cfg.get('UPLOAD_IMAGE_QUALITY', 80),
+    }
+
+
+def _encode(img, path, settings):
+    """Save img to path atomically in the configured format without metadata."""
+    if settings['format'] == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    elif img.mode not in ('RGB', 'RGBA', 'L'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    folder = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            img.save(f, settings['format'], quality=settings['quality'], optimize=True)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _hash_stream(stream):
+    h = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def ingest_image(stream, digest=None):
+    """
+    Process an image from a binary file object and store its variants in
+    UPLOAD_FOLDER. Returns the stored (display) filename, or None if the
+    data is not a decodable image.
+    """
+    settings = _settings()
+    folder = current_app.config['UPLOAD_FOLDER']
+    digest = digest or _hash_stream(stream)
+    name = f"{digest}.{settings['ext']}"
+    full_path = os.path.join(folder, name)
+    thumb_path = os.path.join(folder, variant_name(name, 'thumb'))
+    if os.path.exists(full_path) and os.path.exists(thumb_path):
+        return name  # already ingested: dedupe
+
+    try:
+        with Image.open(stream) as img:
+            # JPEGs decode at the smallest scale that still covers both variants, not at full size
+            long_side, short_side = settings['max_size'], settings['thumb_size']
+            img.draft(None, (long_side, short_side) if img.width >= img.height else (short_side, long_side))
+            img.load()
+            img = ImageOps.exif_transpose(img)
+            full = img.copy()
+            full.thumbnail((settings['max_size'], settings['max_size']), Image.LANCZOS)
+            _encode(full, full_path, settings)
+            thumb = ImageOps.fit(img, (settings['thumb_size'], settings['thumb_size']), Image.LANCZOS)
+            _encode(thumb, thumb_path, settings)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return name
+
+
+def backfill_uploads(delete_originals=False):
+    """
+    Ingest legacy files in UPLOAD_FOLDER and repoint orders at the new names.
+    Returns (files_converted, orders_updated).
+    """
+    from app import db
+    from app.models import OrderPhoto
+
+    folder = current_app.config['UPLOAD_FOLDER']
+    mapping = {}
+    for entry in sorted(os.listdir(folder)):
+        path = os.path.join(folder, entry)
+        if not os.path.isfile(path) or entry.endswith('.tmp') or is_hashed_name(entry) \
+                or '_thumb.' in entry:
+            continue
+        with open(path, 'rb') as f:
+            new_name = ingest_image(f)
+        if new_name:
+            mapping[entry] = new_name
+
+    updated = set()
+    if mapping:
+        photos = OrderPhoto.query.filter(OrderPhoto.filename.in_(list(mapping))).all()
+        for photo in photos:
+            new_name = mapping[photo.filename]
+            siblings = [p for p in photo.order.photos if p is not photo]
+            if any(p.filename == new_name for p in siblings):
+                db.session.delete(photo)  # content addressing merged two photos of this order
+            else:
+                photo.filename = new_name
+                for key, value in image_info(new_name).items():
+                    setattr(photo, key, value)
+            updated.add(photo.order_id)
+    db.session.commit()
+
+    if delete_originals:
+        for old in mapping:
+            os.remove(os.path.join(folder, old))
+    return len(mapping), len(updated)
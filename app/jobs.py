@@ -0,0 +1,277 @@
+"""
+Background jobs without an external broker.
+
+Jobs are rows in the `jobs` table. Web requests enqueue them with submit();
+`flask run-jobs` runs one or more worker processes that claim queued rows
+with a conditional UPDATE, write the result file to JOB_ARTIFACT_FOLDER and
+record progress as they go. With JOB_ARTIFACT_STORAGE = 'database' the
+finished file is then copied into job_artifact_chunks, so a worker on
+another machine (a separate Render worker service) can hand results to
+the web service. Finished artifacts expire after JOB_ARTIFACT_TTL_HOURS
+and are removed by cleanup_expired(). With JOBS_EAGER set, submit() runs
+the job inline (tests, single-process dev).
+"""
+import json
+import multiprocessing
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from werkzeug.utils import import_string
+from app import db
+from app.database import optimize
+from app.events import prune_events
+from app.models import Job, JobArtifactChunk
+
+HANDLERS = {}
+
+_PROGRESS_INTERVAL = 1.0  # seconds between progress commits
+_CHUNK_SIZE = 1024 * 1024  # bytes per job_artifact_chunks row
+
+
+def handler(kind):
+    """Register fn(job, params, path, progress) -> download name as the handler for `kind`."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def _artifact_dir():
+    folder = current_app.config['JOB_ARTIFACT_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def submit(kind, params, user_id=None):
+    """Queue a job and return it. Unknown kinds raise ValueError."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, params_json=json.dumps(params), created_by=user_id, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    if current_app.config.get('JOBS_EAGER'):
+        run_job(job.id, worker='eager')
+        db.session.refresh(job)
+    return job
+
+
+def claim_next(worker):
+    """Atomically move the oldest queued job to running. Returns its id or None."""
+    while True:
+        candidate = db.session.query(Job.id).filter(Job.status == 'queued').order_by(Job.id).first()
+        if candidate is None:
+            db.session.rollback()
+            return None
+        now = datetime.utcnow()
+        result = db.session.execute(
+            update(Job).where(Job.id == candidate[0], Job.status == 'queued')
+            .values(status='running', worker=worker, started_at=now, heartbeat_at=now, progress=0))
+        db.session.commit()
+        if result.rowcount == 1:
+            return candidate[0]
+
+
+class Progress:
+    """Tracks items done out of total and commits the job's percentage at most once a second."""
+
+    def __init__(self, job, total):
+        self.job = job
+        self.total = max(total or 0, 1)
+        self.done = 0
+        self._last = 0.0
+
+    def advance(self, n=1):
+        self.done += n
+        now = time.monotonic()
+        if now - self._last >= _PROGRESS_INTERVAL:
+            self._last = now
+            self.job.progress = min(99, int(self.done * 100 / self.total))
+            self.job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+
+def run_job(job_id, worker=None):
+    """Run one claimed (or eager) job to completion, recording the outcome."""
+    job = db.session.get(Job, job_id)
+    fn = HANDLERS.get(job.kind)
+    path = os.path.join(_artifact_dir(), f"job_{job.id}")
+    if job.status != 'running':
+        job.status, job.worker, job.started_at = 'running', worker, datetime.utcnow()
+        db.session.commit()
+    try:
+        if fn is None:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        name = fn(job, job.get_params(), path, Progress(job, 0))
+        job.status = 'done'
+        job.progress = 100
+        job.artifact_path = _store_artifact(job, path)
+        job.artifact_name = name
+        job.message = None
+    except Exception as exc:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.status = 'failed'
+        job.message = str(exc)[:255] or exc.__class__.__name__
+        current_app.logger.exception('Job %s failed', job_id)
+        if os.path.exists(path):
+            os.remove(path)
+    now = datetime.utcnow()
+    job.finished_at = now
+    job.expires_at = now + timedelta(hours=current_app.config['JOB_ARTIFACT_TTL_HOURS'])
+    db.session.commit()
+    return job.status
+
+
+def _store_artifact(job, path):
+    """Keep the result file in place, or copy it into the database; returns artifact_path."""
+    if current_app.config.get('JOB_ARTIFACT_STORAGE', 'files') != 'database':
+        return path
+    with open(path, 'rb') as f:
+        for seq, chunk in enumerate(iter(lambda: f.read(_CHUNK_SIZE), b'')):
+            db.session.execute(insert(JobArtifactChunk), [{'job_id': job.id, 'seq': seq, 'data': chunk}])
+    os.remove(path)
+    return None
+
+
+def artifact_available(job):
+    if job.status != 'done':
+        return False
+    if job.artifact_path:
+        return os.path.exists(job.artifact_path)
+    return db.session.query(JobArtifactChunk.seq).filter_by(job_id=job.id).first() is not None
+
+
+def iter_artifact(job):
+    """The result file's bytes in chunks, from disk or from job_artifact_chunks (one row at a time)."""
+    if job.artifact_path:
+        with open(job.artifact_path, 'rb') as f:
+            yield from iter(lambda: f.read(_CHUNK_SIZE), b'')
+        return
+    seqs = db.session.execute(select(JobArtifactChunk.seq).where(JobArtifactChunk.job_id == job.id)
+                              .order_by(JobArtifactChunk.seq)).scalars().all()
+    for seq in seqs:
+        yield db.session.execute(select(JobArtifactChunk.data).where(
+            JobArtifactChunk.job_id == job.id, JobArtifactChunk.seq == seq)).scalar()
+
+
+def requeue_stale():
+    """Put back running jobs whose worker stopped sending heartbeats."""
+    cutoff = datetime.utcnow() - timedelta(minutes=current_app.config['JOB_STALE_MINUTES'])
+    result = db.session.execute(
+        update(Job).where(Job.status == 'running', Job.heartbeat_at < cutoff)
+        .values(status='queued', worker=None))
+    db.session.commit()
+    return result.rowcount
+
+
+def cleanup_expired(now=None):
+    """Delete artifacts past expires_at and mark their jobs expired. Returns the count."""
+    now = now or datetime.utcnow()
+    jobs = Job.query.filter(Job.status.in_(['done', 'failed']), Job.expires_at < now).all()
+    for job in jobs:
+        if job.artifact_path and os.path.exists(job.artifact_path):
+            os.remove(job.artifact_path)
+        db.session.execute(delete(JobArtifactChunk).where(JobArtifactChunk.job_id == job.id))
+        job.status = 'expired'
+        job.artifact_path = None
+    db.session.commit()
+    return len(jobs)
+
+
+def work(poll=1.0, once=False):
+    """Worker loop: claim and run jobs until stopped (or until idle when once=True)."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    last_cleanup = 0.0
+    while True:
+        if time.monotonic() - last_cleanup > 60:
+            requeue_stale()
+            cleanup_expired()
+            prune_events()
+            optimize()  # keep SQLite planner statistics current
+            last_cleanup = time.monotonic()
+        job_id = claim_next(worker)
+        if job_id is not None:
+            run_job(job_id, worker=worker)
+            continue
+        if once:
+            return
+        time.sleep(poll)
+
+
+def _worker_main(config, poll, once):
+    # each child builds its own app, so this works under spawn as well as fork
+    from app import create_app
+    app = create_app(import_string(config))
+    with app.app_context():
+        work(poll=poll, once=once)
+
+
+def run_workers(app, workers=1, poll=1.0, once=False, config='config.Config', start_method=None):
+    """
+    Run `workers` worker processes (or the loop in-process for one worker).
+    Child processes call create_app() with the config class at import path
+    `config` rather than receiving `app`, which cannot be pickled for the
+    spawn start method (macOS, Windows, Python 3.14 on Linux).
+    """
+    if workers <= 1:
+        with app.app_context():
+            work(poll=poll, once=once)
+        return
+    context = multiprocessing.get_context(start_method)
+    procs = [context.Process(target=_worker_main, args=(config, poll, once)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+
+
+# --- Handlers ---
+
+def _range(params):
+    from app.reports import report_range
+    report = report_range(params)
+    if report is None:
+        raise ValueError('Invalid report parameters')
+    return report
+
+
+@handler('report_csv')
+def report_csv_job(job, params, path, progress):
+    from app.reports import count_orders, report_batches, iter_report_csv
+    start, end, label = _range(params)
+    progress.total = max(count_orders(start, end), 1)
+
+    def rows():
+        for batch in report_batches(start, end):
+            yield from batch
+            progress.advance(len(batch))
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for chunk in iter_report_csv(start, end, rows=rows()):
+            f.write(chunk)
+    return f"{params.get('type', 'daily')}_report_{label}.csv"
+
+
+@handler('bills_zip')
+def bills_zip_job(job, params, path, progress):
+    from app.reports import count_orders, order_batches
+    from app.bills import iter_bills_zip
+    start, end, label = _range(params)
+    progress.total = max(count_orders(start, end), 1)
+
+    def orders():
+        for batch in order_batches(start, end, batch_size=100):
+            yield from batch
+            progress.advance(len(batch))
+
+    with open(path, 'wb') as f:
+        for chunk in iter_bills_zip(orders(), renderer=params.get('renderer')):
+            f.write(chunk)
+    return f"bills_{params.get('type', 'daily')}_{label}.zip"
@@ -0,0 +1,156 @@
+"""
+Minimal schema migrations.
+
+db.create_all() only creates missing tables, so changes to existing tables
+(new indexes, columns) are applied here. Each migration runs once, in
+version order, inside its own transaction, and the applied version is
+recorded in the schema_version table. Fresh databases get the current
+models from create_all() and the migrations then no-op (checkfirst).
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from app import db
+
+MIGRATIONS = []
+
+
+def migration(version):
+    """Register fn(conn) as schema migration `version`."""
+    def decorator(fn):
+        MIGRATIONS.append((version, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def _create_indexes(conn, model, names):
+    indexes = {ix.name: ix for ix in model.__table__.indexes}
+    for name in names:
+        # IF NOT EXISTS rather than checkfirst: the inspector does not report expression indexes
+        conn.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+
+def current_version(conn):
+    if not inspect(conn).has_table('schema_version'):
+        return 0
+    return conn.execute(text("SELECT max(version) FROM schema_version")).scalar() or 0
+
+
+def upgrade(engine=None):
+    """Apply pending migrations. Returns the list of versions applied."""
+    engine = engine if engine is not None else db.engine
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version ("
+                          "version INTEGER PRIMARY KEY, name VARCHAR(200), applied_at TIMESTAMP)"))
+        version = current_version(conn)
+
+    applied = []
+    for number, fn in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(text("INSERT INTO schema_version (version, name, applied_at) "
+                              "VALUES (:v, :n, CURRENT_TIMESTAMP)"), {'v': number, 'n': fn.__name__})
+        applied.append(number)
+    return applied
+
+
+# --- Migrations ---
+
+@migration(1)
+def add_hot_filter_indexes(conn):
+    from app.models import Customer, Order
+    _create_indexes(conn, Order, [
+        'ix_orders_created_id', 'ix_orders_staff_created_id', 'ix_orders_staff_status',
+        'ix_orders_status_created', 'ix_orders_customer', 'ix_orders_delivery', 'ix_orders_return',
+    ])
+    _create_indexes(conn, Customer, ['ix_customers_phone'])
+    if conn.dialect.name == 'sqlite':
+        conn.execute(text("ANALYZE"))
+
+
+@migration(2)
+def split_photos_json(conn):
+    """Move each order's photos_json list into order_photos rows."""
+    import json
+    from app.images import image_info
+    from app.models import OrderPhoto
+    OrderPhoto.__table__.create(bind=conn, checkfirst=True)
+    rows = conn.execute(text("SELECT id, photos_json FROM orders "
+                             "WHERE photos_json IS NOT NULL AND photos_json != '' "
+                             "AND id NOT IN (SELECT order_id FROM order_photos)")).all()
+    for order_id, photos_json in rows:
+        try:
+            names = json.loads(photos_json)
+        except ValueError:
+            continue
+        photos = [
+            dict(order_id=order_id, filename=name, position=position, **image_info(name))
+            for position, name in enumerate(dict.fromkeys(n for n in names if isinstance(n, str)))
+        ]
+        if photos:
+            conn.execute(OrderPhoto.__table__.insert(), photos)
+
+
+@migration(3)
+def add_products_and_window_index(conn):
+    from app.models import Order, Product
+    Product.__table__.create(bind=conn, checkfirst=True)
+    _create_indexes(conn, Order, ['ix_orders_active_window'])
+
+
+@migration(4)
+def add_order_rollups(conn):
+    from app.models import OrderRollup
+    from app.rollups import rebuild_rollups
+    OrderRollup.__table__.create(bind=conn, checkfirst=True)
+    rebuild_rollups(conn)
+
+
+@migration(5)
+def add_user_session_version(conn):
+    if 'session_version' not in {c['name'] for c in inspect(conn).get_columns('users')}:
+        conn.execute(text("ALTER TABLE users ADD COLUMN session_version INTEGER NOT NULL DEFAULT 0"))
+
+
+@migration(6)
+def add_customer_phone_normalized(conn):
+    """Normalized phone column, merge of customers sharing a number, then its unique index."""
+    from app.customers import backfill_normalized_phones, merge_duplicate_customers
+    from app.models import Customer
+    if 'phone_normalized' not in {c['name'] for c in inspect(conn).get_columns('customers')}:
+        conn.execute(text("ALTER TABLE customers ADD COLUMN phone_normalized VARCHAR(30)"))
+    backfill_normalized_phones(conn)
+    merge_duplicate_customers(conn)
+    _create_indexes(conn, Customer, ['ix_customers_phone_normalized', 'ix_customers_name_lower'])
+
+
+@migration(7)
+def add_customer_created_index(conn):
+    from app.models import Customer
+    _create_indexes(conn, Customer, ['ix_customers_created_id'])
+    if conn.dialect.name == 'sqlite':
+        conn.execute(text("ANALYZE customers"))  # stale stats otherwise steer the planner to another index
+
+
+@migration(8)
+def autoincrement_order_event_ids(conn):
+    """
+    Rebuild order_events with AUTOINCREMENT on SQLite, where a plain integer
+    key restarts from max(id) + 1, i.e. from 1 once pruning empties the
+    table, and clients resuming with Last-Event-ID would miss events.
+    PostgreSQL sequences never go back.
+    """
+    if conn.dialect.name != 'sqlite':
+        return
+    from app.models import OrderEvent
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'order_events'")).scalar()
+    if sql is None or 'AUTOINCREMENT' in sql.upper():
+        return
+    conn.execute(text("DROP INDEX IF EXISTS ix_order_events_created"))
+    conn.execute(text("ALTER TABLE order_events RENAME TO order_events_old"))
+    OrderEvent.__table__.create(bind=conn)
+    conn.execute(text("INSERT INTO order_events (id, order_id, kind, status, created_at) "
+                      "SELECT id, order_id, kind, status, created_at FROM order_events_old"))
+    conn.execute(text("DROP TABLE order_events_old"))
@@ -1,12 +1,18 @@
 from datetime import datetime
+from sqlalchemy import event, func
+from sqlalchemy.orm import validates
 from app import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
+from app.images import variant_name, image_info
+from app.sessions import load_session_user, invalidate_user, session_id
+from app.utils import normalize_phone
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # cached SessionUser; see app/sessions.py
+    return load_session_user(user_id)
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -17,33 +23,76 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # bumped on password change; sessions logged in under an older version end
+    session_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     orders = db.relationship('Order', backref='staff', lazy=True)
 
+    def get_id(self):
+        return session_id(self.id, self.session_version)
+
     def set_password(self, password):
+        if self.password_hash:
+            self.session_version = (self.session_version or 0) + 1
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _evict_session_user(mapper, connection, target):
+    invalidate_user(target.id)
+
 class Customer(db.Model):
     __tablename__ = 'customers'
+    __table_args__ = (
+        db.Index('ix_customers_phone', 'phone'),
+        # one customer per phone number; also serves autocomplete prefix lookups
+        db.Index('ix_customers_phone_normalized', 'phone_normalized', unique=True),
+        db.Index('ix_customers_name_lower', func.lower(db.column('name'))),
+        db.Index('ix_customers_created_id', 'created_at', 'id'),  # API listing (keyset)
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(30), nullable=False)
+    phone_normalized = db.Column(db.String(30))  # normalize_phone(phone); set whenever phone is assigned
     address = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     orders = db.relationship('Order', backref='customer', lazy=True)
 
+    @validates('phone')
+    def _normalize_phone(self, key, phone):
+        self.phone_normalized = normalize_phone(phone)
+        return phone
+
+# Orders in these statuses hold their units for the delivery/return window.
+RESERVING_STATUSES = ('pending', 'approved')
+RESERVING_SQL = "status IN ('pending', 'approved')"
+
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_created_id', 'created_at', 'id'),              # listings, reports
+        db.Index('ix_orders_staff_created_id', 'staff_id', 'created_at', 'id'),  # staff listing
+        # dashboards: covers the status counts and revenue sums per staff member
+        db.Index('ix_orders_staff_status', 'staff_id', 'status', 'total_amount', 'price', 'quantity'),
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+        db.Index('ix_orders_customer', 'customer_id'),
+        db.Index('ix_orders_delivery', 'delivery_datetime'),
+        db.Index('ix_orders_return', 'return_datetime'),
+        # availability: rentals still holding stock, by product and window end
+        db.Index('ix_orders_active_window', 'product_name', 'return_datetime', 'delivery_datetime', 'quantity',
+                 sqlite_where=db.text(RESERVING_SQL), postgresql_where=db.text(RESERVING_SQL)),
+    )
     id = db.Column(db.Integer, primary_key=True)
     product_name = db.Column(db.String(200), nullable=False)
     product_details = db.Column(db.Text)
     price = db.Column(db.Float, default=0.0)
     quantity = db.Column(db.Integer, default=1)
-    photos_json = db.Column(db.Text)  # store JSON list of filenames
+    photos_json = db.Column(db.Text)  # legacy JSON list of filenames; superseded by OrderPhoto rows
     delivery_datetime = db.Column(db.DateTime)
     return_datetime = db.Column(db.DateTime)
     amount_advance = db.Column(db.Float, default=0.0)
@@ -55,11 +104,129 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    photos = db.relationship('OrderPhoto', backref='order', lazy=True, order_by='OrderPhoto.position',
+                             cascade='all, delete-orphan')
+
+    def add_photo(self, filename):
+        """Append a stored upload as the order's next photo (no-op if already attached)."""
+        if any(p.filename == filename for p in self.photos):
+            return None
+        position = max((p.position for p in self.photos), default=-1) + 1
+        photo = OrderPhoto(filename=filename, position=position, **image_info(filename))
+        self.photos.append(photo)
+        return photo
+
     def set_photos(self, filenames):
-        self.photos_json = json.dumps(filenames)
+        """Replace all photos (compatibility with the old JSON column)."""
+        self.photos = []
+        for name in filenames:
+            self.add_photo(name)
+
+    def get_photos(self, variant=None):
+        """Stored photo filenames, or the filenames of a variant ('full', 'thumb')."""
+        names = [p.filename for p in self.photos]
+        if variant:
+            return [variant_name(n, variant) for n in names]
+        return names
+
+
+class OrderPhoto(db.Model):
+    __tablename__ = 'order_photos'
+    __table_args__ = (
+        db.Index('ix_order_photos_order_position', 'order_id', 'position'),
+        db.Index('ix_order_photos_hash', 'content_hash'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    position = db.Column(db.Integer, default=0, nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    byte_size = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64))  # sha256 of the stored file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class OrderRollup(db.Model):
+    """
+    Per-day totals of orders by staff member and status, kept in step with
+    the orders table by app.rollups. total_amount uses the same fallback as
+    the templates (price * quantity when total_amount is unset).
+    """
+    __tablename__ = 'order_rollups'
+    __table_args__ = (
+        db.Index('ix_order_rollups_staff_day', 'staff_id', 'day'),
+    )
+    day = db.Column(db.Date, primary_key=True)
+    staff_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(30), primary_key=True)
+    order_count = db.Column(db.Integer, default=0, nullable=False)
+    total_amount = db.Column(db.Float, default=0.0, nullable=False)
+    amount_advance = db.Column(db.Float, default=0.0, nullable=False)
+    amount_pending = db.Column(db.Float, default=0.0, nullable=False)
 
-    def get_photos(self):
+
+class OrderEvent(db.Model):
+    """
+    Append-only change feed of orders (app.events): one row per order
+    created, edited or changing status. The id orders the feed and is the
+    SSE event id clients resume from.
+    """
+    __tablename__ = 'order_events'
+    __table_args__ = (
+        db.Index('ix_order_events_created', 'created_at'),
+        # ids must never be reused, even after prune_events() empties the table
+        {'sqlite_autoincrement': True},
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)  # no FK: events outlive deleted orders
+    kind = db.Column(db.String(20), nullable=False)   # created, updated, status, deleted
+    status = db.Column(db.String(30))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Product(db.Model):
+    """Rentable item with the number of units in stock; orders refer to it by product_name."""
+    __tablename__ = 'products'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), unique=True, nullable=False)
+    stock = db.Column(db.Integer, default=1, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class Job(db.Model):
+    """Background job (bulk report / bill export) run by `flask run-jobs` workers."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    params_json = db.Column(db.Text)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, failed, expired
+    progress = db.Column(db.Integer, default=0)  # percent
+    message = db.Column(db.String(255))
+    artifact_path = db.Column(db.String(255))
+    artifact_name = db.Column(db.String(255))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    worker = db.Column(db.String(80))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+    def get_params(self):
         try:
-            return json.loads(self.photos_json) if self.photos_json else []
-        except:
-            return []
+            return json.loads(self.params_json) if self.params_json else {}
+        except ValueError:
+            return {}
+
+
+class JobArtifactChunk(db.Model):
+    """Part of a job's result file, for workers that do not share a disk with the web service."""
+    __tablename__ = 'job_artifact_chunks'
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    data = db.Column(db.LargeBinary, nullable=False)
@@ -0,0 +1,44 @@
+"""
+Bounded executor for blocking work done on behalf of a request.
+
+Photo ingestion (decode, EXIF transpose, resize, encode, write) runs on a
+small thread pool shared by the worker process. A request with several
+photos processes them in parallel (Pillow releases the GIL while it works),
+and the number of images being decoded at once stays capped at
+OFFLOAD_THREADS per process however many server threads are uploading.
+OFFLOAD_THREADS = 0 runs everything inline. Bill PDFs go to the process
+pool in app.bills instead, since xhtml2pdf holds the GIL.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+_executor = None
+_executor_threads = None
+_lock = threading.Lock()
+
+
+def _pool(threads):
+    global _executor, _executor_threads
+    with _lock:
+        if _executor is None or _executor_threads != threads:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='offload')
+            _executor_threads = threads
+        return _executor
+
+
+def run_all(fn, items):
+    """fn(item) for every item on the offload pool, inside the current app context. Results in order."""
+    items = list(items)
+    threads = current_app.config.get('OFFLOAD_THREADS', 0)
+    if threads <= 0 or not items:
+        return [fn(item) for item in items]
+    app = current_app._get_current_object()
+
+    def call(item):
+        with app.app_context():
+            return fn(item)
+
+    return list(_pool(threads).map(call, items))
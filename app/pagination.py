@@ -0,0 +1,81 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page:
+    """One page of a keyset-paginated listing plus the cursors around it."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, per_page=DEFAULT_PAGE_SIZE):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) or None if the cursor is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        stamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size_arg(args, default=DEFAULT_PAGE_SIZE):
+    """Read ?per_page= from request args, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(args.get('per_page', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_paginate(query, created_col, id_col, per_page=DEFAULT_PAGE_SIZE, after=None, before=None):
+    """
+    Paginate query newest-first on (created_col, id_col) without OFFSET.
+    `after` fetches the page following a cursor, `before` the page preceding it,
+    so any page costs one index range scan of per_page + 1 rows.
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    if before_key is not None:
+        stamp, row_id = before_key
+        query = query.filter(or_(created_col > stamp, and_(created_col == stamp, id_col > row_id)))
+        rows = query.order_by(created_col.asc(), id_col.asc()).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_prev, has_next = has_more, True
+    else:
+        if after_key is not None:
+            stamp, row_id = after_key
+            query = query.filter(or_(created_col < stamp, and_(created_col == stamp, id_col < row_id)))
+        rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after_key is not None
+
+    def key(row):
+        return encode_cursor(getattr(row, created_col.key), getattr(row, id_col.key))
+
+    next_cursor = key(rows[-1]) if rows and has_next else None
+    prev_cursor = key(rows[0]) if rows and has_prev else None
+    return Page(rows, next_cursor=next_cursor, prev_cursor=prev_cursor, per_page=per_page)
@@ -0,0 +1,229 @@
+"""
+Opt-in request profiling (PROFILING=1).
+
+For every request this records wall time, the number and total time of SQL
+statements (SQLAlchemy engine events) and template render time (Flask's
+template signals). The figures go out as a Server-Timing header and into a
+rolling per-endpoint store that backs /admin/stats (JSON) and /metrics
+(Prometheus text format). A statement shape repeated more than
+PROFILING_N_PLUS_ONE times in one request is logged as a likely N+1.
+Process-wide counters (e.g. the user cache's hits and misses) are added
+with Profiler.add_counter and reported alongside.
+
+When PROFILING is off nothing is registered, so requests pay nothing.
+Stats are per process; with several workers each reports its own.
+Streamed response bodies are not included in the wall time.
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from app import db
+
+_NUMBER_RE = re.compile(r'\b\d+(\.\d+)?\b')
+_PLACEHOLDERS_RE = re.compile(r'\((\s*(\?|%\(\w+\)s|:\w+)\s*,?)+\)')
+
+
+def statement_shape(statement):
+    """Statement text with literals and IN-list lengths collapsed, for N+1 grouping."""
+    shape = _NUMBER_RE.sub('N', statement)
+    shape = _PLACEHOLDERS_RE.sub('(?)', shape)
+    return ' '.join(shape.split())
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class EndpointStats:
+    """Totals since start plus the last `window` request durations of one endpoint."""
+
+    def __init__(self, window):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.n_plus_one = 0
+        self.last_n_plus_one = None
+        self.durations = deque(maxlen=window)
+
+    def as_dict(self):
+        durations = sorted(self.durations)
+        n = max(self.requests, 1)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'p50_ms': round(_percentile(durations, 50) * 1000, 2),
+            'p95_ms': round(_percentile(durations, 95) * 1000, 2),
+            'p99_ms': round(_percentile(durations, 99) * 1000, 2),
+            'mean_sql_statements': round(self.sql_statements / n, 2),
+            'mean_sql_ms': round(self.sql_seconds / n * 1000, 2),
+            'mean_template_ms': round(self.template_seconds / n * 1000, 2),
+            'n_plus_one': self.n_plus_one,
+            'last_n_plus_one': self.last_n_plus_one,
+        }
+
+
+class Profiler:
+    def __init__(self, window=500, n_plus_one=10):
+        self.window = window
+        self.n_plus_one = n_plus_one
+        self.endpoints = {}
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add_counter(self, name, help_text, read):
+        """Report read() as the counter `name` in snapshots and /metrics."""
+        self.counters[name] = (help_text, read)
+
+    def record(self, endpoint, profile, elapsed, status):
+        repeated = [(shape, count) for shape, count in profile['shapes'].items() if count > self.n_plus_one]
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats(self.window)
+            stats.requests += 1
+            stats.errors += status >= 500
+            stats.seconds += elapsed
+            stats.sql_statements += profile['sql_count']
+            stats.sql_seconds += profile['sql_time']
+            stats.template_seconds += profile['template_time']
+            stats.durations.append(elapsed)
+            if repeated:
+                stats.n_plus_one += 1
+                shape, count = max(repeated, key=lambda item: item[1])
+                stats.last_n_plus_one = {'statement': shape[:300], 'count': count}
+        return repeated
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {name: stats.as_dict() for name, stats in sorted(self.endpoints.items())}
+        counters = {name: read() for name, (_, read) in sorted(self.counters.items())}
+        return {'uptime_seconds': round(time.time() - self.started, 1),
+                'n_plus_one_threshold': self.n_plus_one, 'endpoints': endpoints, 'counters': counters}
+
+    def prometheus(self):
+        """Render the stats in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            rows = [(name, stats, sorted(stats.durations)) for name, stats in items]
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if labels else f"{name}{suffix} {value}")
+
+        def per_endpoint(attr):
+            return [('', {'endpoint': name}, round(getattr(stats, attr), 6)) for name, stats, _ in rows]
+
+        summary = []
+        for name, stats, durations in rows:
+            for q in (0.5, 0.95, 0.99):
+                summary.append(('', {'endpoint': name, 'quantile': str(q)},
+                                round(_percentile(durations, q * 100), 6)))
+            summary.append(('_sum', {'endpoint': name}, round(stats.seconds, 6)))
+            summary.append(('_count', {'endpoint': name}, stats.requests))
+
+        metric('http_request_duration_seconds', 'summary',
+               'Request wall time; quantiles cover the recent window.', summary)
+        metric('http_request_errors_total', 'counter', 'Responses with a 5xx status.', per_endpoint('errors'))
+        metric('db_statements_total', 'counter', 'SQL statements executed.', per_endpoint('sql_statements'))
+        metric('db_statement_seconds_total', 'counter', 'Time spent in SQL statements.',
+               per_endpoint('sql_seconds'))
+        metric('template_render_seconds_total', 'counter', 'Time spent rendering templates.',
+               per_endpoint('template_seconds'))
+        metric('n_plus_one_requests_total', 'counter',
+               'Requests that repeated one statement shape more than the threshold.', per_endpoint('n_plus_one'))
+        for name, (help_text, read) in sorted(self.counters.items()):
+            metric(name, 'counter', help_text, [('', {}, read())])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _current():
+    return g.get('_profile') if has_request_context() else None
+
+
+def init_profiling(app):
+    """Register the request, SQL and template hooks when PROFILING is set."""
+    if not app.config.get('PROFILING'):
+        return None
+    profiler = Profiler(window=app.config.get('PROFILING_WINDOW', 500),
+                        n_plus_one=app.config.get('PROFILING_N_PLUS_ONE', 10))
+    app.extensions['profiler'] = profiler
+
+    from app.sessions import cache_stats
+    profiler.add_counter('user_cache_hits_total', 'Logged-in user loads served from the cache.',
+                         lambda: cache_stats()['hits'])
+    profiler.add_counter('user_cache_misses_total', 'Logged-in user loads that queried the database.',
+                         lambda: cache_stats()['misses'])
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profile_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['_profile_start'].pop()
+        profile = _current()
+        if profile is not None:
+            profile['sql_count'] += 1
+            profile['sql_time'] += elapsed
+            profile['shapes'][statement_shape(statement)] += 1
+
+    def _template_start(sender, template, context, **extra):
+        profile = _current()
+        if profile is not None:
+            profile['template_stack'].append(time.perf_counter())
+
+    def _template_done(sender, template, context, **extra):
+        profile = _current()
+        if profile is not None and profile['template_stack']:
+            elapsed = time.perf_counter() - profile['template_stack'].pop()
+            if not profile['template_stack']:  # count nested renders once
+                profile['template_time'] += elapsed
+
+    before_render_template.connect(_template_start, app, weak=False)
+    template_rendered.connect(_template_done, app, weak=False)
+
+    @app.before_request
+    def _start_profile():
+        g._profile = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+                      'template_time': 0.0, 'template_stack': [], 'shapes': Counter()}
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        elapsed = time.perf_counter() - profile['start']
+        endpoint = request.endpoint or 'unmatched'
+        repeated = profiler.record(endpoint, profile, elapsed, response.status_code)
+        for shape, count in repeated:
+            app.logger.warning('Possible N+1 in %s: %d x %s', endpoint, count, shape[:200])
+        response.headers['Server-Timing'] = ', '.join([
+            f"app;dur={elapsed * 1000:.1f}",
+            f"sql;dur={profile['sql_time'] * 1000:.1f};desc=\"{profile['sql_count']} queries\"",
+            f"tpl;dur={profile['template_time'] * 1000:.1f}",
+        ])
+        return response
+
+    return profiler
@@ -0,0 +1,81 @@
+"""
+Query-plan regression checks for the hot query shapes.
+
+Each check builds the same statement the app issues and asserts that the
+database plans it through the expected index. tests/test_query_plans.py
+runs them against a fresh and a migrated database; `flask
+check-query-plans` runs them against the configured one and exits
+non-zero if any check fails.
+"""
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app import db
+from app.models import Customer, Order
+from app.stats import summary_query
+from app.availability import overlap_stmt
+from app.customers import lookup_stmt
+
+_STAMP = datetime(2025, 1, 1)
+
+
+def hot_queries():
+    """(name, statement, expected index) for every hot query shape."""
+    newest_first = (Order.created_at.desc(), Order.id.desc())
+    return [
+        ('staff dashboard summary', summary_query(staff_id=1),
+         'ix_order_rollups_staff_day'),
+        ('staff order listing', Order.query.filter(Order.staff_id == 1).order_by(*newest_first).limit(51),
+         'ix_orders_staff_created_id'),
+        ('admin order listing, next page', Order.query.filter(
+            or_(Order.created_at < _STAMP, and_(Order.created_at == _STAMP, Order.id < 10))
+         ).order_by(*newest_first).limit(51),
+         'ix_orders_created_id'),
+        ('report date range', Order.query.filter(
+            Order.created_at >= _STAMP, Order.created_at < datetime(2025, 2, 1)
+         ).order_by(Order.created_at.asc()),
+         'ix_orders_created_id'),
+        ('orders by status', Order.query.filter(Order.status == 'pending').order_by(Order.created_at.desc()),
+         'ix_orders_status_created'),
+        ('orders by customer', Order.query.filter(Order.customer_id == 1),
+         'ix_orders_customer'),
+        ('customer phone lookup', Customer.query.filter_by(phone_normalized='9876543210'),
+         'ix_customers_phone_normalized'),
+        ('customer autocomplete, phone', lookup_stmt('98765'), 'ix_customers_phone_normalized'),
+        ('customer autocomplete, name', lookup_stmt('ravi'), 'ix_customers_name_lower'),
+        ('API customer listing, next page', Customer.query.filter(
+            or_(Customer.created_at < _STAMP, and_(Customer.created_at == _STAMP, Customer.id < 10))
+         ).order_by(Customer.created_at.desc(), Customer.id.desc()).limit(51),
+         'ix_customers_created_id'),
+        ('availability window', overlap_stmt(['Saree'], _STAMP, datetime(2025, 1, 8)),
+         'ix_orders_active_window'),
+    ]
+
+
+def explain(query):
+    """Return the plan for a Query/statement as a list of text lines."""
+    stmt = getattr(query, 'statement', query)
+    conn = db.session.connection()
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})  # expand IN lists
+    if compiled.positional:
+        params = tuple(compiled.params[k] for k in compiled.positiontup)
+    else:
+        params = compiled.params
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + compiled.string, params)
+        return [row[-1] for row in rows]
+    if conn.dialect.name == 'postgresql':
+        # tiny tables make a seq scan cheapest; ask whether an index path exists at all
+        conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    return [row[0] for row in conn.exec_driver_sql('EXPLAIN ' + compiled.string, params)]
+
+
+def check_query_plans():
+    """Run every check. Returns a list of (name, expected_index, ok, plan_lines)."""
+    results = []
+    try:
+        for name, query, index in hot_queries():
+            plan = explain(query)
+            results.append((name, index, any(index in line for line in plan), plan))
+    finally:
+        db.session.rollback()
+    return results
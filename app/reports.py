@@ -0,0 +1,168 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.orm import joinedload
+from app import db
+from app.database import read_bind
+from app.models import User, Customer, Order
+
+REPORT_HEADER = ['Order ID', 'Created', 'Staff', 'Customer', 'Phone', 'Product', 'Price', 'Quantity',
+                 'Total', 'Advance', 'Pending', 'Status', 'Delivery', 'Return']
+
+BATCH_SIZE = 1000
+
+
+def report_range(args):
+    """
+    Resolve report query args into (start, end, label), end exclusive.
+    label is the date part of the download filename.
+      type=daily&date=YYYY-MM-DD
+      type=monthly&date=YYYY-MM
+      type=range&start=YYYY-MM-DD&end=YYYY-MM-DD   (end inclusive)
+    Returns None when the args are missing or invalid.
+    """
+    typ = args.get('type', 'daily')
+    date = args.get('date')
+    try:
+        if typ == 'daily' and date:
+            start = datetime.combine(datetime.strptime(date, '%Y-%m-%d').date(), datetime.min.time())
+            return start, start + timedelta(days=1), date
+        if typ == 'monthly' and date:
+            start = datetime.strptime(date, '%Y-%m')
+            if start.month == 12:
+                end = datetime(start.year + 1, 1, 1)
+            else:
+                end = datetime(start.year, start.month + 1, 1)
+            return start, end, date
+        if typ == 'range' and args.get('start') and args.get('end'):
+            start = datetime.strptime(args['start'], '%Y-%m-%d')
+            end = datetime.strptime(args['end'], '%Y-%m-%d') + timedelta(days=1)
+            if end <= start:
+                return None
+            return start, end, f"{args['start']}_{args['end']}"
+    except ValueError:
+        return None
+    return None
+
+
+def _report_select():
+    return select(
+        Order.id, Order.created_at, User.username, Customer.name, Customer.phone,
+        Order.product_name, Order.price, Order.quantity, Order.total_amount,
+        Order.amount_advance, Order.amount_pending, Order.status,
+        Order.delivery_datetime, Order.return_datetime,
+    ).outerjoin(User, User.id == Order.staff_id) \
+     .outerjoin(Customer, Customer.id == Order.customer_id)
+
+
+def _after(key):
+    stamp, row_id = key
+    return or_(Order.created_at > stamp, and_(Order.created_at == stamp, Order.id > row_id))
+
+
+def report_rows(start, end, batch_size=BATCH_SIZE):
+    """
+    Yield plain row tuples for orders created in [start, end), oldest first.
+    Staff and customer are joined in the same statement and rows are fetched
+    in batches (server-side cursor where the driver supports it).
+    """
+    stmt = _report_select() \
+        .where(Order.created_at >= start, Order.created_at < end) \
+        .order_by(Order.created_at.asc(), Order.id.asc()) \
+        .execution_options(yield_per=batch_size)
+
+    for row in db.session.execute(stmt, bind_arguments=read_bind()):
+        yield row
+
+
+def report_batches(start, end, batch_size=BATCH_SIZE):
+    """
+    Like report_rows, but yields lists of rows from separate keyset queries,
+    so no read cursor stays open between batches and callers can commit
+    (e.g. job progress) in between.
+    """
+    key = None
+    while True:
+        stmt = _report_select().where(Order.created_at >= start, Order.created_at < end)
+        if key is not None:
+            stmt = stmt.where(_after(key))
+        rows = db.session.execute(stmt.order_by(Order.created_at.asc(), Order.id.asc()).limit(batch_size),
+                                  bind_arguments=read_bind()).all()
+        if not rows:
+            return
+        yield rows
+        key = (rows[-1][1], rows[-1][0])
+
+
+def order_batches(start, end, batch_size=BATCH_SIZE):
+    """Orders created in [start, end) with customer loaded, as keyset-paginated lists."""
+    key = None
+    while True:
+        stmt = select(Order).options(joinedload(Order.customer)) \
+            .where(Order.created_at >= start, Order.created_at < end)
+        if key is not None:
+            stmt = stmt.where(_after(key))
+        stmt = stmt.order_by(Order.created_at.asc(), Order.id.asc()).limit(batch_size)
+        orders = db.session.execute(stmt, bind_arguments=read_bind()).scalars().unique().all()
+        if not orders:
+            return
+        yield orders
+        key = (orders[-1].created_at, orders[-1].id)
+
+
+def count_orders(start, end):
+    stmt = select(func.count(Order.id)).where(Order.created_at >= start, Order.created_at < end)
+    return db.session.execute(stmt, bind_arguments=read_bind()).scalar()
+
+
+def _fmt_dt(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def format_report_row(row):
+    (order_id, created_at, username, customer_name, phone, product_name, price, quantity,
+     total_amount, advance, pending, status, delivery, ret) = row
+    price = price or 0.0
+    quantity = quantity or 0
+    return [
+        order_id,
+        _fmt_dt(created_at),
+        username or '',
+        customer_name or '',
+        phone or '',
+        product_name,
+        f"{price:.2f}",
+        quantity,
+        f"{total_amount:.2f}" if total_amount else f"{(price * quantity):.2f}",
+        f"{advance or 0.0:.2f}",
+        f"{pending or 0.0:.2f}",
+        status,
+        _fmt_dt(delivery),
+        _fmt_dt(ret),
+    ]
+
+
+def iter_report_csv(start, end, batch_size=BATCH_SIZE, rows=None):
+    """
+    Generate the CSV report as text chunks of roughly batch_size rows each.
+    `rows` overrides the default report_rows(start, end) source.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(REPORT_HEADER)
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+
+    pending = 0
+    for row in rows if rows is not None else report_rows(start, end, batch_size):
+        writer.writerow(format_report_row(row))
+        pending += 1
+        if pending >= batch_size:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if pending:
+        yield buf.getvalue()
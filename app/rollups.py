@@ -0,0 +1,247 @@
+"""
+Daily order rollups.
+
+order_rollups holds one row per (day, staff_id, status) with the order count
+and the sums of total_amount, amount_advance and amount_pending. An
+after_flush hook applies the difference each flushed order makes (new,
+edited, status change, deleted) as an upsert, so dashboards and monthly
+summaries read O(days) rows instead of scanning orders. Writes that bypass
+the ORM must keep the rollup in step themselves: add_orders() for inserted
+rows, a `with tracking(conn, condition)` block
+around Core UPDATEs, or rebuild_rollups(), which also backs the
+`flask rebuild-rollups` command.
+
+An order field assigned while expired or unloaded keeps no history of its
+old value, so a before_flush hook reads the stored row of such orders
+first (_load_stored).
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from sqlalchemy import Date, cast, delete, event, func, insert, inspect, select
+from sqlalchemy.orm import NO_VALUE, Session
+from app import db
+from app.database import read_bind
+from app.models import Order, OrderRollup
+
+SUMS = ('order_count', 'total_amount', 'amount_advance', 'amount_pending')
+_FIELDS = ('created_at', 'staff_id', 'status', 'total_amount', 'price', 'quantity',
+           'amount_advance', 'amount_pending')
+
+# Same fallback the templates use: total_amount or (price * quantity)
+order_total = func.coalesce(func.nullif(Order.total_amount, 0), Order.price * Order.quantity)
+
+
+def _day(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])  # SQLite's date() returns text
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _contribution(values):
+    """(key, sums) one order adds to the rollup, from a dict of its field values."""
+    if values['created_at'] is None:
+        return None
+    total = values['total_amount'] or (values['price'] or 0.0) * (values['quantity'] or 0)
+    key = (_day(values['created_at']), values['staff_id'] or 0, values['status'] or 'pending')
+    return key, (1, total or 0.0, values['amount_advance'] or 0.0, values['amount_pending'] or 0.0)
+
+
+def _values(obj, committed, stored=None):
+    """Current field values of an order, or the values it had before this flush (`stored`, if read)."""
+    if committed and stored is not None:
+        return dict(stored)
+    state = inspect(obj)
+    values = {}
+    for name in _FIELDS:
+        value = getattr(obj, name)
+        if committed:
+            hist = state.attrs[name].history
+            if hist.deleted:
+                value = hist.deleted[0]
+            elif hist.added:
+                value = None
+        values[name] = value
+    return values
+
+
+def _changed(obj):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _FIELDS)
+
+
+def apply_deltas(conn, deltas):
+    """Add {(day, staff_id, status): [count, total, advance, pending]} to the rollup rows."""
+    rows = [dict(zip(('day', 'staff_id', 'status') + SUMS, key + tuple(sums)))
+            for key, sums in deltas.items() if any(sums)]
+    if not rows:
+        return
+    table = OrderRollup.__table__
+    if conn.dialect.name in ('sqlite', 'postgresql'):
+        if conn.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.staff_id, table.c.status],
+            set_={name: table.c[name] + stmt.excluded[name] for name in SUMS})
+        conn.execute(stmt, rows)
+        return
+    for row in rows:
+        match = (table.c.day == row['day']) & (table.c.staff_id == row['staff_id']) & \
+                (table.c.status == row['status'])
+        result = conn.execute(table.update().where(match).values(
+            {name: table.c[name] + row[name] for name in SUMS}))
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(row))
+
+
+def _history_lost(state):
+    return any(name not in state.dict or state.committed_state.get(name) is NO_VALUE for name in _FIELDS)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_stored(session, flush_context, instances):
+    """Read the stored rollup fields of updated or deleted orders whose old values are not in memory."""
+    ids = [inspect(obj).identity[0] for obj in list(session.dirty) + list(session.deleted)
+           if isinstance(obj, Order) and inspect(obj).has_identity and _history_lost(inspect(obj))]
+    stored = {}
+    if ids:
+        columns = [getattr(Order, name) for name in _FIELDS]
+        with session.no_autoflush:
+            for row in session.execute(select(Order.id, *columns).where(Order.id.in_(ids))):
+                stored[row[0]] = dict(zip(_FIELDS, row[1:]))
+    session.info['rollup_stored'] = stored
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_rollups(session, flush_context):
+    """Apply the rollup changes of every order inserted, updated or deleted in this flush."""
+    stored = session.info.pop('rollup_stored', {})
+    deltas = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+
+    def add(contribution, sign):
+        if contribution is None:
+            return
+        key, sums = contribution
+        for i, value in enumerate(sums):
+            deltas[key][i] += sign * value
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            add(_contribution(_values(obj, committed=False)), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Order) and _changed(obj):
+            add(_contribution(_values(obj, committed=True, stored=stored.get(obj.id))), -1)
+            add(_contribution(_values(obj, committed=False)), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            add(_contribution(_values(obj, committed=True, stored=stored.get(obj.id))), -1)
+
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def add_orders(conn, rows):
+    """Count newly inserted orders (dicts of column values) into the rollup."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    for row in rows:
+        contribution = _contribution(defaultdict(lambda: None, row))
+        if contribution is not None:
+            key, sums = contribution
+            for i, value in enumerate(sums):
+                deltas[key][i] += value
+    apply_deltas(conn, deltas)
+
+
+def _rollup_select(conn):
+    if conn.dialect.name == 'sqlite':
+        day = func.date(Order.created_at)
+    else:
+        day = cast(Order.created_at, Date)
+    return select(
+        day, func.coalesce(Order.staff_id, 0), func.coalesce(Order.status, 'pending'),
+        func.count(Order.id), func.coalesce(func.sum(order_total), 0.0),
+        func.coalesce(func.sum(Order.amount_advance), 0.0), func.coalesce(func.sum(Order.amount_pending), 0.0),
+    ).where(Order.created_at.isnot(None)).group_by(day, Order.staff_id, Order.status)
+
+
+def _grouped(conn, condition):
+    return {(_day(r[0]), r[1], r[2]): r[3:] for r in conn.execute(_rollup_select(conn).where(condition))}
+
+
+@contextmanager
+def tracking(conn, condition):
+    """
+    Apply to the rollup whatever the Core statements run inside the block
+    do to the orders matching `condition` (which must still match them
+    afterwards, e.g. an id list).
+    """
+    before = _grouped(conn, condition)
+    yield
+    after = _grouped(conn, condition)
+    zero = (0, 0.0, 0.0, 0.0)
+    apply_deltas(conn, {key: [(new or 0) - (old or 0) for new, old in zip(after.get(key, zero), before.get(key, zero))]
+                        for key in set(before) | set(after)})
+
+
+def rebuild_rollups(conn=None):
+    """Recompute every rollup row from orders. Returns the number of rows written."""
+    if conn is None:
+        conn = db.session.connection()
+        rows = _rebuild(conn)
+        db.session.commit()
+        return rows
+    return _rebuild(conn)
+
+
+def _rebuild(conn):
+    table = OrderRollup.__table__
+    conn.execute(delete(table))
+    conn.execute(insert(table).from_select(['day', 'staff_id', 'status'] + list(SUMS), _rollup_select(conn)))
+    return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def rollup_drift(tolerance=0.005):
+    """Keys whose stored rollup differs from a fresh aggregate of orders (for reconciliation)."""
+    conn = db.session.connection()
+    expected = {(str(r[0]), r[1], r[2]): r[3:] for r in conn.execute(_rollup_select(conn))}
+    table = OrderRollup.__table__
+    stored = {(str(r[0]), r[1], r[2]): r[3:] for r in conn.execute(
+        select(table.c.day, table.c.staff_id, table.c.status, *[table.c[name] for name in SUMS]))}
+    drift = []
+    for key in set(expected) | set(stored):
+        a = expected.get(key, (0, 0.0, 0.0, 0.0))
+        b = stored.get(key, (0, 0.0, 0.0, 0.0))
+        if any(abs((x or 0) - (y or 0)) > tolerance for x, y in zip(a, b)):
+            drift.append(key)
+    return sorted(drift)
+
+
+def daily_totals(start, end, staff_id=None):
+    """
+    One dict per day in [start, end) with order count, completed revenue and
+    the advance/pending sums, read from the rollup. Days without orders are
+    included with zeros.
+    """
+    start, end = _day(start), _day(end)
+    r = OrderRollup
+    stmt = select(
+        r.day, func.sum(r.order_count),
+        func.sum(db.case((r.status == 'completed', r.total_amount), else_=0)),
+        func.sum(r.amount_advance), func.sum(r.amount_pending),
+    ).where(r.day >= start, r.day < end)
+    if staff_id is not None:
+        stmt = stmt.where(r.staff_id == staff_id)
+    rows = db.session.execute(stmt.group_by(r.day), bind_arguments=read_bind())
+    found = {_day(row[0]): row[1:] for row in rows}
+
+    days = []
+    day = start
+    while day < end:
+        count, revenue, advance, pending = found.get(day, (0, 0.0, 0.0, 0.0))
+        days.append({'day': day, 'orders': count or 0, 'revenue': float(revenue or 0.0),
+                     'advance': float(advance or 0.0), 'pending': float(pending or 0.0)})
+        day += timedelta(days=1)
+    return days
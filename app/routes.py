@@ -1,20 +1,51 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_file, make_response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_file, Response, stream_with_context, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
 from werkzeug.security import generate_password_hash
 from app import db
-from app.models import User, Customer, Order
-from app.forms import LoginForm, CreateStaffForm, CustomerOrderForm
-from app.utils import save_upload, parse_datetime_str
-import os, io, csv, json, zipfile
+from app.models import User, Customer, Order, OrderPhoto, Product, Job, RESERVING_STATUSES
+from app.forms import LoginForm, CreateStaffForm, CustomerOrderForm, ProductForm, OrderImportForm, BatchStatusForm
+from app.utils import save_uploads, send_upload, parse_datetime_str
+from app.stats import order_summary, staff_performance
+from app.pagination import Page, keyset_paginate, page_size_arg
+from app.search import filter_orders, filter_created, ranked_order_ids
+from app.reports import report_range, iter_report_csv
+from app.analytics import SECTIONS as ANALYTICS_SECTIONS, rental_analytics
+from app.rollups import daily_totals
+from app.bills import get_bill_pdf, render_bill_html, iter_bills_zip, bill_renderer, renderer_available
+from app.availability import free_units, overbooking_error, availability_calendar
+from app.cache import cached, conditional
+from app.bulk import BATCH_ACTIONS, IMPORT_FIELDS, import_orders, read_rows, set_status
+from app.customers import assign_customer, customer_for, lookup_customers
+from app.events import acquire_stream, event_stream, parse_cursor
+from app import jobs
+from sqlalchemy.orm import joinedload, load_only, selectinload
+import os, io, json
 from datetime import datetime, timedelta
-try:
-    from xhtml2pdf import pisa
-    XHTML2PDF_AVAILABLE = True
-except Exception:
-    XHTML2PDF_AVAILABLE = False
 
 bp = Blueprint('main', __name__)
 
+
+def _order_listing_query(photos=False):
+    """Orders with staff and customer eager-loaded, restricted to the columns list pages render."""
+    query = Order.query.options(
+        load_only(Order.id, Order.created_at, Order.product_name, Order.price, Order.quantity,
+                  Order.total_amount, Order.status, Order.staff_id, Order.customer_id),
+        joinedload(Order.staff).load_only(User.username, User.full_name),
+        joinedload(Order.customer).load_only(Customer.name, Customer.phone),
+    )
+    if photos:
+        # one extra IN query for the whole page instead of one per row
+        query = query.options(selectinload(Order.photos).load_only(OrderPhoto.filename, OrderPhoto.position))
+    return query
+
+
+def _paginate_orders(query):
+    return keyset_paginate(query, Order.created_at, Order.id,
+                           per_page=page_size_arg(request.args),
+                           after=request.args.get('after'),
+                           before=request.args.get('before'))
+
+
 # --- Auth ---
 @bp.route('/', methods=['GET', 'POST'])
 def auth_login():
@@ -38,41 +69,57 @@ def auth_logout():
     return redirect(url_for('main.auth_login'))
 
 # --- Admin ---
+def _dashboard_data():
+    """Dashboard aggregates as plain (cacheable) data."""
+    summary = order_summary()
+    calendar_days, calendar_rows = availability_calendar()
+    return {
+        'total_orders': summary['total'],
+        'pending': summary['pending'],
+        'approved': summary['approved'],
+        'completed': summary['completed'],
+        'canceled': summary['canceled'],
+        'total_revenue': summary['revenue'],
+        'staff_perf': [dict(p, staff={'username': p['staff'].username}) for p in staff_performance()],
+        'calendar_days': calendar_days,
+        'calendar_rows': [{'product': {'name': r['product'].name, 'stock': r['product'].stock}, 'free': r['free']}
+                          for r in calendar_rows],
+    }
+
 @bp.route('/admin')
 @login_required
+@conditional
 def admin_dashboard():
     if not current_user.is_admin:
         flash('Access denied', 'danger')
         return redirect(url_for('main.staff_dashboard'))
 
-    total_orders = Order.query.count()
-    pending = Order.query.filter_by(status='pending').count()
-    approved = Order.query.filter_by(status='approved').count()
-    completed = Order.query.filter_by(status='completed').count()
-    canceled = Order.query.filter_by(status='canceled').count()
-
-    completed_orders = Order.query.filter_by(status='completed').all()
-    total_revenue = sum([o.total_amount or 0.0 for o in completed_orders])
-
-    staff_perf = []
-    users = User.query.all()
-    for u in users:
-        cnt = Order.query.filter_by(staff_id=u.id).count()
-        approved_cnt = Order.query.filter_by(staff_id=u.id, status='approved').count()
-        revenue = sum([o.total_amount or 0 for o in Order.query.filter_by(staff_id=u.id, status='completed').all()])
-        staff_perf.append({'staff': u, 'orders': cnt, 'approved': approved_cnt, 'revenue': revenue})
-
-    staff_perf = sorted(staff_perf, key=lambda x: x['orders'], reverse=True)
-
-    return render_template('admin/dashboard.html',
-                           total_orders=total_orders,
-                           pending=pending,
-                           approved=approved,
-                           completed=completed,
-                           canceled=canceled,
-                           total_revenue=total_revenue,
-                           staff_perf=staff_perf,
-                           xhtml2pdf=XHTML2PDF_AVAILABLE)
+    # recomputed only after orders, customers, staff or products change (app/cache.py)
+    data = cached(f"dashboard:{datetime.utcnow().date()}", _dashboard_data)
+    return render_template('admin/dashboard.html', xhtml2pdf=renderer_available(bill_renderer()), **data)
+
+@bp.route('/admin/events')
+@login_required
+def admin_events():
+    """
+    Server-sent events for live dashboard / order list updates (app/events.py).
+    Resumes after the Last-Event-ID header or ?last_event_id=.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+    cursor = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    last_id, gaps = cursor or (None, ())
+    release = acquire_stream()
+    if release is None:
+        response = jsonify({'error': 'too many live connections; retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    response = Response(stream_with_context(event_stream(last_id, gaps)), mimetype='text/event-stream')
+    response.call_on_close(release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
 
 @bp.route('/admin/staffs', methods=['GET', 'POST'])
 @login_required
@@ -94,6 +141,70 @@ def admin_staffs():
     staffs = User.query.all()
     return render_template('admin/staffs.html', form=form, staffs=staffs)
 
+@bp.route('/admin/stats')
+@login_required
+def admin_stats():
+    """JSON: rolling per-endpoint timings and query counts (needs PROFILING=1)."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        return jsonify({'error': 'profiling is disabled (set PROFILING=1)'}), 404
+    return jsonify(profiler.snapshot())
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus text format. Scrapers send METRICS_TOKEN as a bearer token; admins may also view it."""
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        return Response('profiling is disabled\n', status=404, mimetype='text/plain')
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    if not authorized and not (current_user.is_authenticated and current_user.is_admin):
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(profiler.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/admin/products', methods=['GET', 'POST'])
+@login_required
+def admin_products():
+    if not current_user.is_admin:
+        flash('Access denied', 'danger')
+        return redirect(url_for('main.staff_dashboard'))
+    form = ProductForm()
+    if form.validate_on_submit():
+        # saving an existing name updates its stock
+        product = Product.query.filter_by(name=form.name.data).first()
+        if product is None:
+            product = Product(name=form.name.data)
+            db.session.add(product)
+        product.stock = form.stock.data
+        product.is_active = form.is_active.data
+        db.session.commit()
+        flash('Product saved', 'success')
+        return redirect(url_for('main.admin_products'))
+    products = Product.query.order_by(Product.name).all()
+    return render_template('admin/products.html', form=form, products=products)
+
+@bp.route('/availability')
+@login_required
+def availability():
+    """JSON: free units of ?product= between ?start= and ?end= (YYYY-MM-DD HH:MM)."""
+    start = parse_datetime_str(request.args.get('start'))
+    end = parse_datetime_str(request.args.get('end'))
+    product = (request.args.get('product') or '').strip()
+    if not product or start is None or end is None or end <= start:
+        return jsonify({'error': 'product, start and end are required'}), 400
+    return jsonify({'product': product, 'free': free_units(product, start, end)})
+
+@bp.route('/customers/lookup')
+@login_required
+def customer_lookup():
+    """JSON autocomplete: customers whose phone or name starts with ?q= (see app/customers.py)."""
+    response = jsonify({'customers': lookup_customers(request.args.get('q'))})
+    response.cache_control.private = True
+    response.cache_control.max_age = 30  # retyping (backspace) reuses the answer
+    return response
+
 @bp.route('/admin/orders')
 @login_required
 def admin_orders():
@@ -102,17 +213,17 @@ def admin_orders():
         return redirect(url_for('main.staff_dashboard'))
 
     q = request.args.get('q', '').strip()
-    if q:
-        orders = Order.query.join(Order.customer).join(Order.staff).filter(
-            (Customer.name.ilike(f"%{q}%")) |
-            (Order.product_name.ilike(f"%{q}%")) |
-            (User.full_name.ilike(f"%{q}%")) |
-            (Order.created_at.cast(db.String).ilike(f"%{q}%"))
-        ).order_by(Order.created_at.desc()).all()
+    query = filter_created(_order_listing_query(photos=True), request.args.get('date_from'), request.args.get('date_to'))
+    if q and request.args.get('sort') == 'relevance':
+        # ranked results are a single page; cursors only apply to the date ordering
+        ids = ranked_order_ids(q, limit=page_size_arg(request.args),
+                               date_from=request.args.get('date_from'), date_to=request.args.get('date_to'))
+        by_id = {o.id: o for o in query.filter(Order.id.in_(ids))}
+        orders = Page([by_id[i] for i in ids if i in by_id], per_page=len(ids))
     else:
-        orders = Order.query.order_by(Order.created_at.desc()).all()
+        orders = _paginate_orders(filter_orders(query, q))
 
-    return render_template('admin/orders.html', orders=orders)
+    return render_template('admin/orders.html', orders=orders, batch_form=BatchStatusForm())
 
 @bp.route('/admin/order/<int:order_id>/view')
 @login_required
@@ -173,6 +284,61 @@ def admin_cancel(order_id):
     return redirect(url_for('main.admin_orders'))
 
 
+@bp.route('/admin/orders/batch', methods=['POST'])
+@login_required
+def admin_orders_batch():
+    """Approve, complete or cancel the selected orders with one UPDATE (form post or JSON)."""
+    if not current_user.is_admin:
+        if request.is_json:
+            return jsonify({'error': 'forbidden'}), 403
+        flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        action, ids = payload.get('action'), payload.get('order_ids')
+        if action not in BATCH_ACTIONS or not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'error': 'expected {"action": "approve|complete|cancel", "order_ids": [ids]}'}), 400
+        return jsonify({'action': action, 'updated': set_status(ids, action)})
+
+    form = BatchStatusForm()
+    ids = request.form.getlist('order_ids', type=int)
+    if not form.validate_on_submit():
+        flash('Invalid batch request', 'danger')
+    elif not ids:
+        flash('No orders selected', 'warning')
+    else:
+        changed = set_status(ids, form.action.data)
+        flash(f"{changed} order(s) {BATCH_ACTIONS[form.action.data]}", 'success')
+    return redirect(url_for('main.admin_orders'))
+
+
+@bp.route('/admin/orders/import', methods=['GET', 'POST'])
+@login_required
+def admin_import_orders():
+    """Create orders in bulk from an uploaded CSV/JSON file, or from a JSON list posted directly."""
+    if not current_user.is_admin:
+        if request.is_json:
+            return jsonify({'error': 'forbidden'}), 403
+        flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
+    if request.is_json:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            return jsonify({'error': 'expected a JSON list of order objects'}), 400
+        return jsonify(import_orders(rows, current_user.id))
+
+    form = OrderImportForm()
+    result = None
+    if form.validate_on_submit():
+        try:
+            rows = read_rows(form.file.data.read(), form.file.data.filename)
+        except ValueError as exc:
+            flash(str(exc), 'danger')
+        else:
+            result = import_orders(rows, current_user.id)
+            flash(f"Imported {result['orders']} order(s) and {result['customers']} new customer(s); "
+                  f"{len(result['errors'])} row(s) skipped", 'warning' if result['errors'] else 'success')
+    return render_template('admin/import.html', form=form, result=result, fields=IMPORT_FIELDS)
+
+
 @bp.route('/admin/order/<int:order_id>/edit', methods=['GET','POST'])
 @login_required
 def admin_edit_order(order_id):
@@ -199,21 +365,22 @@ def admin_edit_order(order_id):
         form.return_datetime.data = order.return_datetime.strftime('%Y-%m-%d %H:%M') if order.return_datetime else ''
         form.amount_advance.data = order.amount_advance
     if form.validate_on_submit():
+        error = None
+        if (request.form.get('status') or order.status) in RESERVING_STATUSES:
+            error = overbooking_error(form.product_name.data, parse_datetime_str(form.delivery_datetime.data),
+                                      parse_datetime_str(form.return_datetime.data), form.quantity.data,
+                                      exclude_order_id=order.id)
+        if error:
+            flash(error, 'danger')
+            return render_template('admin/order_edit.html', form=form, order=order)
+
         # allow admin to change status via form field 'status'
         new_status = request.form.get('status')
         if new_status:
             order.status = new_status
 
-        # update customer
-        if not order.customer:
-            customer = Customer(name=form.customer_name.data, phone=form.phone.data, address=form.address.data)
-            db.session.add(customer)
-            db.session.flush()
-            order.customer_id = customer.id
-        else:
-            order.customer.name = form.customer_name.data
-            order.customer.phone = form.phone.data
-            order.customer.address = form.address.data
+        # update customer (an existing customer's number moves the order to them)
+        assign_customer(order, form.customer_name.data, form.phone.data, form.address.data)
 
         # update order details
         order.product_name = form.product_name.data
@@ -228,13 +395,8 @@ def admin_edit_order(order_id):
         order.amount_pending = (order.total_amount or 0.0) - (order.amount_advance or 0.0)
 
         # handle uploaded photos appended to existing list
-        files = request.files.getlist('photos')
-        filenames = order.get_photos()
-        for f in files:
-            saved = save_upload(f)
-            if saved:
-                filenames.append(saved)
-        order.set_photos(filenames)
+        for saved in save_uploads(request.files.getlist('photos')):
+            order.add_photo(saved)
 
         db.session.commit()
         flash('Order edited', 'success')
@@ -244,34 +406,68 @@ def admin_edit_order(order_id):
 
 @bp.route('/admin/order/<int:order_id>/bill')
 @login_required
+@conditional
 def admin_bill(order_id):
     if not current_user.is_admin:
         flash('Access denied', 'danger')
         return redirect(url_for('main.staff_dashboard'))
 
-    order = Order.query.get_or_404(order_id)
-    company_name = "Neraa Rental House"  # You can change this
-
-    if request.args.get('format') == 'pdf' and XHTML2PDF_AVAILABLE:
-        html = render_template('admin/bill.html', order=order, company_name=company_name, pdf=True)
-        pdf = io.BytesIO()
-        pisa_status = pisa.CreatePDF(html, dest=pdf)
-        if pisa_status.err:
+    renderer = bill_renderer(request.args.get('renderer'))
+    if request.args.get('format') == 'pdf' and renderer_available(renderer):
+        order = Order.query.get_or_404(order_id)
+        pdf = get_bill_pdf(order, renderer)
+        if pdf is None:
             flash('Error generating PDF', 'danger')
-            return render_template('admin/bill.html', order=order, company_name=company_name)
-        pdf.seek(0)
-        return send_file(pdf, mimetype='application/pdf',
+            return render_bill_html(order, pdf=False)
+        return send_file(io.BytesIO(pdf), mimetype='application/pdf',
                          download_name=f"bill_order_{order.id}.pdf", as_attachment=True)
 
-    return render_template('admin/bill.html', order=order, company_name=company_name, pdf=False)
+    # rendered HTML is reused until an order, customer or staff row changes
+    return cached(f"bill:{order_id}", lambda: render_bill_html(Order.query.get_or_404(order_id), pdf=False))
 
 
 @bp.route('/admin/reports')
 @login_required
+@conditional
 def admin_reports():
     if not current_user.is_admin:
         flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
-    return render_template('admin/reports.html', xhtml2pdf=XHTML2PDF_AVAILABLE)
+    month = request.args.get('month') or datetime.utcnow().strftime('%Y-%m')
+    span = report_range({'type': 'monthly', 'date': month})
+    if span is None:
+        month = datetime.utcnow().strftime('%Y-%m')
+        span = report_range({'type': 'monthly', 'date': month})
+    days = cached(f"month_totals:{month}", lambda: daily_totals(span[0], span[1]))
+    totals = {key: sum(d[key] for d in days) for key in ('orders', 'revenue', 'advance', 'pending')}
+    return render_template('admin/reports.html', xhtml2pdf=renderer_available(bill_renderer()),
+                           month=month, days=days, totals=totals)
+
+
+@bp.route('/admin/analytics')
+@bp.route('/admin/analytics/<section>')
+@login_required
+def admin_analytics(section=None):
+    """
+    JSON for the report charts (app/analytics.py): orders created between
+    ?start= and ?end= (YYYY-MM-DD, inclusive; default the last 365 days).
+    /admin/analytics/<section> returns one of weekly, durations, utilisation, aging.
+    """
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+    if section is not None and section not in ANALYTICS_SECTIONS:
+        return jsonify({'error': f"unknown section; use one of {', '.join(ANALYTICS_SECTIONS)}"}), 404
+    today = datetime.utcnow().date()
+    args = {'type': 'range', 'start': request.args.get('start') or (today - timedelta(days=364)).isoformat(),
+            'end': request.args.get('end') or today.isoformat()}
+    span = report_range(args)
+    if span is None:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD with start <= end'}), 400
+    start, end, label = span
+    # aging is measured from today, so entries also turn over daily
+    data = cached(f"analytics:{label}:{today}", lambda: rental_analytics(start, end))
+    if section is not None:
+        return jsonify({'range': data['range'], section: data[section]})
+    return jsonify(data)
 
 
 @bp.route('/admin/reports/download', methods=['GET'])
@@ -280,49 +476,16 @@ def admin_reports_download():
     if not current_user.is_admin:
         flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
 
-    typ = request.args.get('type', 'daily')
-    date = request.args.get('date')
-    rows = []
-    if typ == 'daily' and date:
-        day = datetime.strptime(date, '%Y-%m-%d').date()
-        start = datetime.combine(day, datetime.min.time())
-        end = start + timedelta(days=1)
-    elif typ == 'monthly' and date:
-        dt = datetime.strptime(date, '%Y-%m')
-        start = dt
-        if dt.month == 12:
-            end = datetime(dt.year+1, 1, 1)
-        else:
-            end = datetime(dt.year, dt.month+1, 1)
-    else:
+    report = report_range(request.args)
+    if report is None:
         flash('Invalid parameters', 'danger'); return redirect(url_for('main.admin_reports'))
+    start, end, label = report
 
-    orders = Order.query.filter(Order.created_at >= start, Order.created_at < end).order_by(Order.created_at.asc()).all()
-
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['Order ID','Created','Staff','Customer','Phone','Product','Price','Quantity','Total','Advance','Pending','Status','Delivery','Return'])
-    for o in orders:
-        cw.writerow([
-            o.id,
-            o.created_at.strftime('%Y-%m-%d %H:%M'),
-            o.staff.username if o.staff else '',
-            o.customer.name if o.customer else '',
-            o.customer.phone if o.customer else '',
-            o.product_name,
-            f"{o.price:.2f}",
-            o.quantity,
-            f"{o.total_amount:.2f}" if o.total_amount else f"{(o.price*o.quantity):.2f}",
-            f"{o.amount_advance:.2f}",
-            f"{o.amount_pending:.2f}",
-            o.status,
-            o.delivery_datetime.strftime('%Y-%m-%d %H:%M') if o.delivery_datetime else '',
-            o.return_datetime.strftime('%Y-%m-%d %H:%M') if o.return_datetime else ''
-        ])
-    output = make_response(si.getvalue())
-    filename = f"{typ}_report_{date}.csv"
-    output.headers["Content-Disposition"] = f"attachment; filename={filename}"
-    output.headers["Content-type"] = "text/csv"
+    if request.args.get('background'):
+        return _submit_job('report_csv')
+
+    output = Response(stream_with_context(iter_report_csv(start, end)), mimetype='text/csv')
+    output.headers["Content-Disposition"] = f"attachment; filename={request.args.get('type', 'daily')}_report_{label}.csv"
     return output
 
 
@@ -330,73 +493,107 @@ def admin_reports_download():
 @login_required
 def admin_download_bills():
     """
-    Generate a ZIP of bill PDFs for orders within a day or month.
+    Generate a ZIP of bill PDFs for orders within a day, month or date range.
     Query args:
-      type = 'daily' or 'monthly'
+      type = 'daily', 'monthly' or 'range'
       date = 'YYYY-MM-DD' or 'YYYY-MM'
+      start, end = 'YYYY-MM-DD' (type=range, end inclusive)
     """
     if not current_user.is_admin:
         flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
 
-    if not XHTML2PDF_AVAILABLE:
+    renderer = bill_renderer(request.args.get('renderer'))
+    if not renderer_available(renderer):
         flash('PDF library not available on server', 'danger')
         return redirect(url_for('main.admin_reports'))
 
-    typ = request.args.get('type', 'daily')
-    date = request.args.get('date')
-    if typ == 'daily' and date:
-        day = datetime.strptime(date, '%Y-%m-%d').date()
-        start = datetime.combine(day, datetime.min.time())
-        end = start + timedelta(days=1)
-    elif typ == 'monthly' and date:
-        dt = datetime.strptime(date, '%Y-%m')
-        start = dt
-        if dt.month == 12:
-            end = datetime(dt.year+1, 1, 1)
-        else:
-            end = datetime(dt.year, dt.month+1, 1)
-    else:
+    report = report_range(request.args)
+    if report is None:
         flash('Invalid parameters', 'danger'); return redirect(url_for('main.admin_reports'))
+    start, end, label = report
+
+    if request.args.get('background'):
+        return _submit_job('bills_zip')
 
-    orders = Order.query.filter(Order.created_at >= start, Order.created_at < end).order_by(Order.created_at.asc()).all()
-    if not orders:
+    orders = Order.query.options(joinedload(Order.customer)) \
+        .filter(Order.created_at >= start, Order.created_at < end) \
+        .order_by(Order.created_at.asc(), Order.id.asc())
+    if orders.first() is None:
         flash('No orders found for selected range', 'info')
         return redirect(url_for('main.admin_reports'))
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for o in orders:
-            html = render_template('admin/bill.html', order=o)
-            pdf_io = io.BytesIO()
-            pisa_status = pisa.CreatePDF(io.StringIO(html), dest=pdf_io)
-            if pisa_status.err:
-                continue
-            pdf_io.seek(0)
-            zipf.writestr(f"bill_order_{o.id}.pdf", pdf_io.read())
-    zip_buffer.seek(0)
-    name = f"bills_{typ}_{date}.zip"
-    return send_file(zip_buffer, mimetype='application/zip', download_name=name, as_attachment=True)
+    name = f"bills_{request.args.get('type', 'daily')}_{label}.zip"
+    output = Response(stream_with_context(iter_bills_zip(orders.yield_per(200), renderer)), mimetype='application/zip')
+    output.headers["Content-Disposition"] = f"attachment; filename={name}"
+    return output
+
+def _submit_job(kind):
+    params = request.args.to_dict()
+    params.pop('background', None)
+    job = jobs.submit(kind, params, user_id=current_user.id)
+    flash(f'Job #{job.id} queued. The download will appear here when it is ready.', 'info')
+    return redirect(url_for('main.admin_jobs'))
+
+
+@bp.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    if not current_user.is_admin:
+        flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
+    recent = Job.query.order_by(Job.id.desc()).limit(50).all()
+    return render_template('admin/jobs.html', jobs=recent)
+
+
+@bp.route('/admin/jobs/<int:job_id>')
+@login_required
+def admin_job_status(job_id):
+    if not current_user.is_admin:
+        return jsonify({'error': 'forbidden'}), 403
+    job = Job.query.get_or_404(job_id)
+    return jsonify({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'download': url_for('main.admin_job_download', job_id=job.id) if job.status == 'done' else None,
+    })
+
+
+@bp.route('/admin/jobs/<int:job_id>/download')
+@login_required
+def admin_job_download(job_id):
+    if not current_user.is_admin:
+        flash('Access denied', 'danger'); return redirect(url_for('main.staff_dashboard'))
+    job = Job.query.get_or_404(job_id)
+    if not jobs.artifact_available(job):
+        flash('This download is not available', 'warning')
+        return redirect(url_for('main.admin_jobs'))
+    mimetype = 'application/zip' if job.artifact_name.endswith('.zip') else 'text/csv'
+    if job.artifact_path:
+        return send_file(job.artifact_path, mimetype=mimetype, download_name=job.artifact_name, as_attachment=True)
+    # stored in the database by a worker on another machine
+    output = Response(stream_with_context(jobs.iter_artifact(job)), mimetype=mimetype)
+    output.headers["Content-Disposition"] = f"attachment; filename={job.artifact_name}"
+    return output
 
 # --- Staff ---
 @bp.route('/staff')
 @login_required
+@conditional
 def staff_dashboard():
     if current_user.is_admin:
         return redirect(url_for('main.admin_dashboard'))
-    my_orders = Order.query.filter_by(staff_id=current_user.id).all()
-    total = len(my_orders)
-    pending = len([o for o in my_orders if o.status == 'pending'])
-    approved = len([o for o in my_orders if o.status == 'approved'])
-    completed = len([o for o in my_orders if o.status == 'completed'])
-    revenue = sum([o.total_amount or (o.price*o.quantity) for o in my_orders if o.status == 'completed'])
-    return render_template('staff/dashboard.html', total=total, pending=pending, approved=approved, completed=completed, revenue=revenue)
+    summary = cached(f"staff_summary:{current_user.id}", lambda: order_summary(staff_id=current_user.id))
+    return render_template('staff/dashboard.html', total=summary['total'], pending=summary['pending'],
+                           approved=summary['approved'], completed=summary['completed'], revenue=summary['revenue'])
 
 @bp.route('/staff/orders')
 @login_required
 def staff_orders():
     if current_user.is_admin:
         return redirect(url_for('main.admin_orders'))
-    orders = Order.query.filter_by(staff_id=current_user.id).order_by(Order.created_at.desc()).all()
+    orders = _paginate_orders(_order_listing_query().filter(Order.staff_id == current_user.id))
     return render_template('staff/orders.html', orders=orders)
 
 @bp.route('/staff/order/<int:order_id>/view')
@@ -414,11 +611,12 @@ def staff_new_customer():
         flash('Access denied for admin on staff page', 'danger'); return redirect(url_for('main.admin_dashboard'))
     form = CustomerOrderForm()
     if form.validate_on_submit():
-        customer = Customer.query.filter_by(phone=form.phone.data).first()
-        if not customer:
-            customer = Customer(name=form.customer_name.data, phone=form.phone.data, address=form.address.data)
-            db.session.add(customer)
-            db.session.commit()
+        error = overbooking_error(form.product_name.data, parse_datetime_str(form.delivery_datetime.data),
+                                  parse_datetime_str(form.return_datetime.data), form.quantity.data)
+        if error:
+            flash(error, 'danger')
+            return render_template('staff/new_customer.html', form=form)
+        customer = customer_for(form.customer_name.data, form.phone.data, form.address.data)
         order = Order(
             product_name=form.product_name.data,
             product_details=form.product_details.data,
@@ -428,19 +626,14 @@ def staff_new_customer():
             return_datetime=parse_datetime_str(form.return_datetime.data),
             amount_advance=form.amount_advance.data or 0.0,
             staff_id=current_user.id,
-            customer_id=customer.id,
+            customer=customer,
             status='pending'
         )
         order.total_amount = (form.price.data or 0.0) * (form.quantity.data or 1)
         order.amount_pending = order.total_amount - (order.amount_advance or 0.0)
 
-        filenames = []
-        files = request.files.getlist('photos')
-        for f in files:
-            saved = save_upload(f)
-            if saved:
-                filenames.append(saved)
-        order.set_photos(filenames)
+        for saved in save_uploads(request.files.getlist('photos')):
+            order.add_photo(saved)
 
         db.session.add(order)
         db.session.commit()
@@ -471,9 +664,13 @@ def staff_edit_order(order_id):
         form.return_datetime.data = order.return_datetime.strftime('%Y-%m-%d %H:%M') if order.return_datetime else ''
         form.amount_advance.data = order.amount_advance
     if form.validate_on_submit():
-        order.customer.name = form.customer_name.data
-        order.customer.phone = form.phone.data
-        order.customer.address = form.address.data
+        error = overbooking_error(form.product_name.data, parse_datetime_str(form.delivery_datetime.data),
+                                  parse_datetime_str(form.return_datetime.data), form.quantity.data,
+                                  exclude_order_id=order.id)
+        if error:
+            flash(error, 'danger')
+            return render_template('staff/new_customer.html', form=form, order=order)
+        assign_customer(order, form.customer_name.data, form.phone.data, form.address.data)
         order.product_name = form.product_name.data
         order.product_details = form.product_details.data
         order.price = form.price.data
@@ -484,13 +681,8 @@ def staff_edit_order(order_id):
         order.total_amount = order.price * order.quantity
         order.amount_pending = order.total_amount - order.amount_advance
 
-        files = request.files.getlist('photos')
-        filenames = order.get_photos()
-        for f in files:
-            saved = save_upload(f)
-            if saved:
-                filenames.append(saved)
-        order.set_photos(filenames)
+        for saved in save_uploads(request.files.getlist('photos')):
+            order.add_photo(saved)
 
         # after edit, set to pending for admin approval again
         order.status = 'pending'
@@ -501,5 +693,5 @@ def staff_edit_order(order_id):
 
 @bp.route('/uploads/<filename>')
 def uploaded_file(filename):
-    # serve uploaded files
-    return send_file(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+    # serve uploaded files (cache headers, conditional/range requests, front-server handoff)
+    return send_upload(filename)
@@ -0,0 +1,302 @@
+"""
+Order search index.
+
+SQLite uses an FTS5 table keyed by order id; PostgreSQL uses a table of
+tsvector documents with a GIN index. Both cover customer name and phone,
+product name and details, and staff name. Rows are refreshed from the
+session's after_flush hook whenever an indexed field changes, and
+`rebuild_search_index` (flask rebuild-search-index) backfills everything.
+If neither backend is available, searches fall back to ILIKE.
+"""
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect, text, bindparam, column, or_, DateTime, Integer, Float
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User, Customer, Order
+
+BATCH_SIZE = 500
+
+_ORDER_FIELDS = ('product_name', 'product_details', 'customer_id', 'staff_id')
+_CUSTOMER_FIELDS = ('name', 'phone')
+_USER_FIELDS = ('full_name', 'username')
+
+_DATE_RE = re.compile(r'^(\d{4})-(\d{2})(?:-(\d{2}))?$')
+
+# digits-only copy of the phone so "98765" matches "+91 98765 43210" and "9876543210"
+_PHONE_DIGITS = "replace(replace(replace(replace(replace(c.phone, ' ', ''), '-', ''), '+', ''), '(', ''), ')', '')"
+
+_SQLITE_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS order_search USING fts5(
+    customer_name, customer_phone, product_name, product_details, staff_name,
+    tokenize = 'unicode61', prefix = '2 3'
+)
+"""
+
+_SQLITE_INSERT = f"""
+INSERT INTO order_search (rowid, customer_name, customer_phone, product_name, product_details, staff_name)
+SELECT o.id, c.name, c.phone || ' ' || {_PHONE_DIGITS}, o.product_name, coalesce(o.product_details, ''),
+       coalesce(u.full_name, '') || ' ' || u.username
+FROM orders o
+JOIN customers c ON c.id = o.customer_id
+JOIN users u ON u.id = o.staff_id
+"""
+
+_POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS order_search ("
+    " order_id INTEGER PRIMARY KEY REFERENCES orders (id) ON DELETE CASCADE,"
+    " document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_order_search_document ON order_search USING gin (document)",
+]
+
+_POSTGRES_INSERT = f"""
+INSERT INTO order_search (order_id, document)
+SELECT o.id,
+       setweight(to_tsvector('simple', coalesce(c.name, '') || ' ' || c.phone || ' ' || {_PHONE_DIGITS}), 'A') ||
+       setweight(to_tsvector('simple', o.product_name), 'A') ||
+       setweight(to_tsvector('simple', coalesce(o.product_details, '')), 'C') ||
+       setweight(to_tsvector('simple', coalesce(u.full_name, '') || ' ' || u.username), 'B')
+FROM orders o
+JOIN customers c ON c.id = o.customer_id
+JOIN users u ON u.id = o.staff_id
+"""
+
+
+def search_backend(bind=None):
+    """Return 'fts5', 'postgres' or 'like' for the given engine/connection."""
+    bind = bind if bind is not None else db.engine
+    name = bind.dialect.name
+    if name == 'postgresql':
+        return 'postgres'
+    if name == 'sqlite':
+        engine = getattr(bind, 'engine', bind)
+        cached = getattr(engine, '_order_search_fts5', None)
+        if cached is None:
+            with engine.connect() as conn:
+                opts = {row[0] for row in conn.exec_driver_sql('PRAGMA compile_options')}
+            cached = engine._order_search_fts5 = 'ENABLE_FTS5' in opts
+        if cached:
+            return 'fts5'
+    return 'like'
+
+
+def create_search_index(bind=None):
+    """
+    Create the search table for the current backend if it does not exist.
+    Returns True when the table was created by this call.
+    """
+    bind = bind if bind is not None else db.engine
+    backend = search_backend(bind)
+    if backend == 'like':
+        return False
+    existed = 'order_search' in inspect(bind).get_table_names()
+    with bind.begin() as conn:
+        if backend == 'fts5':
+            conn.exec_driver_sql(_SQLITE_DDL)
+        else:
+            for ddl in _POSTGRES_DDL:
+                conn.exec_driver_sql(ddl)
+    return not existed
+
+
+def init_search(app):
+    """Ensure the index exists, backfilling it the first time it is created."""
+    with app.app_context():
+        if create_search_index():
+            rebuild_search_index()
+
+
+def _reindex(conn, order_ids):
+    backend = search_backend(conn)
+    if backend == 'like' or not order_ids:
+        return
+    order_ids = sorted(set(order_ids))
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        chunk = order_ids[start:start + BATCH_SIZE]
+        marks = ', '.join(str(int(i)) for i in chunk)
+        if backend == 'fts5':
+            conn.exec_driver_sql(f"DELETE FROM order_search WHERE rowid IN ({marks})")
+            conn.exec_driver_sql(f"{_SQLITE_INSERT} WHERE o.id IN ({marks})")
+        else:
+            conn.exec_driver_sql(f"DELETE FROM order_search WHERE order_id IN ({marks})")
+            conn.exec_driver_sql(f"{_POSTGRES_INSERT} WHERE o.id IN ({marks})")
+
+
+def reindex_orders(order_ids, conn=None):
+    """Refresh the search rows of orders written outside the session (Core inserts/updates)."""
+    _reindex(conn if conn is not None else db.session.connection(), order_ids)
+
+
+def rebuild_search_index():
+    """Drop and repopulate every search row. Returns the number of orders indexed."""
+    create_search_index()
+    backend = search_backend()
+    if backend == 'like':
+        return 0
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM order_search")
+        if backend == 'fts5':
+            conn.exec_driver_sql(_SQLITE_INSERT)
+            conn.exec_driver_sql("INSERT INTO order_search (order_search) VALUES ('optimize')")
+        else:
+            conn.exec_driver_sql(_POSTGRES_INSERT)
+        return conn.exec_driver_sql("SELECT count(*) FROM order_search").scalar()
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """Refresh search rows for orders whose indexed text changed in this flush."""
+    order_ids = set()
+    customer_ids = set()
+    staff_ids = set()
+    deleted_ids = set()
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            order_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Order) and _changed(obj, _ORDER_FIELDS):
+            order_ids.add(obj.id)
+        elif isinstance(obj, Customer) and _changed(obj, _CUSTOMER_FIELDS):
+            customer_ids.add(obj.id)
+        elif isinstance(obj, User) and _changed(obj, _USER_FIELDS):
+            staff_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            deleted_ids.add(obj.id)
+
+    if not (order_ids or customer_ids or staff_ids or deleted_ids):
+        return
+
+    conn = session.connection()
+    backend = search_backend(conn)
+    if backend == 'like':
+        return
+    if customer_ids:
+        order_ids.update(i for (i,) in conn.execute(
+            db.select(Order.id).where(Order.customer_id.in_(customer_ids))))
+    if staff_ids:
+        order_ids.update(i for (i,) in conn.execute(
+            db.select(Order.id).where(Order.staff_id.in_(staff_ids))))
+    if deleted_ids:
+        key = 'rowid' if backend == 'fts5' else 'order_id'
+        marks = ', '.join(str(int(i)) for i in deleted_ids)
+        conn.exec_driver_sql(f"DELETE FROM order_search WHERE {key} IN ({marks})")
+    _reindex(conn, order_ids - deleted_ids)
+
+
+def _tokens(q):
+    return re.findall(r'\w+', q or '', re.UNICODE)
+
+
+def _match_expression(q, backend):
+    tokens = _tokens(q)
+    if not tokens:
+        return None
+    if backend == 'fts5':
+        return ' '.join('"%s"*' % t.replace('"', '') for t in tokens)
+    return ' & '.join('%s:*' % t for t in tokens)
+
+
+def date_range(value):
+    """
+    Parse 'YYYY-MM-DD' or 'YYYY-MM' into a [start, end) datetime range.
+    Returns None for anything else.
+    """
+    m = _DATE_RE.match((value or '').strip())
+    if not m:
+        return None
+    year, month, day = int(m.group(1)), int(m.group(2)), m.group(3)
+    try:
+        if day:
+            start = datetime(year, month, int(day))
+            return start, start + timedelta(days=1)
+        start = datetime(year, month, 1)
+    except ValueError:
+        return None
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def filter_created(query, date_from=None, date_to=None):
+    """Apply an inclusive created_at date filter from 'YYYY-MM-DD' strings."""
+    start = date_range(date_from)
+    end = date_range(date_to)
+    if start:
+        query = query.filter(Order.created_at >= start[0])
+    if end:
+        query = query.filter(Order.created_at < end[1])
+    return query
+
+
+def filter_orders(query, q):
+    """
+    Restrict an Order query to rows matching the search text.
+    A bare date ('2025-10' or '2025-10-08') filters on created_at instead.
+    """
+    q = (q or '').strip()
+    if not q:
+        return query
+    created = date_range(q)
+    if created:
+        return query.filter(Order.created_at >= created[0], Order.created_at < created[1])
+
+    backend = search_backend()
+    match = _match_expression(q, backend)
+    if match is None:
+        return query
+    if backend == 'fts5':
+        ids = text("SELECT rowid FROM order_search WHERE order_search MATCH :match") \
+            .bindparams(match=match).columns(rowid=Integer)
+        return query.filter(Order.id.in_(ids))
+    if backend == 'postgres':
+        ids = text("SELECT order_id FROM order_search WHERE document @@ to_tsquery('simple', :match)") \
+            .bindparams(match=match).columns(order_id=Integer)
+        return query.filter(Order.id.in_(ids))
+
+    like = f"%{q}%"
+    return query.filter(
+        Order.customer.has(or_(Customer.name.ilike(like), Customer.phone.ilike(like))) |
+        Order.product_name.ilike(like) |
+        Order.staff.has(User.full_name.ilike(like))
+    )
+
+
+def ranked_order_ids(q, limit=50, date_from=None, date_to=None):
+    """
+    Best-matching order ids for q, most relevant first. The inclusive
+    created_at bounds ('YYYY-MM-DD') are applied inside the ranked SELECT,
+    before the LIMIT, so in-range matches are not crowded out.
+    """
+    backend = search_backend()
+    match = _match_expression(q, backend)
+    if match is None or backend == 'like':
+        query = filter_created(filter_orders(Order.query, q), date_from, date_to)
+        return [o.id for o in query.order_by(Order.created_at.desc()).limit(limit)]
+
+    start, end = date_range(date_from), date_range(date_to)
+    params = {'match': match, 'limit': limit}
+    bounds = ''
+    if start:
+        bounds += " AND orders.created_at >= :start"
+        params['start'] = start[0]
+    if end:
+        bounds += " AND orders.created_at < :end"
+        params['end'] = end[1]
+    if backend == 'fts5':
+        stmt = text("SELECT order_search.rowid, bm25(order_search, 4.0, 4.0, 3.0, 1.0, 2.0) AS score "
+                    "FROM order_search JOIN orders ON orders.id = order_search.rowid "
+                    f"WHERE order_search MATCH :match{bounds} ORDER BY score LIMIT :limit")
+    else:
+        stmt = text("SELECT order_search.order_id, ts_rank(document, to_tsquery('simple', :match)) AS score "
+                    "FROM order_search JOIN orders ON orders.id = order_search.order_id "
+                    f"WHERE document @@ to_tsquery('simple', :match){bounds} ORDER BY score DESC LIMIT :limit")
+    # DateTime binds store-format the bounds (SQLite compares created_at as text)
+    stmt = stmt.bindparams(*(bindparam(k, type_=DateTime) for k in ('start', 'end') if k in params))
+    stmt = stmt.columns(column('id', Integer), column('score', Float))
+    return [row[0] for row in db.session.execute(stmt, params)]
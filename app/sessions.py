@@ -0,0 +1,126 @@
+"""
+Cached user loading for Flask-Login.
+
+The session cookie stores "<id>:<session_version>" (User.get_id). The
+loader keeps a small per-process TTL/LRU cache of SessionUser snapshots
+(id, username, full_name, is_admin, session_version) keyed by id, so
+authenticated requests normally run no identity query. Changing a user's
+password bumps session_version, which ends that user's other sessions.
+Inserting, updating or deleting a user evicts its entry in this process;
+other worker processes see the change once their entry expires
+(USER_CACHE_TTL seconds).
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import select
+from app import db
+
+
+class SessionUser(UserMixin):
+    """What requests need of the logged-in user; not bound to any DB session."""
+
+    def __init__(self, id, username, full_name, is_admin, session_version):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.is_admin = bool(is_admin)
+        self.session_version = session_version or 0
+
+    def get_id(self):
+        return session_id(self.id, self.session_version)
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_cache = TTLCache()
+
+
+def session_id(user_id, version):
+    return f"{user_id}:{version or 0}"
+
+
+def _parse(value):
+    """'<id>:<version>' (or a bare id from cookies issued before versioning) -> (id, version)."""
+    user_id, _, version = str(value).partition(':')
+    try:
+        return int(user_id), int(version or 0)
+    except ValueError:
+        return None, None
+
+
+def load_session_user(value):
+    """The SessionUser for a session's stored id, or None if it no longer matches a user."""
+    user_id, version = _parse(value)
+    if user_id is None:
+        return None
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    if ttl > 0:
+        _cache.ttl = ttl
+        _cache.maxsize = current_app.config.get('USER_CACHE_SIZE', 256)
+        user = _cache.get(user_id)
+        if user is not None and user.session_version == version:
+            return user
+
+    from app.models import User
+    row = db.session.execute(
+        select(User.id, User.username, User.full_name, User.is_admin, User.session_version)
+        .where(User.id == user_id)).first()
+    if row is None:
+        return None
+    user = SessionUser(*row)
+    if ttl > 0:
+        _cache.put(user_id, user)
+    if user.session_version != version:
+        return None  # password changed since this session logged in
+    return user
+
+
+def invalidate_user(user_id=None):
+    """Evict one user (or everyone) from this process's cache."""
+    if user_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(user_id)
+
+
+def cache_stats():
+    return {'hits': _cache.hits, 'misses': _cache.misses}
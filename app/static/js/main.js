@@ -39,6 +39,152 @@ function scrollToTop() {
   window.scrollTo({ top: 0, behavior: "smooth" });
 }
 
+// Customer autocomplete on order forms: <form data-customer-lookup="/customers/lookup">
+// Typing in the phone or name field suggests existing customers; picking one fills
+// name, phone and address. Requests are debounced and a newer keystroke aborts the last.
+document.querySelectorAll("form[data-customer-lookup]").forEach(form => {
+  const url = form.dataset.customerLookup;
+  const fields = ["customer_name", "phone", "address"].map(name => form.querySelector(`[name="${name}"]`));
+  const [nameInput, phoneInput] = fields;
+  if (!nameInput || !phoneInput) return;
+
+  const box = document.createElement("div");
+  box.className = "list-group shadow-sm customer-suggestions";
+  let timer = null;
+  let controller = null;
+
+  const hide = () => box.remove();
+
+  const pick = customer => {
+    ["name", "phone", "address"].forEach((key, i) => {
+      if (!fields[i]) return;
+      fields[i].value = customer[key] || "";
+      fields[i].dispatchEvent(new Event("input", { bubbles: true }));
+    });
+    clearTimeout(timer);
+    hide();
+  };
+
+  const show = (input, customers) => {
+    box.replaceChildren(...customers.map(customer => {
+      const item = document.createElement("button");
+      item.type = "button";
+      item.className = "list-group-item list-group-item-action py-1";
+      item.textContent = `${customer.name} · ${customer.phone}`;
+      item.addEventListener("click", () => pick(customer));
+      return item;
+    }));
+    if (customers.length) input.after(box); else hide();
+  };
+
+  [nameInput, phoneInput].forEach(input => {
+    input.setAttribute("autocomplete", "off");
+    input.parentElement.style.position = "relative";
+    input.addEventListener("input", e => {
+      if (!e.isTrusted) return;  // our own fill-in from pick()
+      clearTimeout(timer);
+      const q = input.value.trim();
+      if (q.length < 2) { hide(); return; }
+      timer = setTimeout(() => {
+        if (controller) controller.abort();
+        controller = new AbortController();
+        fetch(`${url}?q=${encodeURIComponent(q)}`, { signal: controller.signal, headers: { Accept: "application/json" } })
+          .then(r => (r.ok ? r.json() : { customers: [] }))
+          .then(data => show(input, data.customers))
+          .catch(() => {});
+      }, 150);
+    });
+  });
+
+  document.addEventListener("click", e => { if (!box.contains(e.target)) hide(); });
+  document.addEventListener("keydown", e => { if (e.key === "Escape") hide(); });
+});
+
+// Live admin updates: pages with [data-events-url] follow the server-sent order feed
+// (/admin/events). Dashboard counters ([data-counter]) and order rows ([data-order-id])
+// are patched in place; new orders are prepended when the list allows it. The browser
+// resumes from the last event id after a dropped connection; if the server refuses the
+// stream (503) we retry with backoff, and a `reset` event means we fell too far behind.
+(() => {
+  const source = document.querySelector("[data-events-url]");
+  if (!source || !window.EventSource) return;
+  const url = source.dataset.eventsUrl;
+  const tbody = document.querySelector("tbody[data-events-url]");
+  const template = document.getElementById("orderRowTemplate");
+  const maxRows = tbody ? Math.max(tbody.rows.length, 50) : 0;
+  let lastId = null;
+  let delay = 2000;
+
+  const money = value => `₹${Number(value).toFixed(2)}`;
+  const badges = {
+    canceled: ["bg-danger", "Canceled"],
+    completed: ["bg-success", "Completed"],
+    approved: ["bg-info", "Approved"],
+  };
+
+  const setStatus = (cell, status) => {
+    const [cls, label] = badges[status] || ["bg-warning text-dark", status];
+    const badge = document.createElement("span");
+    badge.className = `badge ${cls}`;
+    badge.textContent = label;
+    cell.replaceChildren(badge);
+  };
+
+  const flashRow = row => {
+    row.classList.add("table-warning");
+    setTimeout(() => row.classList.remove("table-warning"), 2500);
+  };
+
+  const fill = (row, data) => {
+    row.querySelectorAll("[data-field]").forEach(cell => {
+      const field = cell.dataset.field;
+      if (field === "status") setStatus(cell, data.status);
+      else if (field === "total") cell.textContent = money(data.total);
+      else if (field === "id") cell.textContent = data.order_id;
+      else if (field in data) cell.textContent = data[field] ?? "-";
+    });
+  };
+
+  const applyOrder = data => {
+    if (!tbody) return;
+    const row = tbody.querySelector(`tr[data-order-id="${data.order_id}"]`);
+    if (data.kind === "deleted") { if (row) row.remove(); return; }
+    if (!data.product_name) return;  // order no longer exists
+    if (row) { fill(row, data); flashRow(row); return; }
+    if (data.kind !== "created" || tbody.dataset.liveInsert !== "1" || !template) return;
+    const fresh = template.content.firstElementChild.cloneNode(true);
+    fresh.dataset.orderId = data.order_id;
+    fresh.querySelector("input[name=order_ids]").value = data.order_id;
+    fresh.querySelectorAll("a[data-href]").forEach(a => { a.href = a.dataset.href.replace("/0/", `/${data.order_id}/`); });
+    fill(fresh, data);
+    tbody.prepend(fresh);
+    flashRow(fresh);
+    while (tbody.rows.length > maxRows) tbody.lastElementChild.remove();
+  };
+
+  const applyCounters = counters => {
+    document.querySelectorAll("[data-counter]").forEach(el => {
+      const value = counters[el.dataset.counter];
+      if (value === undefined) return;
+      el.textContent = el.dataset.format === "money" ? money(value) : value;
+    });
+  };
+
+  const connect = () => {
+    const es = new EventSource(lastId ? `${url}?last_event_id=${lastId}` : url);
+    es.addEventListener("order", e => { lastId = e.lastEventId; applyOrder(JSON.parse(e.data)); });
+    es.addEventListener("counters", e => { if (e.lastEventId) lastId = e.lastEventId; applyCounters(JSON.parse(e.data)); });
+    es.addEventListener("reset", () => { es.close(); window.location.reload(); });
+    es.onopen = () => { delay = 2000; };
+    es.onerror = () => {
+      if (es.readyState !== EventSource.CLOSED) return;  // the browser is already reconnecting
+      setTimeout(connect, delay);
+      delay = Math.min(delay * 2, 60000);
+    };
+  };
+  connect();
+})();
+
 // Add ripple effect to buttons
 document.querySelectorAll(".btn").forEach(btn => {
   btn.addEventListener("click", function(e) {
@@ -101,6 +247,14 @@ style.innerHTML = `
     transition: all 0.4s ease;
     z-index: 999;
   }
+  .customer-suggestions {
+    position: absolute;
+    left: 0;
+    right: 0;
+    z-index: 1000;
+    max-height: 16rem;
+    overflow-y: auto;
+  }
   #backToTop.show {
     opacity: 1;
     visibility: visible;
@@ -0,0 +1,62 @@
+from sqlalchemy import func, case
+from app import db
+from app.models import User, OrderRollup
+
+ORDER_STATUSES = ('pending', 'approved', 'rejected', 'completed', 'canceled')
+
+# Read from the daily rollup (app.rollups), so cost grows with days x staff, not orders.
+_r = OrderRollup
+
+
+def _status_count(status):
+    return func.sum(case((_r.status == status, _r.order_count), else_=0))
+
+
+def _completed_revenue():
+    return func.sum(case((_r.status == 'completed', _r.total_amount), else_=0))
+
+
+def summary_query(staff_id=None):
+    columns = [func.sum(_r.order_count)] + [_status_count(s) for s in ORDER_STATUSES] + [_completed_revenue()]
+    query = db.session.query(*columns)
+    if staff_id is not None:
+        query = query.filter(_r.staff_id == staff_id)
+    return query
+
+
+def order_summary(staff_id=None):
+    """
+    Status counts and completed revenue in a single aggregate query.
+    Pass staff_id to restrict the summary to one staff member's orders.
+    Returns a dict with 'total', one key per status and 'revenue'.
+    """
+    row = summary_query(staff_id).one()
+
+    summary = {'total': row[0] or 0}
+    for status, value in zip(ORDER_STATUSES, row[1:]):
+        summary[status] = value or 0
+    summary['revenue'] = float(row[-1] or 0.0)
+    return summary
+
+
+def staff_performance():
+    """
+    Per-staff order count, approved count and completed revenue,
+    computed with one grouped LEFT JOIN so staff without orders are kept.
+    Sorted by order count, highest first.
+    """
+    orders = func.coalesce(func.sum(_r.order_count), 0)
+    rows = db.session.query(
+        User,
+        orders,
+        _status_count('approved'),
+        _completed_revenue(),
+    ).outerjoin(_r, _r.staff_id == User.id) \
+     .group_by(User.id) \
+     .order_by(orders.desc(), User.id) \
+     .all()
+
+    return [
+        {'staff': u, 'orders': cnt or 0, 'approved': approved or 0, 'revenue': float(revenue or 0.0)}
+        for u, cnt, approved, revenue in rows
+    ]
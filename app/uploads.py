@@ -0,0 +1,171 @@
+"""
+Streaming intake for uploaded photos.
+
+Werkzeug spools each file part of a multipart request into a temporary
+file (in memory up to 500 KB) and the app only inspects it afterwards.
+With UploadRequest as the app's request class, photo parts (an image
+file name or image/* content type, see is_photo_part) are instead written
+chunk by chunk (the form parser's 64 KB buffer) to a .tmp file in
+UPLOAD_FOLDER, hashed (SHA-256) and sniffed as they arrive. Other file
+parts, such as the order import's CSV, get werkzeug's default stream.
+The choice is made in the request's stream factory, werkzeug's public
+hook for file parts. For photo parts:
+
+- a part whose first bytes are not a JPEG, PNG, GIF or WebP signature is
+  rejected at its first chunk; the rest of it is read and discarded;
+- a part over UPLOAD_MAX_FILE_BYTES is rejected as soon as it crosses
+  the limit and its temp file removed;
+- photo data over UPLOAD_MAX_REQUEST_BYTES in one request aborts the
+  request with 413 while it is still being received.
+
+Memory per upload stays at the parser's buffer whatever the file size
+(tests/test_uploads.py measures it).
+A valid part is an IncomingFile carrying .kind and .digest, so
+save_upload can hand it to Pillow without re-hashing, or move it into
+place with os.replace (atomic: the temp file is already in
+UPLOAD_FOLDER). Temp files that are left over because they were rejected,
+unused or aborted are removed when the request closes.
+"""
+import hashlib
+import os
+import tempfile
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.images import HASH_LENGTH
+
+SNIFF_BYTES = 12
+
+# file name extensions save_upload accepts (app.utils.ALLOWED_EXTENSIONS)
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'webp')
+
+
+def sniff_image(head):
+    """Image type from a file's first bytes ('jpeg', 'png', 'gif', 'webp'), or None."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def is_photo_part(filename, content_type):
+    """True for a file part that claims to be an image, by its name or content type."""
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return ext in IMAGE_EXTENSIONS or (content_type or '').lower().startswith('image/')
+
+
+class IncomingFile:
+    """
+    Write-through container for one uploaded file part: a temp file in
+    `folder`, a running SHA-256 and the sniffed type. Reads and seeks go to
+    the temp file, so it serves as the FileStorage stream.
+    """
+
+    def __init__(self, folder, max_bytes, count=None):
+        self.size = 0
+        self.kind = None
+        self.error = None
+        self._max_bytes = max_bytes
+        self._count = count
+        self._hash = hashlib.sha256()
+        self._head = b''
+        fd, self.path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        self._file = os.fdopen(fd, 'w+b')
+
+    def write(self, data):
+        if self._count is not None:
+            self._count(len(data))
+        self.size += len(data)
+        if self.error is not None:
+            return len(data)  # rejected: drain without storing
+        if self.size > self._max_bytes:
+            self._reject(f'larger than {self._max_bytes // (1024 * 1024)} MB')
+            return len(data)
+        if self.kind is None and len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) == SNIFF_BYTES and not self._sniff():
+                return len(data)
+        self._hash.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def _sniff(self):
+        self.kind = sniff_image(self._head)
+        if self.kind is None:
+            self._reject('not a JPEG, PNG, GIF or WebP image')
+        return self.kind is not None
+
+    def _reject(self, reason):
+        self.error = reason
+        self.close()
+
+    def finish(self):
+        """True if the file is a complete, accepted image (sniffs short files too)."""
+        if self.error is None and self.kind is None:
+            self._sniff()
+        return self.error is None
+
+    @property
+    def digest(self):
+        """Content hash in the form app.images names files by."""
+        return self._hash.hexdigest()[:HASH_LENGTH]
+
+    def move_to(self, path):
+        """Atomically move the upload to `path` (in UPLOAD_FOLDER)."""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = None
+
+    def seek(self, offset, whence=0):
+        if self._file.closed:
+            return 0
+        return self._file.seek(offset, whence)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __getattr__(self, name):
+        # read, readline, tell, fileno, ... for FileStorage and Pillow
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Request whose photo parts stream into IncomingFile containers under per-request quotas."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not is_photo_part(filename, content_type):
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        config = current_app.config
+        incoming = IncomingFile(config['UPLOAD_FOLDER'], config.get('UPLOAD_MAX_FILE_BYTES', 16 * 1024 * 1024),
+                                count=self._count_upload_bytes)
+        self.__dict__.setdefault('_incoming', []).append(incoming)
+        return incoming
+
+    def _count_upload_bytes(self, n):
+        total = self.__dict__.get('_upload_bytes', 0) + n
+        self._upload_bytes = total
+        limit = current_app.config.get('UPLOAD_MAX_REQUEST_BYTES')
+        if limit is not None and total > limit:
+            raise RequestEntityTooLarge(f'Uploads in one request are limited to {limit // (1024 * 1024)} MB.')
+
+    def close(self):
+        super().close()
+        for incoming in self.__dict__.get('_incoming', ()):
+            incoming.close()
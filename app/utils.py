@@ -1,9 +1,15 @@
 import os
+import re
 from werkzeug.utils import secure_filename
 from datetime import datetime
-from flask import current_app
+from flask import current_app, abort, flash, has_app_context, send_from_directory
+from app.images import ingest_image, is_hashed_name, variant_base, PILLOW_AVAILABLE
+from app.offload import run_all
+from app.uploads import IMAGE_EXTENSIONS, IncomingFile
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+ALLOWED_EXTENSIONS = set(IMAGE_EXTENSIONS)
+
+_NON_DIGITS = re.compile(r'\D')
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -13,9 +19,18 @@ def allowed_file(filename):
 def save_upload(file):
     """
     Save uploaded file to UPLOAD_FOLDER.
+    Images are re-encoded and stored content-addressed (see app.images)
+    when Pillow is installed; otherwise the raw file is saved.
+    Files streamed in by app.uploads are already hashed and type-checked,
+    and the raw file is moved into place rather than copied.
     Returns the saved filename or None if invalid.
     """
     if file and file.filename and allowed_file(file.filename):
+        incoming = file.stream if isinstance(file.stream, IncomingFile) else None
+        if incoming is not None and not incoming.finish():
+            return None
+        if PILLOW_AVAILABLE:
+            return ingest_image(file.stream, digest=incoming.digest if incoming is not None else None)
         filename = secure_filename(file.filename)
         # Add timestamp to avoid conflicts
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -23,10 +38,61 @@ def save_upload(file):
         filename = f"{timestamp}_{name}{ext}"
         
         filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        if incoming is not None:
+            incoming.move_to(filepath)
+        else:
+            file.save(filepath)
         return filename
     return None
 
+def save_uploads(files):
+    """
+    save_upload() for several files on the offload pool; returns the saved
+    names in upload order. Files rejected while streaming in are flashed.
+    """
+    files = [f for f in files if f and f.filename]
+    for f in files:
+        if isinstance(f.stream, IncomingFile) and not f.stream.finish():
+            flash(f"{f.filename} was not saved: {f.stream.error}", 'warning')
+    return [name for name in run_all(save_upload, files) if name]
+
+def send_upload(filename):
+    """
+    Serve a file from UPLOAD_FOLDER with caching headers.
+    Content-addressed names never change, so they get a strong ETag equal to
+    their hash and a year-long immutable Cache-Control; legacy names are
+    revalidated hourly. Conditional (If-None-Match) and Range requests are
+    handled by send_from_directory. With UPLOAD_ACCEL_REDIRECT set the body
+    is handed off to the front server (nginx X-Accel-Redirect); Flask's
+    USE_X_SENDFILE does the same for Apache/lighttpd.
+    """
+    if not filename or secure_filename(filename) != filename:
+        abort(404)
+    folder = current_app.config['UPLOAD_FOLDER']
+    path = os.path.join(folder, filename)
+    if not os.path.isfile(path):
+        abort(404)
+
+    immutable = is_hashed_name(filename) or is_hashed_name(variant_base(filename))
+    etag = filename.rsplit('.', 1)[0] if immutable else True
+    max_age = 365 * 24 * 3600 if immutable else 3600
+
+    accel = current_app.config.get('UPLOAD_ACCEL_REDIRECT')
+    if accel:
+        # nginx fills in the body and Content-Type from its internal location
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = accel.rstrip('/') + '/' + filename
+        del response.headers['Content-Type']
+        if immutable:
+            response.set_etag(etag)
+    else:
+        response = send_from_directory(folder, filename, etag=etag, max_age=max_age, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
 def parse_datetime_str(date_str):
     """
     Parse datetime string from form input.
@@ -64,4 +130,22 @@ def parse_datetime_str(date_str):
     except ValueError:
         pass
     
-    return None
\ No newline at end of file
+    return None
+
+def normalize_phone(phone, country_code=None):
+    """
+    Canonical digits-only form of a phone number, used to match customers:
+    '+91 98765 43210', '098765 43210' and '9876543210' all give '9876543210'.
+    The international (00) and trunk (0) prefixes and the default country
+    code (PHONE_COUNTRY_CODE) are dropped. Returns None if there are no digits.
+    """
+    digits = _NON_DIGITS.sub('', phone or '')
+    if country_code is None:
+        country_code = current_app.config.get('PHONE_COUNTRY_CODE', '91') if has_app_context() else '91'
+    if digits.startswith('00'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    if country_code and len(digits) > 10 and digits.startswith(country_code):
+        digits = digits[len(country_code):]
+    return digits or None
@@ -0,0 +1 @@
+"""Benchmarks for Neraa Rental House. Run modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,74 @@
+"""
+Rental analytics (app.analytics) for a year of orders: the columnar fetch
+with NumPy, the same fetch with the per-row Python reference
+(tests/analytics_reference.py), and the naive path of loading ORM Order
+objects and looping over them.
+
+    python -m benchmarks.bench_analytics [orders]     # default 100000
+
+All three must produce identical figures; the script exits non-zero if
+they do not.
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.analytics import OrderColumns, analyse, load_columns
+from app.models import Order
+from benchmarks.seed import make_app, seed
+from tests.analytics_reference import reference_analyse
+
+
+def _ts(value):
+    return (value - datetime(1970, 1, 1)).total_seconds() if value is not None else None
+
+
+def naive_columns(start, end):
+    """Per-object path: full ORM rows, one attribute read at a time."""
+    orders = Order.query.filter(Order.created_at < end, db.or_(Order.created_at >= start,
+                                                               Order.return_datetime >= start)).all()
+    rows = [(_ts(o.created_at), _ts(o.delivery_datetime), _ts(o.return_datetime), o.product_name, o.status,
+             (o.total_amount or (o.price or 0) * (o.quantity or 1)), o.amount_pending or 0.0, o.quantity or 1)
+            for o in orders]
+    return OrderColumns(rows, start, end)
+
+
+def run(label, fn, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        db.session.expire_all()
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<34}{best * 1000:>10.0f}")
+    return result
+
+
+def main(orders=100_000):
+    app, db_path = make_app()
+    with app.app_context():
+        seed(orders=orders, staff=20, customers=max(orders // 5, 1), days=365)
+        end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        start = end - timedelta(days=365)
+        now = datetime.utcnow()
+
+        print(f"{orders} orders over 365 days")
+        print(f"{'path':<34}{'best ms':>10}")
+        naive = run('ORM objects + Python loop', lambda: reference_analyse(naive_columns(start, end), now))
+        python = run('columnar fetch + Python loop', lambda: reference_analyse(load_columns(start, end), now))
+        results = [naive, python, run('columnar fetch + NumPy', lambda: analyse(load_columns(start, end), now))]
+        cols = load_columns(start, end)
+        run('  fetch only', lambda: load_columns(start, end))
+        run('  Python analysis only', lambda: reference_analyse(cols, now))
+        run('  NumPy analysis only', lambda: analyse(cols, now))
+
+    if any(r != results[0] for r in results[1:]):
+        print('MISMATCH between paths')
+        raise SystemExit(1)
+    print('all paths agree')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
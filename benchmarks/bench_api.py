@@ -0,0 +1,55 @@
+"""
+Bytes on the wire and latency for the staff order listing: the HTML page
+vs. the JSON API (app.api) with all fields, a sparse ?fields= set, gzip,
+and a conditional re-fetch that should come back as an empty 304.
+
+    python -m benchmarks.bench_api [orders]     # default 20000
+
+Each row is one page of 50 orders fetched through the test client as a
+staff member.
+"""
+import statistics
+import sys
+import time
+
+from app.api import ORDER_FIELDS
+from benchmarks.seed import make_app, seed, BENCH_PASSWORD
+
+
+def timed(client, url, headers=None, repeat=30):
+    times, response = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        response = client.get(url, headers=headers or {})
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), response
+
+
+def main(orders=20_000):
+    app, db_path = make_app()
+    with app.app_context():
+        seed(orders=orders, staff=5, customers=max(orders // 5, 1))
+    client = app.test_client()
+    client.post('/', data={'username': 'staff0', 'password': BENCH_PASSWORD})
+
+    every = ','.join(ORDER_FIELDS)
+    cases = [
+        ('HTML /staff/orders', '/staff/orders', None),
+        ('JSON all fields', f'/api/v1/orders?fields={every}', None),
+        ('JSON default fields', '/api/v1/orders', None),
+        ('JSON id,status,total', '/api/v1/orders?fields=id,status,total', None),
+        ('JSON default + gzip', '/api/v1/orders', {'Accept-Encoding': 'gzip'}),
+    ]
+    print(f"{orders} orders, page of 50")
+    print(f"{'request':<28}{'status':>7}{'bytes':>9}{'p50 ms':>9}")
+    for label, url, headers in cases:
+        ms, r = timed(client, url, headers)
+        print(f"{label:<28}{r.status_code:>7}{len(r.data):>9}{ms:>9.2f}")
+
+    etag = client.get('/api/v1/orders').headers['ETag']
+    ms, r = timed(client, '/api/v1/orders', {'If-None-Match': etag})
+    print(f"{'JSON If-None-Match':<28}{r.status_code:>7}{len(r.data):>9}{ms:>9.2f}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
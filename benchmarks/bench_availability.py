@@ -0,0 +1,90 @@
+"""
+Availability checks against active rentals: the partial interval index
+(ix_orders_active_window) vs. the same queries without it.
+
+    python -m benchmarks.bench_availability [active ...]   # default: 100000
+
+Seeds 200k historical orders plus `active` pending/approved rentals spread
+over the next 90 days across the seed's 56 product names.
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app import db
+from app.models import Customer, Order, Product
+from app.availability import free_units, availability_calendar, overlap_stmt
+from app.query_plans import explain
+from benchmarks.seed import make_app, seed, timed, COLOURS, PRODUCTS
+
+HISTORY = 200_000
+WINDOW_DAYS = 90
+
+
+def seed_active(active, staff_ids, rng_seed=7):
+    rng = random.Random(rng_seed)
+    names = [f'{c} {p}' for c in COLOURS for p in PRODUCTS]
+    db.session.execute(insert(Product), [{'name': n, 'stock': 60, 'is_active': True} for n in names])
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    customer = db.session.query(db.func.min(Customer.id)).scalar()
+    for start in range(0, active, 10_000):
+        rows = []
+        for _ in range(start, min(start + 10_000, active)):
+            delivery = today + timedelta(days=rng.random() * WINDOW_DAYS, hours=rng.randint(8, 20))
+            rows.append({
+                'product_name': rng.choice(names), 'price': 500.0, 'quantity': rng.randint(1, 2),
+                'delivery_datetime': delivery, 'return_datetime': delivery + timedelta(days=rng.randint(1, 5)),
+                'status': rng.choice(['pending', 'approved']), 'staff_id': rng.choice(staff_ids),
+                'customer_id': customer, 'created_at': today,
+            })
+        db.session.execute(insert(Order), rows)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    return names
+
+
+def measure(names):
+    rng = random.Random(1)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    checks = []
+    for _ in range(20):
+        start = today + timedelta(days=rng.random() * WINDOW_DAYS)
+        checks.append((rng.choice(names), start, start + timedelta(days=3)))
+
+    def check_all():
+        return [free_units(n, s, e) for n, s, e in checks]
+
+    single, queries, _ = timed(check_all, repeat=3)
+    cal7, cal_queries, _ = timed(lambda: availability_calendar(days=7, limit=100), repeat=3)
+    cal30, _, _ = timed(lambda: availability_calendar(days=30, limit=100), repeat=3)
+    plan = explain(overlap_stmt([names[0]], today, today + timedelta(days=3)))
+    return single / len(checks), queries // len(checks), cal7, cal_queries, cal30, plan
+
+
+def run(active):
+    app, db_path = make_app()
+    try:
+        with app.app_context():
+            staff_ids = seed(orders=HISTORY, products=False)
+            names = seed_active(active, staff_ids)
+            print(f"\n{HISTORY} historical + {active} active rentals, {len(names)} products")
+            print(f"{'':<16}{'check ms':>10}{'q/check':>9}{'cal 7d ms':>11}{'q':>4}{'cal 30d ms':>12}")
+            results = [('partial index', measure(names))]
+            db.session.execute(text('DROP INDEX ix_orders_active_window'))
+            db.session.commit()
+            db.engine.dispose()  # drop cached statements prepared against the old schema
+            results.append(('without', measure(names)))
+            for label, (single, q, cal7, calq, cal30, plan) in results:
+                print(f"{label:<16}{single * 1000:>10.2f}{q:>9}{cal7 * 1000:>11.1f}{calq:>4}{cal30 * 1000:>12.1f}")
+            for label, r in results:
+                print(f"plan ({label}): {' | '.join(r[-1])}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    for n in [int(a) for a in sys.argv[1:]] or [100_000]:
+        run(n)
@@ -0,0 +1,73 @@
+"""
+Per-bill CPU time and PDF size: admin/bill.html through pisa.CreatePDF
+vs. the native reportlab renderer (app.bill_pdf), both in-process and
+without the bill cache.
+
+    python -m benchmarks.bench_bill_render [bills]     # default 200
+
+Then a visual-equivalence check over every bill: both PDFs must be A4,
+use the same fonts and contain the same text in the same reading order
+(whitespace-normalized, as line breaks and boxes differ). The script
+exits non-zero on any mismatch. The renderers and the appearance
+comparison are the ones tests/test_bills.py checks with.
+"""
+import statistics
+import sys
+import time
+
+from sqlalchemy.orm import joinedload
+
+from app.bill_pdf import compiled_layout, render_bill, text_width
+from app.bills import bill_fields
+from app.models import Order
+from benchmarks.seed import make_app, seed
+from tests.test_bills import appearance, native_bill, pisa_bill
+
+
+def cpu_times(fn, orders):
+    times, sizes = [], []
+    for order in orders:
+        t0 = time.process_time()
+        pdf = fn(order)
+        times.append((time.process_time() - t0) * 1000)
+        sizes.append(len(pdf))
+    return times, sizes
+
+
+def main(bills=200):
+    app, db_path = make_app()
+    with app.app_context(), app.test_request_context():
+        seed(orders=bills)
+        orders = Order.query.options(joinedload(Order.customer)).order_by(Order.id).all()
+
+        t0 = time.process_time()
+        render_bill(bill_fields(orders[0]))
+        first = (time.process_time() - t0) * 1000
+        print(f"{bills} bills; first native bill (compiles the layout) {first:.1f} ms CPU")
+        print(f"{'renderer':<12}{'p50 ms':>9}{'p95 ms':>9}{'mean KB':>9}")
+        results = {}
+        for label, fn in (('pisa', pisa_bill), ('native', native_bill)):
+            times, sizes = cpu_times(fn, orders)
+            times.sort()
+            results[label] = statistics.median(times)
+            print(f"{label:<12}{statistics.median(times):>9.2f}{times[int(len(times) * 0.95)]:>9.2f}"
+                  f"{statistics.mean(sizes) / 1024:>9.1f}")
+        print(f"native is {results['pisa'] / results['native']:.0f}x less CPU per bill; "
+              f"width cache {text_width.cache_info().hits} hits / {text_width.cache_info().misses} misses, "
+              f"layouts compiled {compiled_layout.cache_info().misses}")
+
+        mismatches = 0
+        for order in orders:
+            html, native = appearance(pisa_bill(order)), appearance(native_bill(order))
+            if html != native:
+                mismatches += 1
+                if mismatches <= 3:
+                    print(f"order {order.id} differs:\n  pisa   {html}\n  native {native}")
+    if mismatches:
+        print(f"{mismatches} of {bills} bills differ")
+        raise SystemExit(1)
+    print(f"all {bills} bills match: A4, same fonts, same text in the same order")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""
+Bulk bill ZIP: serial in-request rendering vs. the cached process-pool renderer (app.bills).
+
+    python -m benchmarks.bench_bills [bills]      # default 300
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+from flask import render_template
+from sqlalchemy.orm import joinedload
+from xhtml2pdf import pisa
+
+from app.models import Order
+from app.bills import iter_bills_zip
+from benchmarks.seed import make_app, seed
+
+
+def serial_zip(orders):
+    """admin_download_bills before app.bills: render every bill, buffer the whole ZIP."""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for o in orders:
+            pdf_io = io.BytesIO()
+            if pisa.CreatePDF(io.StringIO(render_template('admin/bill.html', order=o)), dest=pdf_io).err:
+                continue
+            zipf.writestr(f"bill_order_{o.id}.pdf", pdf_io.getvalue())
+    yield zip_buffer.getvalue()
+
+
+def measure(make_chunks):
+    t0 = time.perf_counter()
+    ttfb = None
+    size = 0
+    for chunk in make_chunks():
+        if ttfb is None:
+            ttfb = time.perf_counter() - t0
+        size += len(chunk)
+    return ttfb, time.perf_counter() - t0, size
+
+
+def main(bills=300):
+    app, db_path = make_app()
+    cache = tempfile.mkdtemp(prefix='bench_bills_')
+    app.config['BILL_CACHE_FOLDER'] = cache
+    try:
+        with app.app_context(), app.test_request_context():
+            seed(orders=bills)
+            orders = lambda: Order.query.options(joinedload(Order.customer)).order_by(Order.id).all()
+            print(f"{bills} bills, {os.cpu_count()} CPUs")
+            print(f"{'mode':<22}{'ttfb s':>9}{'total s':>9}{'MB':>7}")
+            for name, fn in [('serial', lambda: serial_zip(orders())),
+                             ('pool, cold cache', lambda: iter_bills_zip(orders())),
+                             ('pool, warm cache', lambda: iter_bills_zip(orders()))]:
+                ttfb, total, size = measure(fn)
+                print(f"{name:<22}{ttfb:>9.2f}{total:>9.2f}{size / 2**20:>7.1f}")
+    finally:
+        os.remove(db_path)
+        shutil.rmtree(cache, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,88 @@
+"""
+Bulk import and batch status changes (app.bulk) vs. the one-order-per-request path.
+
+    python -m benchmarks.bench_bulk [rows]      # default 10000
+
+"per-row" mirrors staff_new_customer / admin_approve: ORM objects and a
+commit per order, so the rollup, search and cache hooks run each time. It
+runs on a tenth of the rows and is reported as rows per second.
+"""
+import random
+import sys
+import time
+
+from app import db
+from app.bulk import import_orders, set_status
+from app.models import Customer, Order, User
+from app.rollups import rollup_drift
+from benchmarks.seed import make_app, seed, COLOURS, PRODUCTS
+
+
+def make_rows(n, rng):
+    rows = []
+    for i in range(n):
+        price = rng.choice([250, 400, 650, 900])
+        rows.append({'customer_name': f'Import Customer {i % (n // 3 + 1)}', 'phone': f'6{i % (n // 3 + 1):09d}',
+                     'address': 'Imported', 'product_name': f'{rng.choice(COLOURS)} {rng.choice(PRODUCTS)}',
+                     'price': str(price), 'quantity': str(rng.randint(1, 3)), 'amount_advance': '0',
+                     'created_at': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 11:00'})
+    return rows
+
+
+def per_row_import(rows, staff_id):
+    for r in rows:
+        customer = Customer.query.filter_by(phone=r['phone']).first()
+        if customer is None:
+            customer = Customer(name=r['customer_name'], phone=r['phone'], address=r['address'])
+            db.session.add(customer)
+            db.session.flush()
+        price, quantity = float(r['price']), int(r['quantity'])
+        db.session.add(Order(customer_id=customer.id, staff_id=staff_id, product_name=r['product_name'],
+                             price=price, quantity=quantity, total_amount=price * quantity,
+                             amount_advance=0.0, amount_pending=price * quantity, status='pending'))
+        db.session.commit()
+
+
+def per_row_approve(ids):
+    for order_id in ids:
+        order = db.session.get(Order, order_id)
+        order.status = 'approved'
+        order.amount_pending = (order.total_amount or (order.price * order.quantity)) - (order.amount_advance or 0)
+        db.session.commit()
+
+
+def rate(fn, count):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    return count / elapsed, elapsed
+
+
+def main(rows=10_000):
+    app, db_path = make_app()
+    rng = random.Random(3)
+    with app.app_context(), app.test_request_context():
+        seed(orders=50_000, staff=5, customers=10_000)
+        staff_id = User.query.filter_by(username='staff0').first().id
+        data = make_rows(rows, rng)
+        small = max(rows // 10, 1)
+
+        print(f"{rows} rows into 50k orders")
+        print(f"{'operation':<28}{'rows/s':>10}{'seconds':>9}")
+        per_sec, secs = rate(lambda: per_row_import(make_rows(small, random.Random(4)), staff_id), small)
+        print(f"{'import, per-row':<28}{per_sec:>10.0f}{secs:>9.2f}")
+        result = {}
+        per_sec, secs = rate(lambda: result.update(import_orders(data, staff_id)), rows)
+        print(f"{'import, bulk':<28}{per_sec:>10.0f}{secs:>9.2f}")
+
+        pending = [i for (i,) in db.session.query(Order.id).filter(Order.status == 'pending').limit(2 * small)]
+        per_sec, secs = rate(lambda: per_row_approve(pending[:small]), small)
+        print(f"{'approve, per-order':<28}{per_sec:>10.0f}{secs:>9.2f}")
+        per_sec, secs = rate(lambda: set_status(pending[small:], 'approve'), len(pending[small:]))
+        print(f"{'approve, batch UPDATE':<28}{per_sec:>10.0f}{secs:>9.2f}")
+        print(f"imported {result['orders']} orders, {result['customers']} new customers, "
+              f"{len(result['errors'])} errors; rollup drift: {len(rollup_drift())} keys")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""
+Customer autocomplete latency (app.customers.lookup_customers) vs. a
+substring scan of the raw phone and name columns.
+
+    python -m benchmarks.bench_customer_lookup [customers]     # default 100000
+
+Queries are what staff type: 3-7 leading digits of a number (some with a
++91 prefix) or the first letters of a name. Each keystroke-sized request
+should stay within a few milliseconds, including the HTTP round trip
+through the test client.
+"""
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import or_, select
+
+from app import db
+from app.customers import lookup_customers
+from app.models import Customer
+from benchmarks.seed import make_app, seed, BENCH_PASSWORD, FIRST_NAMES
+
+
+def scan(q, limit=10):
+    like = f'%{q}%'
+    stmt = select(Customer.id, Customer.name, Customer.phone, Customer.address) \
+        .where(or_(Customer.phone.ilike(like), Customer.name.ilike(like))).limit(limit)
+    return db.session.execute(stmt).all()
+
+
+def queries(n, customers, rng):
+    out = []
+    for _ in range(n):
+        if rng.random() < 0.6:
+            digits = f'9{rng.randrange(customers):09d}'[:rng.randint(3, 7)]
+            out.append(('+91 ' + digits) if rng.random() < 0.3 else digits)
+        else:
+            out.append(rng.choice(FIRST_NAMES)[:rng.randint(2, 5)].lower())
+    return out
+
+
+def timed(fn, items):
+    times = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95)]
+
+
+def main(customers=100_000):
+    app, db_path = make_app()
+    rng = random.Random(5)
+    with app.app_context():
+        seed(orders=customers, staff=5, customers=customers)
+        qs = queries(500, customers, rng)
+        print(f"{customers} customers, {len(qs)} queries")
+        print(f"{'path':<28}{'p50 ms':>9}{'p95 ms':>9}")
+        for label, fn in (('substring scan (LIKE %q%)', scan), ('indexed prefix lookup', lookup_customers)):
+            p50, p95 = timed(fn, qs)
+            print(f"{label:<28}{p50:>9.2f}{p95:>9.2f}")
+
+    client = app.test_client()
+    client.post('/', data={'username': 'staff0', 'password': BENCH_PASSWORD})
+    p50, p95 = timed(lambda q: client.get('/customers/lookup', query_string={'q': q}), qs)
+    print(f"{'GET /customers/lookup':<28}{p50:>9.2f}{p95:>9.2f}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""
+Dashboard aggregates: per-staff count loops vs. grouped SQL over the daily
+rollup (app.stats), and a month of daily totals from orders vs. the rollup.
+
+    python -m benchmarks.bench_dashboard [orders]
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, case
+
+from app import db
+from app.models import User, Order
+from app.stats import order_summary, staff_performance
+from app.rollups import daily_totals, order_total
+from benchmarks.seed import make_app, seed, timed
+
+
+def naive_admin_dashboard():
+    """The admin_dashboard implementation before app.stats existed."""
+    total_orders = Order.query.count()
+    pending = Order.query.filter_by(status='pending').count()
+    approved = Order.query.filter_by(status='approved').count()
+    completed = Order.query.filter_by(status='completed').count()
+    canceled = Order.query.filter_by(status='canceled').count()
+    total_revenue = sum([o.total_amount or 0.0 for o in Order.query.filter_by(status='completed').all()])
+    staff_perf = []
+    for u in User.query.all():
+        cnt = Order.query.filter_by(staff_id=u.id).count()
+        approved_cnt = Order.query.filter_by(staff_id=u.id, status='approved').count()
+        revenue = sum([o.total_amount or 0 for o in Order.query.filter_by(staff_id=u.id, status='completed').all()])
+        staff_perf.append({'staff': u, 'orders': cnt, 'approved': approved_cnt, 'revenue': revenue})
+    return total_orders, pending, approved, completed, canceled, total_revenue, staff_perf
+
+
+def grouped_admin_dashboard():
+    return order_summary(), staff_performance()
+
+
+def naive_staff_dashboard(staff_id):
+    my_orders = Order.query.filter_by(staff_id=staff_id).all()
+    return len(my_orders), len([o for o in my_orders if o.status == 'pending'])
+
+
+def orders_month_totals(start, end):
+    """Per-day totals aggregated from the orders table itself."""
+    day = func.date(Order.created_at)
+    return db.session.query(
+        day, func.count(Order.id),
+        func.sum(case((Order.status == 'completed', order_total), else_=0)),
+        func.sum(Order.amount_advance), func.sum(Order.amount_pending),
+    ).filter(Order.created_at >= start, Order.created_at < end).group_by(day).all()
+
+
+def main(orders=100_000):
+    app, db_path = make_app()
+    try:
+        with app.app_context():
+            seed(orders=orders)
+            staff_id = User.query.first().id
+            now = datetime.utcnow()
+            month_start = now - timedelta(days=30)
+            cases = [
+                ('admin_dashboard naive', naive_admin_dashboard),
+                ('admin_dashboard grouped', grouped_admin_dashboard),
+                ('staff_dashboard naive', lambda: naive_staff_dashboard(staff_id)),
+                ('staff_dashboard grouped', lambda: order_summary(staff_id=staff_id)),
+                ('month totals from orders', lambda: orders_month_totals(month_start, now)),
+                ('month totals from rollup', lambda: daily_totals(month_start, now)),
+            ]
+            print(f"{orders} orders")
+            print(f"{'case':<28}{'queries':>8}{'best ms':>12}")
+            for name, fn in cases:
+                best, queries, _ = timed(fn, repeat=3)
+                print(f"{name:<28}{queries:>8}{best * 1000:>12.1f}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
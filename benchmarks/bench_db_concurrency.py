@@ -0,0 +1,156 @@
+"""
+Concurrent writers and readers on one SQLite file: WAL (the default, see
+app/database.py) vs. the legacy rollback journal.
+
+    python -m benchmarks.bench_db_concurrency [--writers 4] [--readers 2] [--seconds 10]
+
+Each writer is a separate process with its own app that keeps committing
+new orders through the ORM (so the rollup and search hooks run too); each
+reader keeps running the dashboard-style queries. Reports commits, reads
+and "database is locked" errors per mode. --busy-timeout lowers the lock
+wait to show how much each mode relies on it.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.seed import make_app, seed
+
+MODES = (('wal', True), ('rollback', False))
+
+
+def _app(db_path, wal, busy_timeout_ms):
+    from config import Config
+    from app import create_app
+
+    class ConcurrencyConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        SQLITE_WAL = wal
+        SQLITE_BUSY_TIMEOUT_MS = busy_timeout_ms
+        TESTING = True
+
+    return create_app(ConcurrencyConfig)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100.0 * len(values)))] * 1000 if values else 0.0
+
+
+def writer(db_path, wal, busy_timeout_ms, seconds, worker, results):
+    from app import db
+    from app.models import Customer, Order, User
+    app = _app(db_path, wal, busy_timeout_ms)
+    rng = random.Random(worker)
+    done, locked, latencies = 0, 0, []
+    with app.app_context():
+        staff_ids = [u.id for u in User.query.filter_by(is_admin=False)]
+        max_customer = db.session.query(func.max(Customer.id)).scalar()
+        db.session.commit()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            delivery = datetime.utcnow() + timedelta(days=rng.randint(1, 30))
+            order = Order(customer_id=rng.randint(1, max_customer), staff_id=rng.choice(staff_ids),
+                          product_name='Ivory Saree', price=400.0, quantity=1, total_amount=400.0,
+                          amount_advance=100.0, amount_pending=300.0, status='pending',
+                          delivery_datetime=delivery, return_datetime=delivery + timedelta(days=2))
+            t0 = time.perf_counter()
+            try:
+                db.session.add(order)
+                db.session.commit()
+                done += 1
+                latencies.append(time.perf_counter() - t0)
+            except OperationalError as exc:
+                db.session.rollback()
+                if 'locked' not in str(exc) and 'busy' not in str(exc):
+                    raise
+                locked += 1
+    results.put(('writer', done, locked, latencies))
+
+
+def reader(db_path, wal, busy_timeout_ms, seconds, worker, results):
+    from app import db
+    from app.models import Order
+    from app.rollups import daily_totals
+    app = _app(db_path, wal, busy_timeout_ms)
+    done, locked, latencies = 0, 0, []
+    with app.app_context():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            try:
+                today = datetime.utcnow().date()
+                daily_totals(today - timedelta(days=30), today + timedelta(days=1))
+                db.session.query(Order.status, func.count(Order.id)).group_by(Order.status).all()
+                Order.query.order_by(Order.created_at.desc()).limit(25).all()
+                db.session.commit()
+                done += 1
+                latencies.append(time.perf_counter() - t0)
+            except OperationalError as exc:
+                db.session.rollback()
+                if 'locked' not in str(exc) and 'busy' not in str(exc):
+                    raise
+                locked += 1
+    results.put(('reader', done, locked, latencies))
+
+
+def run_mode(wal, args):
+    app, db_path = make_app()
+    with app.app_context():
+        seed(orders=args.orders, staff=5, customers=2_000, days=90)
+        from app import db
+        db.engine.dispose()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    procs = [ctx.Process(target=writer, args=(db_path, wal, args.busy_timeout, args.seconds, i, results))
+             for i in range(args.writers)]
+    procs += [ctx.Process(target=reader, args=(db_path, wal, args.busy_timeout, args.seconds, i, results))
+              for i in range(args.readers)]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    summary = {}
+    for kind in ('writer', 'reader'):
+        rows = [r for r in collected if r[0] == kind]
+        latencies = [x for r in rows for x in r[3]]
+        summary[kind] = {'ok': sum(r[1] for r in rows), 'locked': sum(r[2] for r in rows),
+                         'p50': _percentile(latencies, 50), 'p99': _percentile(latencies, 99)}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--orders', type=int, default=20_000)
+    parser.add_argument('--busy-timeout', type=int, default=5000, help='lock wait in ms')
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s, "
+          f"busy timeout {args.busy_timeout} ms")
+    print(f"{'mode':<10}{'commits':>9}{'locked':>8}{'w p50':>9}{'w p99':>9}"
+          f"{'reads':>8}{'locked':>8}{'r p50':>9}{'r p99':>9}")
+    for name, wal in MODES:
+        s = run_mode(wal, args)
+        w, r = s['writer'], s['reader']
+        print(f"{name:<10}{w['ok']:>9}{w['locked']:>8}{w['p50']:>7.1f}ms{w['p99']:>7.1f}ms"
+              f"{r['ok']:>8}{r['locked']:>8}{r['p50']:>7.1f}ms{r['p99']:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
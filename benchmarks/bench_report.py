@@ -0,0 +1,82 @@
+"""
+CSV report export: build-in-memory vs. streamed (app.reports).
+
+Reports time-to-first-byte, total time and peak Python heap (tracemalloc)
+for a range covering every seeded order.
+
+    python -m benchmarks.bench_report [orders]      # default 500000
+"""
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.models import Order
+from app.reports import iter_report_csv
+from benchmarks.seed import make_app, seed
+
+
+def materialized_csv(start, end):
+    """admin_reports_download before streaming: one .all(), lazy staff/customer, one StringIO."""
+    orders = Order.query.filter(Order.created_at >= start, Order.created_at < end).order_by(Order.created_at.asc()).all()
+    si = io.StringIO()
+    cw = csv.writer(si)
+    cw.writerow(['Order ID', 'Created', 'Staff', 'Customer', 'Phone', 'Product', 'Price', 'Quantity',
+                 'Total', 'Advance', 'Pending', 'Status', 'Delivery', 'Return'])
+    for o in orders:
+        cw.writerow([
+            o.id, o.created_at.strftime('%Y-%m-%d %H:%M'),
+            o.staff.username if o.staff else '', o.customer.name if o.customer else '',
+            o.customer.phone if o.customer else '', o.product_name, f"{o.price:.2f}", o.quantity,
+            f"{o.total_amount:.2f}" if o.total_amount else f"{(o.price*o.quantity):.2f}",
+            f"{o.amount_advance:.2f}", f"{o.amount_pending:.2f}", o.status,
+            o.delivery_datetime.strftime('%Y-%m-%d %H:%M') if o.delivery_datetime else '',
+            o.return_datetime.strftime('%Y-%m-%d %H:%M') if o.return_datetime else '',
+        ])
+    yield si.getvalue()
+
+
+def measure(make_chunks, trace):
+    """Return (ttfb seconds, total seconds, bytes, peak heap bytes or None)."""
+    from app import db
+    db.session.expire_all()
+    db.session.remove()
+    if trace:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    ttfb = None
+    size = 0
+    for chunk in make_chunks():
+        if ttfb is None:
+            ttfb = time.perf_counter() - t0
+        size += len(chunk)
+    total = time.perf_counter() - t0
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return ttfb, total, size, peak
+
+
+def main(orders=500_000):
+    app, db_path = make_app()
+    start, end = datetime(2000, 1, 1), datetime(2100, 1, 1)
+    try:
+        with app.app_context():
+            seed(orders=orders)
+            print(f"{orders} orders")
+            print(f"{'mode':<14}{'ttfb ms':>10}{'total s':>10}{'MB out':>9}{'peak heap MB':>14}")
+            for name, fn in [('materialized', lambda: materialized_csv(start, end)),
+                             ('streamed', lambda: iter_report_csv(start, end))]:
+                ttfb, total, size, _ = measure(fn, trace=False)
+                _, _, _, peak = measure(fn, trace=True)
+                print(f"{name:<14}{ttfb * 1000:>10.1f}{total:>10.2f}{size / 2**20:>9.1f}{peak / 2**20:>14.1f}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
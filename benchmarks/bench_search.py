@@ -0,0 +1,54 @@
+"""
+Order search: the old four-way ILIKE scan vs. the FTS5/tsvector index (app.search).
+
+    python -m benchmarks.bench_search [orders ...]      # default: 100000 1000000
+"""
+import os
+import sys
+import time
+
+from app import db
+from app.models import User, Customer, Order
+from app.search import filter_orders, ranked_order_ids, rebuild_search_index, search_backend
+from benchmarks.seed import make_app, seed, timed
+
+QUERIES = ['ramesh', 'emerald leh', 'kum', '90001', 'staff 7']
+PAGE = 50
+
+
+def ilike_search(q):
+    """admin_orders search before app.search existed, limited to one page."""
+    return Order.query.join(Order.customer).join(Order.staff).filter(
+        (Customer.name.ilike(f"%{q}%")) |
+        (Order.product_name.ilike(f"%{q}%")) |
+        (User.full_name.ilike(f"%{q}%")) |
+        (Order.created_at.cast(db.String).ilike(f"%{q}%"))
+    ).order_by(Order.created_at.desc()).limit(PAGE).all()
+
+
+def indexed_search(q):
+    return filter_orders(Order.query, q).order_by(Order.created_at.desc(), Order.id.desc()).limit(PAGE).all()
+
+
+def run(orders):
+    app, db_path = make_app()
+    try:
+        with app.app_context():
+            seed(orders=orders)
+            t0 = time.perf_counter()
+            rebuild_search_index()
+            backfill = time.perf_counter() - t0
+            print(f"\n{orders} orders, backend={search_backend()}, backfill {backfill:.2f}s")
+            print(f"{'query':<14}{'ilike ms':>10}{'index ms':>10}{'ranked ms':>11}")
+            for q in QUERIES:
+                old, _, _ = timed(lambda: ilike_search(q), repeat=3)
+                new, _, _ = timed(lambda: indexed_search(q), repeat=3)
+                ranked, _, _ = timed(lambda: ranked_order_ids(q, limit=PAGE), repeat=3)
+                print(f"{q:<14}{old * 1000:>10.1f}{new * 1000:>10.1f}{ranked * 1000:>11.1f}")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    for n in [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]:
+        run(n)
@@ -0,0 +1,172 @@
+"""
+Mixed traffic against a real HTTP server: slow photo uploads and bill PDF
+renders alongside fast order-list reads.
+
+    python -m benchmarks.bench_serving [--reads 300] [--uploaders 2] [--pdfs 2] [--upload-seconds 3]
+                                       [--modes sync,threaded,offload]
+
+Modes:
+    sync        one request at a time, no keep-alive (gunicorn sync worker)
+    threaded    a thread per request, uploads and PDFs inline (gthread, no offload)
+    offload     threaded plus the offload pool for photos and the bill process
+                pool for PDFs (gthread with this repo's defaults)
+
+Uploaders trickle a multipart body with two photos over --upload-seconds,
+like a phone on a slow network; PDF clients fetch bills of uncached orders.
+Both keep going until the readers have finished. The werkzeug server stands
+in for one gunicorn worker. Reads in sync mode queue behind whole uploads,
+so that mode takes minutes at the default sizes.
+"""
+import argparse
+import io
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.loadgen import load, serve
+from benchmarks.seed import BENCH_PASSWORD, make_app, seed
+
+MODES = [
+    ('sync', {'threaded': False, 'keep_alive': False}, {'OFFLOAD_THREADS': 0, 'BILL_RENDER_OFFLOAD': False}),
+    ('threaded', {'threaded': True}, {'OFFLOAD_THREADS': 0, 'BILL_RENDER_OFFLOAD': False}),
+    ('offload', {'threaded': True}, {'OFFLOAD_THREADS': min(4, os.cpu_count() or 1), 'BILL_RENDER_OFFLOAD': True}),
+]
+
+
+def login_cookie(app, username):
+    client = app.test_client()
+    client.post('/', data={'username': username, 'password': BENCH_PASSWORD})
+    return f"session={client.get_cookie('session').value}"
+
+
+def photo_bytes(seed_value):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.effect_noise((1600, 1200), 40 + seed_value).convert('RGB').save(buf, 'JPEG', quality=90)
+    return buf.getvalue()
+
+
+def multipart(photos):
+    boundary = uuid.uuid4().hex
+    fields = {'customer_name': 'Bench Upload', 'phone': '9999900000', 'product_name': 'Ivory Saree',
+              'price': '400', 'quantity': '1', 'amount_advance': '100'}
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+             for k, v in fields.items()]
+    for i, data in enumerate(photos):
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="photos"; '
+                     f'filename="p{i}.jpg"\r\nContent-Type: image/jpeg\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return boundary, b''.join(parts)
+
+
+def slow_upload(port, cookie, boundary, body, seconds):
+    """POST /staff/new, sending the body in 64 KiB pieces spread over `seconds`. Returns the status."""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=120)
+    try:
+        sock.sendall((f"POST /staff/new HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n"
+                      f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode())
+        chunk = 64 * 1024
+        pause = seconds / max(len(body) // chunk, 1)
+        for start in range(0, len(body), chunk):
+            sock.sendall(body[start:start + chunk])
+            time.sleep(pause)
+        status = sock.recv(64).split(b' ')[1]
+        while sock.recv(65536):
+            pass
+        return int(status)
+    finally:
+        sock.close()
+
+
+def fetch_pdf(port, cookie, order_id):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=120)
+    try:
+        sock.sendall((f"GET /admin/order/{order_id}/bill?format=pdf HTTP/1.1\r\nHost: localhost\r\n"
+                      f"Cookie: {cookie}\r\nConnection: close\r\n\r\n").encode())
+        head = sock.recv(64)
+        while sock.recv(65536):
+            pass
+        return int(head.split(b' ')[1])
+    finally:
+        sock.close()
+
+
+def run_mode(app, server_kwargs, cookies, upload, order_ids, args):
+    stop = threading.Event()
+    done = {'uploads': 0, 'pdfs': 0, 'errors': 0}
+    lock = threading.Lock()
+    next_order = iter(order_ids)
+
+    def uploader():
+        while not stop.is_set():
+            ok = slow_upload(port, cookies['staff'], *upload, args.upload_seconds) == 302
+            with lock:
+                done['uploads' if ok else 'errors'] += 1
+
+    def pdf_client():
+        while not stop.is_set():
+            with lock:
+                order_id = next(next_order)
+            ok = fetch_pdf(port, cookies['admin'], order_id) == 200
+            with lock:
+                done['pdfs' if ok else 'errors'] += 1
+
+    with serve(app, **server_kwargs) as port:
+        threads = [threading.Thread(target=uploader) for _ in range(args.uploaders)]
+        threads += [threading.Thread(target=pdf_client) for _ in range(args.pdfs)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)  # let the slow clients get in first
+        reads = load(port, ['/staff/orders'], requests=args.reads, concurrency=args.concurrency,
+                     headers={'Cookie': cookies['staff']})
+        stop.set()
+        for t in threads:
+            t.join()
+    return reads, done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reads', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--uploaders', type=int, default=2)
+    parser.add_argument('--pdfs', type=int, default=2)
+    parser.add_argument('--upload-seconds', type=float, default=3.0)
+    parser.add_argument('--modes', default=','.join(name for name, _, _ in MODES))
+    args = parser.parse_args()
+
+    app, db_path = make_app()
+    uploads = tempfile.mkdtemp(prefix='bench_serving_up_')
+    bills = tempfile.mkdtemp(prefix='bench_serving_bills_')
+    app.config.update(UPLOAD_FOLDER=uploads, BILL_CACHE_FOLDER=bills)
+    try:
+        with app.app_context():
+            seed(orders=20_000, staff=5, customers=3_000, days=90)
+        cookies = {'staff': login_cookie(app, 'staff0'), 'admin': login_cookie(app, 'admin')}
+        upload = multipart([photo_bytes(1), photo_bytes(2)])
+        print(f"{os.cpu_count()} CPUs; {args.reads} reads x{args.concurrency}, {args.uploaders} slow uploaders "
+              f"({len(upload[1]) / 2**20:.1f} MB over {args.upload_seconds:.0f}s), {args.pdfs} PDF clients")
+        print(f"{'mode':<10}{'reads/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'uploads':>9}{'pdfs':>6}{'errors':>8}")
+        for index, (name, server_kwargs, config) in enumerate(MODES):
+            if name not in args.modes.split(','):
+                continue
+            app.config.update(config)
+            shutil.rmtree(bills)
+            os.makedirs(bills)
+            order_ids = range(index + 1, 20_000, len(MODES))  # disjoint per mode: every PDF is a cache miss
+            reads, done = run_mode(app, server_kwargs, cookies, upload, order_ids, args)
+            print(f"{name:<10}{reads['rps']:>9.1f}{reads['p50_ms']:>7.1f}ms{reads['p95_ms']:>7.1f}ms"
+                  f"{reads['p99_ms']:>7.1f}ms{done['uploads']:>9}{done['pdfs']:>6}{done['errors']:>8}")
+    finally:
+        shutil.rmtree(uploads, ignore_errors=True)
+        shutil.rmtree(bills, ignore_errors=True)
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
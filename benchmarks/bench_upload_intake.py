@@ -0,0 +1,132 @@
+"""
+Multipart photo intake with large synthetic uploads: Werkzeug's default
+spooling request vs. app.uploads.UploadRequest (stream to disk, hash and
+sniff while receiving, quotas enforced mid-stream).
+
+    python -m benchmarks.bench_upload_intake [photos] [mb]     # default 4 x 12 MB
+
+Peak memory is Python allocations (tracemalloc) while request.files is
+parsed, excluding the request body itself. Then with the streaming
+request it checks the validation paths: a non-image part is rejected at
+its first chunk and never stored, a part over UPLOAD_MAX_FILE_BYTES and
+a request over UPLOAD_MAX_REQUEST_BYTES are cut off while they arrive
+(the latter with 413), no temp files are left behind, and a real photo
+is stored under its streamed SHA-256. The script exits non-zero if any
+check fails.
+"""
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import Request, request
+from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.test import EnvironBuilder
+
+from app.images import HASH_LENGTH
+from app.uploads import UploadRequest
+from app.utils import save_upload
+from benchmarks.seed import make_app
+
+MB = 1024 * 1024
+
+
+def synthetic(mb, head=b'\xff\xd8\xff\xe0'):
+    """`mb` MB that sniff as a JPEG (or as `head`) but are random bytes."""
+    return head + os.urandom(mb * MB - len(head))
+
+
+def environ(files):
+    data = {'photos': [(io.BytesIO(body), name) for body, name in files]}
+    return EnvironBuilder(path='/upload', method='POST', data=data).get_environ()
+
+
+def replay(env, body):
+    """A fresh copy of `env` reading `body`, so one request can be parsed several times."""
+    return dict(env, **{'wsgi.input': io.BytesIO(body)})
+
+
+def parse(app, env):
+    """(seconds, peak bytes, files) for parsing the multipart body of `env`."""
+    with app.request_context(env):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        files = request.files.getlist('photos')
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak, [(f.filename, getattr(f.stream, 'error', None)) for f in files]
+
+
+def temp_files(folder):
+    return [n for n in os.listdir(folder) if n.endswith('.tmp')]
+
+
+def main(photos=4, mb=12):
+    app, db_path = make_app()
+    folder = tempfile.mkdtemp(prefix='bench_intake_')
+    app.config.update(UPLOAD_FOLDER=folder, OFFLOAD_THREADS=0, MAX_CONTENT_LENGTH=None,
+                      UPLOAD_MAX_REQUEST_BYTES=(photos + 1) * mb * MB)
+    failures = []
+
+    def check(ok, label):
+        print(f"  {'ok  ' if ok else 'FAIL'} {label}")
+        if not ok:
+            failures.append(label)
+
+    try:
+        env = environ([(synthetic(mb), f'p{i}.jpg') for i in range(photos)])
+        body = env['wsgi.input'].read()
+        print(f"{photos} photos x {mb} MB in one request")
+        print(f"{'request class':<26}{'parse s':>9}{'peak KB':>10}")
+        for label, cls in (('werkzeug default', Request), ('UploadRequest', UploadRequest)):
+            app.request_class = cls
+            elapsed, peak, _ = parse(app, replay(env, body))
+            print(f"{label:<26}{elapsed:>9.3f}{peak / 1024:>10.0f}")
+        del env, body
+
+        app.request_class = UploadRequest
+        print('checks (UploadRequest):')
+        app.config['UPLOAD_MAX_FILE_BYTES'] = mb * MB
+        _, _, files = parse(app, environ([(synthetic(mb, b'MZ\x90\x00'), 'fake.jpg'),
+                                          (synthetic(mb + 1), 'huge.jpg')]))
+        check(files[0][1] is not None and 'not a JPEG' in files[0][1], 'non-image part rejected by magic bytes')
+        check(files[1][1] is not None and 'larger than' in files[1][1], 'part over UPLOAD_MAX_FILE_BYTES rejected')
+        check(not temp_files(folder), 'no temp files left after the request')
+
+        app.config['UPLOAD_MAX_REQUEST_BYTES'] = 2 * mb * MB
+        try:
+            parse(app, environ([(synthetic(mb), f'q{i}.jpg') for i in range(3)]))
+            check(False, 'request over UPLOAD_MAX_REQUEST_BYTES aborted with 413')
+        except RequestEntityTooLarge:
+            check(True, 'request over UPLOAD_MAX_REQUEST_BYTES aborted with 413')
+        check(not temp_files(folder), 'no temp files left after the 413')
+
+        buf = io.BytesIO()
+        Image.effect_noise((4000, 3000), 50).convert('RGB').save(buf, 'JPEG', quality=95)
+        photo = buf.getvalue()
+        app.config['UPLOAD_MAX_REQUEST_BYTES'] = 64 * MB
+        app.config['UPLOAD_MAX_FILE_BYTES'] = 16 * MB
+        with app.request_context(environ([(photo, 'real.jpg')])):
+            t0 = time.perf_counter()
+            saved = save_upload(request.files['photos'])
+            elapsed = time.perf_counter() - t0
+        expected = hashlib.sha256(photo).hexdigest()[:HASH_LENGTH]
+        check(saved is not None and saved.startswith(expected),
+              f'{len(photo) / MB:.1f} MB photo stored under its streamed hash ({elapsed:.2f} s to ingest)')
+        check(not temp_files(folder), 'temp file gone after ingest')
+    finally:
+        os.remove(db_path)
+        shutil.rmtree(folder, ignore_errors=True)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,80 @@
+"""
+Upload serving load test: plain send_file vs. app.utils.send_upload.
+
+A browser with a warm cache never re-requests immutable photos; when it
+does revalidate it sends If-None-Match and gets a bodiless 304. The
+'revalidate' rows model that; the 'cold' rows fetch full bodies.
+
+    python -m benchmarks.bench_uploads [requests] [concurrency]
+"""
+import http.client
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from flask import Blueprint, current_app, send_file
+from PIL import Image
+
+from app.images import ingest_image
+from benchmarks.loadgen import serve, load
+from benchmarks.seed import make_app
+
+legacy = Blueprint('legacy_uploads', __name__)
+
+
+@legacy.route('/old-uploads/<filename>')
+def old_uploaded_file(filename):
+    """uploaded_file before send_upload."""
+    return send_file(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+
+
+def make_photos(n=20):
+    names = []
+    for i in range(n):
+        buf = io.BytesIO()
+        Image.effect_noise((2400, 1800), 40 + i).convert('RGB').save(buf, 'JPEG', quality=90)
+        buf.seek(0)
+        names.append(ingest_image(buf))
+    return names
+
+
+def main(requests=2000, concurrency=8):
+    app, db_path = make_app()
+    app.register_blueprint(legacy)
+    folder = tempfile.mkdtemp(prefix='bench_uploads_')
+    app.config['UPLOAD_FOLDER'] = folder
+    try:
+        with app.app_context():
+            names = make_photos()
+        thumbs = [n.replace('.webp', '_thumb.webp') for n in names]
+        with serve(app) as port:
+            etags = {}
+            for n in names + thumbs:
+                c = http.client.HTTPConnection('127.0.0.1', port)
+                c.request('GET', f'/uploads/{n}')
+                r = c.getresponse(); r.read()
+                etags[f'/uploads/{n}'] = r.getheader('ETag')
+                c.close()
+            cases = [
+                ('old send_file, cold', [f'/old-uploads/{n}' for n in names], None),
+                ('new, cold full size', [f'/uploads/{n}' for n in names], None),
+                ('new, cold thumbnails', [f'/uploads/{n}' for n in thumbs], None),
+                ('new, revalidate (304)', [f'/uploads/{n}' for n in names],
+                 lambda path: {'If-None-Match': etags[path]}),
+            ]
+            print(f"{requests} requests, concurrency {concurrency}")
+            print(f"{'case':<26}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'MB':>8}  statuses")
+            for name, paths, headers in cases:
+                s = load(port, paths, requests=requests, concurrency=concurrency, headers=headers)
+                print(f"{name:<26}{s['rps']:>9.0f}{s['p50_ms']:>9.2f}{s['p99_ms']:>9.2f}"
+                      f"{s['bytes'] / 2**20:>8.1f}  {s['statuses']}")
+    finally:
+        os.remove(db_path)
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,96 @@
+"""
+Minimal concurrent HTTP load generator against a real (threaded) WSGI server.
+"""
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+
+class _QuietHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real front server
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class _CloseHandler(_QuietHandler):
+    protocol_version = 'HTTP/1.0'  # one request per connection, like gunicorn's sync workers
+
+
+@contextmanager
+def serve(app, threaded=True, keep_alive=True):
+    """Run app on 127.0.0.1:<free port> in a background thread; yields the port."""
+    handler = _QuietHandler if keep_alive else _CloseHandler
+    server = make_server('127.0.0.1', 0, app, threaded=threaded, request_handler=handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def load(port, paths, requests=1000, concurrency=8, headers=None, method='GET', body=None):
+    """
+    Issue `requests` requests spread over `concurrency` keep-alive connections,
+    cycling through `paths`. Returns a dict of throughput and latency stats.
+    """
+    headers = headers or {}
+    per_worker = max(requests // concurrency, 1)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    bytes_in = [0]
+
+    def worker(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local, local_status, local_bytes = [], {}, 0
+        for i in range(per_worker):
+            path = paths[(offset + i) % len(paths)]
+            hdrs = headers(path) if callable(headers) else headers
+            t0 = time.perf_counter()
+            conn.request(method, path, body=body, headers=hdrs)
+            resp = conn.getresponse()
+            data = resp.read()
+            local.append(time.perf_counter() - t0)
+            local_status[resp.status] = local_status.get(resp.status, 0) + 1
+            local_bytes += len(data)
+            if resp.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            bytes_in[0] += local_bytes
+            for k, v in local_status.items():
+                statuses[k] = statuses.get(k, 0) + v
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'bytes': bytes_in[0],
+        'statuses': statuses,
+    }
@@ -0,0 +1,185 @@
+"""
+Helpers to build a throwaway app with a seeded database for benchmarks.
+
+seed() generates a synthetic dataset: staff (password BENCH_PASSWORD) plus
+an 'admin' account, customers, orders spread over `days`, products for the
+availability checks and, optionally, order photos drawn from a small pool
+of real ingested images. SIZES holds the standard 10k/100k/1M presets.
+"""
+import io
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, text
+from werkzeug.security import generate_password_hash
+
+from config import Config
+from app import create_app, db
+from app.images import ingest_image, PILLOW_AVAILABLE
+from app.models import User, Customer, Order, OrderPhoto, Product
+from app.search import rebuild_search_index
+from app.rollups import rebuild_rollups
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Ramesh', 'Lakshmi', 'Karthik', 'Divya', 'Suresh', 'Anitha', 'Vijay', 'Meena']
+LAST_NAMES = ['Kumar', 'Iyer', 'Nair', 'Reddy', 'Pillai', 'Sharma', 'Menon', 'Rao']
+STATUSES = ['pending', 'approved', 'rejected', 'completed', 'canceled']
+COLOURS = ['Maroon', 'Ivory', 'Emerald', 'Gold', 'Navy', 'Peach', 'Black', 'Rose']
+PRODUCTS = ['Lehenga', 'Saree', 'Sherwani', 'Bridal Gown', 'Kurta Set', 'Blazer', 'Necklace Set']
+BENCH_PASSWORD = 'bench-pass'
+
+# Standard dataset sizes: seed(**SIZES['100k'])
+SIZES = {
+    '10k': {'orders': 10_000, 'staff': 5, 'customers': 3_000, 'days': 180, 'photos': 1.0},
+    '100k': {'orders': 100_000, 'staff': 20, 'customers': 20_000, 'days': 365, 'photos': 1.0},
+    '1m': {'orders': 1_000_000, 'staff': 60, 'customers': 150_000, 'days': 730, 'photos': 1.0},
+}
+
+
+def make_app(db_path=None):
+    """Create an app bound to a fresh SQLite file (a temp file by default)."""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix='.sqlite', prefix='bench_')
+        os.close(fd)
+        os.remove(db_path)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        UPLOAD_FOLDER = os.path.join(tempfile.gettempdir(), 'bench_uploads')
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+
+    return create_app(BenchConfig), db_path
+
+
+def make_photo_pool(n=12, rng_seed=42):
+    """Ingest n generated JPEGs into UPLOAD_FOLDER; returns their stored names."""
+    if not PILLOW_AVAILABLE:
+        return [f'missing_{i}.jpg' for i in range(n)]
+    from PIL import Image
+    names = []
+    for i in range(n):
+        buf = io.BytesIO()
+        Image.effect_noise((1200, 900), 30 + i + rng_seed % 7).convert('RGB').save(buf, 'JPEG', quality=85)
+        buf.seek(0)
+        names.append(ingest_image(buf))
+    return names
+
+
+def seed(orders=100_000, staff=20, customers=None, days=365, photos=0.0, products=True,
+         batch=10_000, rng_seed=42):
+    """
+    Insert staff, customers and orders with executemany. Needs an app context.
+    `photos` is the mean number of photos per order (0 for none); `products`
+    adds a Product row with ample stock for every seeded product name.
+    """
+    rng = random.Random(rng_seed)
+    customers = customers or max(orders // 5, 1)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    staff_rows = [{'username': f'staff{i}', 'full_name': f'Staff {i}', 'password_hash': password_hash,
+                   'is_admin': False, 'created_at': now} for i in range(staff)]
+    staff_rows.append({'username': 'admin', 'full_name': 'Bench Admin', 'password_hash': password_hash,
+                       'is_admin': True, 'created_at': now})
+    db.session.execute(insert(User), staff_rows)
+    staff_ids = [u.id for u in User.query.filter(User.username.like('staff%')).all()]
+
+    for start in range(0, customers, batch):
+        db.session.execute(insert(Customer), [
+            {'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', 'phone': f'9{i:09d}', 'phone_normalized': f'9{i:09d}', 'address': f'{i} Main Road', 'created_at': now}
+            for i in range(start, min(start + batch, customers))
+        ])
+    first_customer = db.session.query(db.func.min(Customer.id)).scalar()
+
+    for start in range(0, orders, batch):
+        rows = []
+        for _ in range(start, min(start + batch, orders)):
+            price = float(rng.randint(5, 200) * 10)
+            qty = rng.randint(1, 3)
+            advance = float(rng.randint(0, int(price * qty) // 100) * 100)
+            created = now - timedelta(days=rng.random() * days)
+            delivery = created + timedelta(days=rng.randint(0, 14), hours=rng.randint(8, 20))
+            rows.append({
+                'product_name': f'{rng.choice(COLOURS)} {rng.choice(PRODUCTS)}',
+                'product_details': 'Size M, colour maroon',
+                'price': price,
+                'quantity': qty,
+                'delivery_datetime': delivery,
+                'return_datetime': delivery + timedelta(days=rng.randint(1, 5)),
+                'amount_advance': advance,
+                'amount_pending': price * qty - advance,
+                'total_amount': price * qty,
+                'status': rng.choice(STATUSES),
+                'staff_id': rng.choice(staff_ids),
+                'customer_id': first_customer + rng.randrange(customers),
+                'created_at': created,
+            })
+        db.session.execute(insert(Order), rows)
+        db.session.commit()
+
+    if products:
+        db.session.execute(insert(Product), [{'name': f'{c} {p}', 'stock': 100_000, 'is_active': True,
+                                              'created_at': now} for c in COLOURS for p in PRODUCTS])
+        db.session.commit()
+    if photos:
+        _seed_photos(rng, photos, batch)
+
+    # bulk inserts bypass the ORM flush hooks, so backfill derived tables
+    rebuild_search_index()
+    rebuild_rollups()
+    if db.engine.dialect.name == 'sqlite':
+        # planner statistics, as a long-lived database would have; without them
+        # SQLite picks the status index for multi-product availability queries
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    return staff_ids
+
+
+def _seed_photos(rng, mean, batch):
+    pool = make_photo_pool()
+    first, last = db.session.query(db.func.min(Order.id), db.func.max(Order.id)).one()
+    rows = []
+    for order_id in range(first, last + 1):
+        count = int(mean) + (rng.random() < mean - int(mean))
+        for position, name in enumerate(rng.sample(pool, min(count, len(pool)))):
+            rows.append({'order_id': order_id, 'filename': name, 'position': position})
+        if len(rows) >= batch:
+            db.session.execute(insert(OrderPhoto), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(OrderPhoto), rows)
+    db.session.commit()
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count SQL statements executed on the engine (the app's by default) inside the block."""
+    counter = {'queries': 0}
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter['queries'] += 1
+
+    engine = engine if engine is not None else db.engine
+    event.listen(engine, 'before_cursor_execute', _before)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before)
+
+
+def timed(fn, repeat=5):
+    """Run fn repeat times; return (best seconds, queries per run, last result)."""
+    best = None
+    result = None
+    with count_queries() as counter:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+            db.session.expire_all()
+    return best, counter['queries'] // repeat, result
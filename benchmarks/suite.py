@@ -0,0 +1,292 @@
+"""
+End-to-end benchmark suite.
+
+Seeds a synthetic dataset (benchmarks.seed.SIZES), drives the key routes
+through the Flask test client (latency, SQL statements per request) and
+the read-only ones through a concurrent HTTP load generator (throughput,
+latency under concurrency), and writes everything plus peak RSS to a JSON
+baseline. Pass --compare to diff against an earlier baseline.
+
+    python -m benchmarks.suite --size 10k
+    python -m benchmarks.suite --size 100k --compare benchmarks/results/100k_<commit>.json
+    python -m benchmarks.suite --size 1m --db /tmp/bench_1m.sqlite   # seed once, reuse
+    python -m benchmarks.suite --size 10k --only admin_orders,search
+
+Bill ZIP scenarios need xhtml2pdf and render every bill of one day, so they
+dominate the run at 1m; leave them out with --skip bills_zip.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import quote_plus
+
+from app import db
+from app.models import Order
+from app.pagination import encode_cursor
+from benchmarks.loadgen import serve, load, percentile
+from benchmarks.seed import make_app, seed, count_queries, SIZES, BENCH_PASSWORD
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# path and data may be callables taking the context dict built by _context()
+Scenario = namedtuple('Scenario', 'name role method path data iterations http')
+
+
+def _scenarios():
+    def order_form(ctx, price):
+        start = ctx['future'] + timedelta(days=random.randint(0, 60))
+        return {'customer_name': 'Bench Customer', 'phone': f"8{random.randint(0, 10**9 - 1):09d}",
+                'address': '1 Bench Road', 'product_name': ctx['product'], 'price': price, 'quantity': 1,
+                'delivery_datetime': start.strftime('%Y-%m-%d %H:%M'),
+                'return_datetime': (start + timedelta(days=2)).strftime('%Y-%m-%d %H:%M'),
+                'amount_advance': 0, 'status': 'pending'}
+
+    return [
+        Scenario('login', None, 'POST', '/', lambda ctx: {'username': 'staff0', 'password': BENCH_PASSWORD},
+                 20, False),
+        Scenario('admin_dashboard', 'admin', 'GET', '/admin', None, 30, True),
+        Scenario('staff_dashboard', 'staff', 'GET', '/staff', None, 30, True),
+        Scenario('admin_orders', 'admin', 'GET', '/admin/orders', None, 30, True),
+        Scenario('admin_orders_deep_page', 'admin', 'GET',
+                 lambda ctx: f"/admin/orders?after={ctx['deep_cursor']}", None, 30, True),
+        Scenario('staff_orders', 'staff', 'GET', '/staff/orders', None, 30, True),
+        Scenario('search', 'admin', 'GET', lambda ctx: f"/admin/orders?q={quote_plus(random.choice(ctx['terms']))}",
+                 None, 30, True),
+        Scenario('search_ranked', 'admin', 'GET',
+                 lambda ctx: f"/admin/orders?q={quote_plus(random.choice(ctx['terms']))}&sort=relevance", None, 30, True),
+        Scenario('order_view', 'admin', 'GET',
+                 lambda ctx: f"/admin/order/{random.choice(ctx['order_ids'])}/view", None, 30, True),
+        Scenario('order_create', 'staff', 'POST', '/staff/new', lambda ctx: order_form(ctx, 500), 20, False),
+        Scenario('order_edit', 'admin', 'POST',
+                 lambda ctx: f"/admin/order/{random.choice(ctx['order_ids'])}/edit",
+                 lambda ctx: order_form(ctx, 750), 20, False),
+        Scenario('csv_report_month', 'admin', 'GET',
+                 lambda ctx: f"/admin/reports/download?type=monthly&date={ctx['month']}", None, 3, False),
+        Scenario('bills_zip', 'admin', 'GET',
+                 lambda ctx: f"/admin/reports/download_bills?type=daily&date={ctx['day']}", None, 2, False),
+    ]
+
+
+def _resolve(value, ctx):
+    return value(ctx) if callable(value) else value
+
+
+def _context(rng):
+    newest = Order.query.order_by(Order.created_at.desc(), Order.id.desc()).first()
+    total = Order.query.count()
+    middle = Order.query.order_by(Order.created_at.desc(), Order.id.desc()).offset(total // 2).first()
+    ids = [i for (i,) in db.session.query(Order.id).order_by(db.func.random()).limit(200)]
+    yesterday = (newest.created_at - timedelta(days=1)).date()
+    return {
+        'order_ids': ids,
+        'deep_cursor': encode_cursor(middle.created_at, middle.id),
+        'terms': ['ramesh', 'emerald leh', 'kum', 'staff 7', 'saree'],
+        'month': newest.created_at.strftime('%Y-%m'),
+        'day': yesterday.isoformat(),
+        'product': f"{rng.choice(['Gold', 'Navy'])} {rng.choice(['Saree', 'Blazer'])}",
+        'future': datetime.utcnow() + timedelta(days=400),
+    }
+
+
+def _rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _login(client, username):
+    client.post('/', data={'username': username, 'password': BENCH_PASSWORD})
+    return client
+
+
+def run_client(app, engine, scenario, ctx, clients):
+    """
+    Run a scenario through the test client; latency stats and SQL statements
+    per request. Call outside an app context: each request needs its own, or
+    flask_login's cached user (on g) leaks between clients.
+    """
+    latencies = []
+    statuses = {}
+    with count_queries(engine) as counter:
+        for _ in range(scenario.iterations):
+            path, data = _resolve(scenario.path, ctx), _resolve(scenario.data, ctx)
+            # anonymous scenarios (login) get a fresh cookie jar every time
+            client = clients[scenario.role] if scenario.role else app.test_client()
+            t0 = time.perf_counter()
+            resp = client.open(path, method=scenario.method, data=data)
+            body = resp.get_data()  # drains streamed responses
+            latencies.append(time.perf_counter() - t0)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+            resp.close()
+    return {
+        'iterations': scenario.iterations,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries_per_request': round(counter['queries'] / scenario.iterations, 1),
+        'bytes': len(body),
+        'statuses': {str(k): v for k, v in statuses.items()},
+        'peak_rss_mb': _rss_mb(),
+    }
+
+
+def _cookie(port, username):
+    """Log in over HTTP and return the session Cookie header value."""
+    import http.client
+    from urllib.parse import urlencode
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('POST', '/', body=urlencode({'username': username, 'password': BENCH_PASSWORD}),
+                 headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader('Set-Cookie', '').split(';', 1)[0]
+    conn.close()
+    return cookie
+
+
+def run_http(app, scenarios, ctx, requests, concurrency):
+    results = {}
+    with serve(app) as port:
+        cookies = {'admin': _cookie(port, 'admin'), 'staff': _cookie(port, 'staff0')}
+        for scenario in scenarios:
+            paths = [_resolve(scenario.path, ctx) for _ in range(20)]
+            stats = load(port, paths, requests=requests, concurrency=concurrency,
+                         headers={'Cookie': cookies[scenario.role]})
+            results[scenario.name] = {
+                'requests': stats['requests'], 'concurrency': concurrency,
+                'rps': round(stats['rps'], 1),
+                'p50_ms': round(stats['p50_ms'], 2), 'p95_ms': round(stats['p95_ms'], 2),
+                'p99_ms': round(stats['p99_ms'], 2),
+                'statuses': {str(k): v for k, v in stats['statuses'].items()},
+                'peak_rss_mb': _rss_mb(),
+            }
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(old, new, threshold=0.20, min_ms=1.0):
+    """
+    Print old -> new for the headline metrics and return the number of
+    regressions: more than `threshold` worse, and for latencies also more
+    than `min_ms` worse (sub-millisecond jitter is not a regression).
+    """
+    regressions = 0
+    rows = []
+    for section, metrics in (('client', ('p50_ms', 'p95_ms', 'queries_per_request')),
+                             ('http', ('rps', 'p95_ms'))):
+        for name, result in new.get(section, {}).items():
+            before = old.get(section, {}).get(name)
+            if not before:
+                continue
+            for metric in metrics:
+                a, b = before.get(metric), result.get(metric)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a
+                if metric == 'rps':
+                    worse = change < -threshold
+                else:
+                    worse = change > threshold and (not metric.endswith('_ms') or b - a > min_ms)
+                regressions += worse
+                rows.append(f"{section:<7}{name:<26}{metric:<20}{a:>10}{b:>10}{change * 100:>+8.1f}%"
+                            f"{'  REGRESSION' if worse else ''}")
+    print(f"\nvs {old['meta'].get('commit')} ({old['meta'].get('size')})")
+    print(f"{'':<7}{'scenario':<26}{'metric':<20}{'before':>10}{'after':>10}{'change':>9}")
+    print('\n'.join(rows))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='10k')
+    parser.add_argument('--db', help='SQLite file to seed (or reuse if it exists)')
+    parser.add_argument('--only', help='comma-separated scenario names')
+    parser.add_argument('--skip', help='comma-separated scenario names to leave out')
+    parser.add_argument('--http-requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-http', action='store_true', help='skip the HTTP load phase')
+    parser.add_argument('--out', help='output JSON path (default benchmarks/results/<size>_<commit>.json)')
+    parser.add_argument('--compare', help='earlier baseline JSON to diff against')
+    parser.add_argument('--threshold', type=float, default=0.20, help='relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    scenarios = _scenarios()
+    if args.only:
+        scenarios = [s for s in scenarios if s.name in args.only.split(',')]
+    if args.skip:
+        scenarios = [s for s in scenarios if s.name not in args.skip.split(',')]
+    try:
+        import xhtml2pdf  # noqa: F401
+    except ImportError:
+        scenarios = [s for s in scenarios if s.name != 'bills_zip']
+
+    reuse = bool(args.db) and os.path.exists(args.db)
+    app, db_path = make_app(args.db)
+    rng = random.Random(1)
+    random.seed(1)
+    results = {'meta': {
+        'commit': _git_commit(), 'size': args.size, 'dataset': SIZES[args.size],
+        'created': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(), 'cpus': os.cpu_count(),
+    }, 'client': {}, 'http': {}}
+    try:
+        with app.app_context():
+            if not reuse:
+                t0 = time.perf_counter()
+                seed(**SIZES[args.size])
+                results['meta']['seed_seconds'] = round(time.perf_counter() - t0, 1)
+                print(f"seeded {args.size} in {results['meta']['seed_seconds']}s -> {db_path}")
+            ctx = _context(rng)
+            engine = db.engine
+            db.session.remove()
+
+        clients = {'admin': _login(app.test_client(), 'admin'), 'staff': _login(app.test_client(), 'staff0')}
+        print(f"{'scenario':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'rss MB':>9}")
+        for scenario in scenarios:
+            r = run_client(app, engine, scenario, ctx, clients)
+            results['client'][scenario.name] = r
+            print(f"{scenario.name:<26}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+                  f"{r['queries_per_request']:>9}{r['peak_rss_mb']:>9}")
+
+        if not args.no_http:
+            http_scenarios = [s for s in scenarios if s.http]
+            results['http'] = run_http(app, http_scenarios, ctx, args.http_requests, args.concurrency)
+            print(f"\n{'http x' + str(args.concurrency):<26}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+            for name, r in results['http'].items():
+                print(f"{name:<26}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+        results['meta']['peak_rss_mb'] = _rss_mb()
+    finally:
+        if not args.db:
+            os.remove(db_path)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{args.size}_{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, threshold=args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,110 @@
+import math
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def available_cpus():
+    """
+    CPUs this process may actually use: the cgroup CPU quota (v2 cpu.max or
+    v1 cfs_quota_us / cfs_period_us, rounded up) or the affinity mask,
+    whichever is smaller. os.cpu_count() reports the host's CPUs inside a
+    container, e.g. 64 on a Render instance limited to half a CPU.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    quota = period = None
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            pass
+    try:
+        if quota not in (None, 'max', '-1') and int(period) > 0:
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except ValueError:
+        pass
+    return max(cpus, 1)
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'change-this-secret-key'
+    # Logged-in user snapshots cached per process (app/sessions.py); 0 disables
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = 256
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'data.sqlite')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine tuning (app/database.py); postgres:// URLs are rewritten to postgresql://
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')  # read replica for reports
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 1800         # seconds; below typical server/proxy idle timeouts
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') == '1'
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_CACHE_SIZE_KB = 64 * 1024
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB upload limit
+    MAX_CONTENT_LENGTH = 65 * 1024 * 1024  # whole request; photos stream to disk (app/uploads.py)
+    UPLOAD_MAX_FILE_BYTES = 16 * 1024 * 1024      # per photo, enforced while it arrives
+    UPLOAD_MAX_REQUEST_BYTES = 64 * 1024 * 1024   # all photos in one request
+    # Uploaded photos are re-encoded (see app/images.py)
+    UPLOAD_IMAGE_FORMAT = os.environ.get('UPLOAD_IMAGE_FORMAT', 'WEBP')  # WEBP or JPEG
+    UPLOAD_IMAGE_MAX_SIZE = 1600   # longest side, px
+    UPLOAD_THUMB_SIZE = 320        # square thumbnail, px
+    UPLOAD_IMAGE_QUALITY = 80
+    # Threads per process for photo ingestion (app/offload.py); 0 = inline in the request thread
+    OFFLOAD_THREADS = int(os.environ.get('OFFLOAD_THREADS', min(4, available_cpus())))
+    # Let nginx serve upload bodies: internal location prefix, e.g. '/protected-uploads/'
+    UPLOAD_ACCEL_REDIRECT = os.environ.get('UPLOAD_ACCEL_REDIRECT')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == '1'
+    COMPANY_NAME = 'Neraa Rental House'
+    # Customers are matched on phone digits without this country code (app/customers.py)
+    PHONE_COUNTRY_CODE = os.environ.get('PHONE_COUNTRY_CODE', '91')
+    CUSTOMER_LOOKUP_LIMIT = 10     # autocomplete suggestions per keystroke
+    # Live admin updates over server-sent events (app/events.py)
+    EVENTS_POLL_INTERVAL = 1.0     # seconds between checks for new commits
+    EVENTS_KEEPALIVE = 15          # seconds between keepalive comments (and forced checks)
+    EVENTS_STREAM_SECONDS = 30     # a stream then ends and the browser reconnects (resuming by event id)
+    # per process; each holds one of the worker's GUNICORN_THREADS, so at most a quarter of them
+    EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', max(1, int(os.environ.get('GUNICORN_THREADS', 4)) // 4)))
+    EVENTS_MAX_BACKLOG = 500       # further behind than this, a client reloads instead
+    EVENTS_LATE_SECONDS = 10       # how long a skipped event id may still appear (late commit)
+    EVENTS_RETRY_MS = 2000
+    EVENTS_RETENTION_DAYS = 7
+    # JSON API (/api/v1): bodies at least this large are brotli/gzip-compressed
+    API_COMPRESS_MIN_BYTES = 512
+    # Bill PDFs: 'html' (admin/bill.html via xhtml2pdf) or 'native' (reportlab, app/bill_pdf.py);
+    # deployments opt in to 'native' (tests/test_bills.py checks the two render the same bill)
+    BILL_RENDERER = os.environ.get('BILL_RENDERER', 'html')
+    BILL_PDF_FONT = os.environ.get('BILL_PDF_FONT')            # optional TTF for the native renderer
+    BILL_PDF_FONT_BOLD = os.environ.get('BILL_PDF_FONT_BOLD')
+    # Rendered bill PDFs, keyed by order id + content hash
+    BILL_CACHE_FOLDER = os.environ.get('BILL_CACHE_FOLDER') or os.path.join(basedir, 'cache', 'bills')
+    # render processes per gunicorn worker, so small: the default is 2 (1 on a single CPU)
+    BILL_RENDER_WORKERS = int(os.environ.get('BILL_RENDER_WORKERS', min(2, available_cpus())))
+    # Single bills render in that pool too, so a gthread worker's other threads keep running
+    BILL_RENDER_OFFLOAD = os.environ.get('BILL_RENDER_OFFLOAD', '1') == '1'
+    BILL_RENDER_TIMEOUT = 60       # seconds a request waits for a render slot and its PDF
+    IMPORT_CHUNK_SIZE = 500        # rows per transaction in bulk order imports (app/bulk.py)
+    # Background jobs (flask run-jobs)
+    JOB_ARTIFACT_FOLDER = os.environ.get('JOB_ARTIFACT_FOLDER') or os.path.join(basedir, 'cache', 'jobs')
+    JOB_ARTIFACT_TTL_HOURS = int(os.environ.get('JOB_ARTIFACT_TTL_HOURS', 24))
+    # 'files' (worker shares the web service's disk) or 'database' (separate worker machine)
+    JOB_ARTIFACT_STORAGE = os.environ.get('JOB_ARTIFACT_STORAGE', 'files')
+    JOB_STALE_MINUTES = 15
+    JOBS_EAGER = os.environ.get('JOBS_EAGER') == '1'  # run jobs inline on submit
+    # Fragment/response cache (app/cache.py): memory (per process), disk (shared by workers) or none
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'memory')
+    RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR') or os.path.join(basedir, 'cache', 'responses')
+    RESPONSE_CACHE_SIZE = 512
+    # Request profiling: Server-Timing headers, /admin/stats and /metrics (app/profiling.py)
+    PROFILING = os.environ.get('PROFILING') == '1'
+    PROFILING_WINDOW = 500          # recent requests kept per endpoint for percentiles
+    PROFILING_N_PLUS_ONE = 10       # flag a statement repeated more than this per request
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics scrapers
@@ -0,0 +1,30 @@
+"""
+Gunicorn settings, read automatically from the working directory
+(`gunicorn 'app:create_app()'`).
+
+gthread workers serve `threads` requests per process, so a slow client
+upload or a request waiting on the bill render pool no longer pins a whole
+worker. Photo ingestion and PDF rendering run on bounded pools inside each
+worker (app/offload.py, app/bills.py), which is why threads stays modest.
+
+    WEB_CONCURRENCY    worker processes (default 2 x CPUs + 1, at most 9, where
+                       CPUs honours the container's cgroup quota)
+    GUNICORN_THREADS   threads per worker (default 4)
+    PORT               listen port (default 10000, Render's default)
+"""
+import os
+
+from config import available_cpus
+
+cpus = available_cpus()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * cpus + 1, 9)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120            # bulk exports stream; single PDFs wait at most BILL_RENDER_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+# recycle workers now and then so Pillow/xhtml2pdf heap growth is returned to the OS
+max_requests = 1000
+max_requests_jitter = 100
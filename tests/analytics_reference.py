@@ -0,0 +1,93 @@
+"""
+Per-row pure-Python reference for app.analytics: one loop over the order
+columns computing every section. tests/test_analytics.py compares the
+NumPy analysis with it, and benchmarks/bench_analytics.py uses it as the
+naive baseline.
+"""
+import math
+
+from app.analytics import (AGING_EDGES, AGING_LABELS, DURATION_EDGES, RENTED_STATUSES, _DAY, _aging_rows,
+                           _bucket_label, _round, _stock, _timestamp, _utilisation_rows, _week_start)
+
+
+def reference_analyse(cols, now):
+    """analyse(cols, now), computed row by row."""
+    result = _analyse(cols, now, _stock())
+    result['range'] = {'start': cols.start.date().isoformat(), 'end': cols.end.date().isoformat(),
+                       'orders': sum(w['orders'] for w in result['weekly'])}
+    return result
+
+
+def _analyse(cols, now, stock):
+    start_ts, end_ts, now_ts = _timestamp(cols.start), _timestamp(cols.end), _timestamp(now)
+    rented_codes = set(cols.status_codes(RENTED_STATUSES))
+    completed_codes = set(cols.status_codes(('completed',)))
+    closed_codes = set(cols.status_codes(('rejected', 'canceled')))
+    m = len(cols.products)
+    weeks = {}
+    days = []
+    unit_days, rentals, product_revenue = [0.0] * m, [0] * m, [0.0] * m
+    length_sum, length_n = [0.0] * m, [0] * m
+    hist = [0] * len(DURATION_EDGES)
+    aging_counts, aging_amounts = [0] * len(AGING_LABELS), [0.0] * len(AGING_LABELS)
+
+    for created, delivery, returned, product, status, total, pending, quantity in zip(
+            cols.created, cols.delivery, cols.returned, cols.product, cols.status,
+            cols.total, cols.pending, cols.quantity):
+        in_range = created >= start_ts
+        is_rented = status in rented_codes
+        length = (returned - delivery) / _DAY if delivery is not None and returned is not None else None
+        if in_range:
+            week = math.floor((math.floor(created / _DAY) + 3) / 7)
+            entry = weeks.setdefault(week, [0, 0.0, 0.0])
+            entry[0] += 1
+            if is_rented:
+                entry[1] += total
+            if status in completed_codes:
+                entry[2] += total
+                product_revenue[product] += total
+            if is_rented and length is not None and length > 0:
+                days.append(length)
+                hist[_bucket(length, DURATION_EDGES) - 1] += 1
+                length_sum[product] += length
+                length_n[product] += 1
+            if pending > 0.005 and status not in closed_codes:
+                due = returned if returned is not None else delivery if delivery is not None else created
+                bucket = _bucket((now_ts - due) / _DAY, AGING_EDGES)
+                aging_counts[bucket] += 1
+                aging_amounts[bucket] += pending
+        if is_rented and length is not None and length > 0:
+            overlap = max(min(returned, end_ts) - max(delivery, start_ts), 0.0) / _DAY
+            unit_days[product] += overlap * quantity
+            rentals[product] += overlap > 0
+
+    weekly = []
+    if weeks:
+        first = min(weeks)
+        for week in range(first, max(weeks) + 1):
+            count, booked, revenue = weeks.get(week, (0, 0.0, 0.0))
+            weekly.append({'week': _week_start(week).isoformat(), 'orders': count,
+                           'booked': _round(booked), 'revenue': _round(revenue)})
+    days.sort()
+    durations = {
+        'rentals': len(days),
+        'mean_days': _round(sum(days) / len(days)) if days else None,
+        'median_days': _round(_median(days)) if days else None,
+        'p90_days': _round(days[int(math.floor(0.9 * (len(days) - 1)))]) if days else None,
+        'histogram': [{'bucket': _bucket_label(i), 'rentals': c} for i, c in enumerate(hist)],
+    }
+    utilisation = _utilisation_rows(cols, stock, unit_days, rentals, product_revenue, length_sum, length_n)
+    return {'weekly': weekly, 'durations': durations, 'utilisation': utilisation,
+            'aging': _aging_rows(aging_counts, aging_amounts)}
+
+
+def _bucket(value, edges):
+    """Number of edges <= value, as np.searchsorted(edges, value, side='right')."""
+    return sum(1 for e in edges if value >= e)
+
+
+def _median(sorted_values):
+    mid = len(sorted_values) // 2
+    if len(sorted_values) % 2:
+        return sorted_values[mid]
+    return (sorted_values[mid - 1] + sorted_values[mid]) / 2
@@ -0,0 +1,38 @@
+"""
+Shared fixtures: an app bound to a fresh SQLite file under tmp_path (built
+by create_app, so the migrations run), optionally seeded with the
+benchmark data generator, and a test client logged in as a given user.
+"""
+import pytest
+
+from app import db
+from benchmarks.seed import make_app, seed, BENCH_PASSWORD
+
+
+@pytest.fixture
+def app(tmp_path):
+    app, _ = make_app(str(tmp_path / 'test.sqlite'))
+    app.config.update(UPLOAD_FOLDER=str(tmp_path), BILL_CACHE_FOLDER=str(tmp_path / 'bills'),
+                      OFFLOAD_THREADS=0, BILL_RENDER_OFFLOAD=False)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def seeded(app):
+    """The app with 300 orders over 90 days, 3 staff and 'admin'."""
+    with app.app_context():
+        seed(orders=300, staff=3, customers=60, days=90)
+    return app
+
+
+@pytest.fixture
+def login(app):
+    """login('admin') -> a test client with that user's session."""
+    def login(username):
+        client = app.test_client()
+        client.post('/', data={'username': username, 'password': BENCH_PASSWORD})
+        return client
+    return login
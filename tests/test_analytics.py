@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.analytics import analyse, load_columns, OrderColumns
+from app.models import Order
+from tests.analytics_reference import reference_analyse
+
+
+def _columns():
+    now = datetime.utcnow()
+    return load_columns(now - timedelta(days=120), now + timedelta(days=1)), now
+
+
+def test_numpy_analysis_matches_the_python_reference(seeded):
+    with seeded.app_context():
+        # an open-ended rental and an overdue one, to reach the edge buckets
+        orders = db.session.query(Order).order_by(Order.id).limit(2).all()
+        orders[0].return_datetime = None
+        orders[1].amount_pending, orders[1].return_datetime = 500.0, datetime.utcnow() - timedelta(days=100)
+        db.session.commit()
+        cols, now = _columns()
+        result = analyse(cols, now)
+        assert result == reference_analyse(cols, now)
+        assert result['range']['orders'] == db.session.query(Order).count()
+
+
+def test_empty_range(app):
+    with app.app_context():
+        now = datetime.utcnow()
+        cols = OrderColumns((), now - timedelta(days=7), now)
+        result = analyse(cols, now)
+        assert result == reference_analyse(cols, now)
+        assert result['weekly'] == [] and result['durations']['rentals'] == 0
@@ -0,0 +1,65 @@
+import io
+import zipfile
+
+import pytest
+from sqlalchemy.orm import joinedload
+
+from app import bills
+from app.models import Order
+
+
+# --- Helpers (also used by benchmarks/bench_bill_render.py) ---
+
+def pisa_bill(order):
+    return bills._render_pdf(bills.render_bill_html(order))
+
+
+def native_bill(order):
+    return bills.render_bill(bills.bill_fields(order))
+
+
+def appearance(pdf):
+    """(page sizes, fonts, normalized text) of a PDF."""
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(pdf))
+    sizes = {(round(float(p.mediabox.width)), round(float(p.mediabox.height))) for p in reader.pages}
+    fonts = {str(f.get_object()['/BaseFont']) for p in reader.pages
+             for f in (p['/Resources'].get('/Font') or {}).values()}
+    text = ' '.join(' '.join(p.extract_text() for p in reader.pages).split())
+    return sizes, fonts, text
+
+
+def _orders(limit=None):
+    return Order.query.options(joinedload(Order.customer)).order_by(Order.id).limit(limit).all()
+
+
+def test_html_is_the_default_renderer(app):
+    with app.app_context():
+        assert bills.bill_renderer() == 'html'
+        assert bills.bill_renderer('native') == 'native'
+
+
+def test_native_bills_match_html_bills(seeded):
+    """The native renderer's bills are A4, in the same fonts, with the same text in the same order."""
+    pytest.importorskip('pypdf')
+    pytest.importorskip('xhtml2pdf')
+    with seeded.app_context(), seeded.test_request_context():
+        for order in _orders(40):
+            assert appearance(native_bill(order)) == appearance(pisa_bill(order)), order.id
+
+
+def test_zip_leaves_out_bills_the_native_renderer_fails_on(seeded, monkeypatch):
+    pytest.importorskip('reportlab')
+    real_render = bills.render_bill
+
+    def render(fields, *fonts):
+        if fields['id'] == 2:
+            raise ValueError('unrenderable')
+        return real_render(fields, *fonts)
+    monkeypatch.setattr(bills, 'render_bill', render)
+
+    with seeded.app_context():
+        data = b''.join(bills.iter_bills_zip(_orders(3), renderer='native'))
+        names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+        assert names == ['bill_order_1.pdf', 'bill_order_3.pdf']
+        assert bills.get_bill_pdf(_orders()[1], renderer='native') is None
@@ -0,0 +1,51 @@
+from app import db
+from app.bulk import import_orders, set_status
+from app.models import Customer, Order, OrderEvent
+from app.search import ranked_order_ids
+
+
+def _row(name, phone, product='Lehenga', address='Old Street'):
+    return {'customer_name': name, 'phone': phone, 'address': address,
+            'product_name': product, 'price': '2000', 'quantity': '1'}
+
+
+def _events(kind):
+    return db.session.query(OrderEvent.order_id, OrderEvent.status).filter_by(kind=kind).all()
+
+
+def test_import_records_events_for_the_inserted_orders(seeded):
+    with seeded.app_context():
+        db.session.query(OrderEvent).delete()
+        db.session.commit()
+        result = import_orders([_row('Asha', '98100 00001'), _row('Ravi', '98100 00002', product='Sherwani')],
+                               staff_id=1)
+        assert result['orders'] == 2 and result['customers'] == 2
+        imported = db.session.query(Order.id, Order.status).filter(
+            Order.customer.has(Customer.phone_normalized.in_(['9810000001', '9810000002']))).all()
+        assert sorted(_events('created')) == sorted(imported)
+
+
+def test_import_updates_known_customers(seeded):
+    with seeded.app_context():
+        import_orders([_row('Asha', '98100 00001')], staff_id=1)
+        customer = Customer.query.filter_by(phone_normalized='9810000001').one()
+        first_order = customer.orders[0].id
+
+        result = import_orders([_row('Asha Verma', '+91 98100 00001', address='New Street')], staff_id=1)
+        assert result['customers'] == 0
+        db.session.refresh(customer)
+        assert (customer.name, customer.address) == ('Asha Verma', 'New Street')
+        assert Customer.query.filter_by(phone_normalized='9810000001').count() == 1
+        # the earlier order is found under the new name too
+        assert first_order in ranked_order_ids('Verma', limit=100)
+
+
+def test_set_status_records_events_only_for_changed_orders(seeded):
+    with seeded.app_context():
+        pending = [i for (i,) in db.session.query(Order.id).filter_by(status='pending').limit(2)]
+        approved = db.session.query(Order.id).filter_by(status='approved').first()[0]
+        db.session.query(OrderEvent).delete()
+        db.session.commit()
+
+        assert set_status(pending + [approved, 999999], 'approve') == 2
+        assert sorted(_events('status')) == [(i, 'approved') for i in sorted(pending)]
@@ -0,0 +1,30 @@
+"""available_cpus() reads the container's cgroup CPU quota rather than the host's CPU count."""
+import io
+
+import pytest
+
+import config
+
+
+def _fake_files(monkeypatch, files):
+    def fake_open(path, *args, **kwargs):
+        if path not in files:
+            raise FileNotFoundError(path)
+        return io.StringIO(files[path])
+    monkeypatch.setattr(config, 'open', fake_open, raising=False)
+    monkeypatch.setattr(config.os, 'sched_getaffinity', lambda pid: set(range(64)), raising=False)
+
+
+@pytest.mark.parametrize('files, expected', [
+    ({'/sys/fs/cgroup/cpu.max': '50000 100000\n'}, 1),        # cgroup v2, half a CPU
+    ({'/sys/fs/cgroup/cpu.max': '200000 100000\n'}, 2),
+    ({'/sys/fs/cgroup/cpu.max': 'max 100000\n'}, 64),         # no quota
+    ({'/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '150000\n',
+      '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000\n'}, 2),  # cgroup v1
+    ({'/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '-1\n',
+      '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000\n'}, 64),
+    ({}, 64),
+])
+def test_available_cpus_honours_cgroup_quota(monkeypatch, files, expected):
+    _fake_files(monkeypatch, files)
+    assert config.available_cpus() == expected
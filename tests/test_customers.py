@@ -0,0 +1,37 @@
+from sqlalchemy import func, select, update
+
+from app import db
+from app.api import API_VERSION
+from app.models import Customer, Order, User
+
+
+def test_merge_customers_dry_run_writes_nothing(seeded):
+    with seeded.app_context():
+        customer = db.session.query(Customer).order_by(Customer.id).first()
+        customer_id, key = customer.id, customer.phone_normalized
+        db.session.execute(update(Customer).where(Customer.id == customer_id).values(phone_normalized=None))
+        db.session.commit()
+
+    result = seeded.test_cli_runner().invoke(args=['merge-customers', '--dry-run'])
+    assert result.exit_code == 0, result.output
+    assert 'Would merge 0 duplicate customers' in result.output
+    with seeded.app_context():
+        assert db.session.get(Customer, customer_id).phone_normalized is None
+
+    result = seeded.test_cli_runner().invoke(args=['merge-customers'])
+    assert result.exit_code == 0, result.output
+    with seeded.app_context():
+        assert db.session.get(Customer, customer_id).phone_normalized == key
+
+
+def test_staff_see_only_their_own_orders_in_customer_counts(seeded, login):
+    response = login('staff0').get(f'/api/{API_VERSION}/customers?fields=id,orders&per_page=100')
+    assert response.status_code == 200
+    counts = {row['id']: row['orders'] for row in response.get_json()['data']}
+    with seeded.app_context():
+        staff_id = db.session.execute(select(User.id).where(User.username == 'staff0')).scalar()
+        own = dict(db.session.execute(select(Order.customer_id, func.count()).where(Order.staff_id == staff_id)
+                                      .group_by(Order.customer_id)).all())
+        total = dict(db.session.execute(select(Order.customer_id, func.count()).group_by(Order.customer_id)).all())
+    assert counts and counts == {cid: own[cid] for cid in counts}
+    assert any(total[cid] > own[cid] for cid in counts)  # other staff's orders are left out
@@ -0,0 +1,88 @@
+"""
+Concurrent writer and reader processes against the WAL-configured SQLite
+file, each with its own app and engine as under gunicorn: readers must
+not block the writers, and writers must wait for each other
+(busy_timeout) instead of failing with "database is locked".
+"""
+import multiprocessing
+
+from sqlalchemy import text
+
+from app import db
+from app.models import Order
+from benchmarks.seed import make_app
+
+WRITERS = 4
+READERS = 4
+ROUNDS = 15
+TIMEOUT = 120
+
+
+def _rows(tag, n):
+    return [{'customer_name': f'Customer {tag}-{i}', 'phone': f'9{tag:05d}{i:04d}',
+             'address': 'Somewhere', 'product_name': 'Sherwani', 'price': '1500', 'quantity': '1'}
+            for i in range(n)]
+
+
+def _writer(db_path, n, staff_id, start, errors):
+    from app.bulk import import_orders, set_status
+    app, _ = make_app(db_path)
+    with app.app_context():
+        try:
+            start.wait(TIMEOUT)
+            for r in range(ROUNDS):
+                result = import_orders(_rows(n * 100 + r, 5), staff_id)
+                assert not result['errors'], result['errors']
+                set_status([n * 10 + r + 1], 'approve')
+        except Exception as exc:
+            errors.put(f'writer {n}: {exc!r}')
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+
+def _reader(db_path, start, errors):
+    from app.stats import order_summary
+    app, _ = make_app(db_path)
+    with app.app_context():
+        try:
+            start.wait(TIMEOUT)
+            for _ in range(ROUNDS * 2):
+                order_summary()
+                db.session.query(Order.id, Order.status).order_by(Order.created_at.desc()).limit(50).all()
+                db.session.rollback()
+        except Exception as exc:
+            errors.put(f'reader: {exc!r}')
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+
+def test_concurrent_writers_and_readers_do_not_lock(seeded):
+    db_path = seeded.config['SQLALCHEMY_DATABASE_URI'].removeprefix('sqlite:///')
+    with seeded.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        staff_id = db.session.execute(text("SELECT id FROM users WHERE username = 'staff0'")).scalar()
+        before = db.session.query(Order).count()
+        db.session.remove()
+        db.engine.dispose()
+
+    ctx = multiprocessing.get_context('spawn')
+    errors = ctx.Queue()
+    start = ctx.Barrier(WRITERS + READERS)
+    procs = [ctx.Process(target=_writer, args=(db_path, n, staff_id, start, errors))
+             for n in range(1, WRITERS + 1)]
+    procs += [ctx.Process(target=_reader, args=(db_path, start, errors)) for _ in range(READERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(TIMEOUT)
+
+    failures = []
+    while not errors.empty():
+        failures.append(errors.get())
+    assert not [f for f in failures if 'database is locked' in f], failures
+    assert not failures, failures
+    assert [p.exitcode for p in procs] == [0] * len(procs)
+    with seeded.app_context():
+        assert db.session.query(Order).count() == before + WRITERS * ROUNDS * 5
@@ -0,0 +1,89 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app import db
+from app.events import format_cursor, latest_event_id, parse_cursor, poll_events, prune_events, record_events
+from app.migrations import upgrade
+from app.models import OrderEvent
+
+
+def _prune_all_and_record():
+    last = latest_event_id()
+    prune_events(now=datetime.utcnow() + timedelta(days=365))
+    assert db.session.query(OrderEvent).count() == 0
+    record_events(db.session.connection(), [(1, 'pending')], 'created')
+    db.session.commit()
+    return last, latest_event_id()
+
+
+def test_event_ids_do_not_restart_after_pruning(seeded):
+    with seeded.app_context():
+        record_events(db.session.connection(), [(1, 'pending'), (2, 'pending')], 'created')
+        db.session.commit()
+        last, new = _prune_all_and_record()
+        assert last and new > last
+
+
+def test_migration_adds_autoincrement_to_existing_feed(seeded):
+    with seeded.app_context():
+        with db.engine.begin() as conn:
+            # the table as created before AUTOINCREMENT
+            conn.execute(text("DROP TABLE order_events"))
+            conn.execute(text("CREATE TABLE order_events (id INTEGER NOT NULL PRIMARY KEY, "
+                              "order_id INTEGER NOT NULL, kind VARCHAR(20) NOT NULL, status VARCHAR(30), "
+                              "created_at DATETIME NOT NULL)"))
+            conn.execute(text("CREATE INDEX ix_order_events_created ON order_events (created_at)"))
+            conn.execute(text("INSERT INTO order_events (id, order_id, kind, status, created_at) "
+                              "VALUES (41, 1, 'created', 'pending', '2026-01-01 00:00:00'), "
+                              "(42, 1, 'status', 'approved', '2026-01-02 00:00:00')"))
+            conn.execute(text("DELETE FROM schema_version WHERE version >= 8"))
+
+        assert upgrade() == [8]
+        sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'order_events'")).scalar()
+        assert 'AUTOINCREMENT' in sql
+        assert db.session.query(OrderEvent.id).order_by(OrderEvent.id).all() == [(41,), (42,)]
+        assert _prune_all_and_record() == (42, 43)
+
+
+def _insert_event(event_id, order_id=1):
+    db.session.execute(insert(OrderEvent), [{'id': event_id, 'order_id': order_id, 'kind': 'status',
+                                            'status': 'approved', 'created_at': datetime.utcnow()}])
+    db.session.commit()
+
+
+def test_late_committed_event_is_delivered(seeded):
+    with seeded.app_context(), seeded.test_request_context():
+        last = latest_event_id()
+        _insert_event(last + 1)
+        _insert_event(last + 3)  # last + 2 is taken by a transaction that has not committed yet
+        gaps = {}
+        messages, new = poll_events(last, 50, gaps)
+        assert new == last + 3 and list(gaps) == [last + 2]
+        assert messages[-1].startswith(f'id: {last + 3}.{last + 2}\nevent: counters')
+
+        _insert_event(last + 2)
+        messages, new = poll_events(new, 50, gaps)
+        assert new == last + 3 and gaps == {}
+        assert len(messages) == 2 and '"kind":"status"' in messages[0]
+        assert messages[-1].startswith(f'id: {last + 3}\n')
+
+
+def test_gaps_expire(seeded):
+    with seeded.app_context(), seeded.test_request_context():
+        last = latest_event_id()
+        _insert_event(last + 2)
+        gaps = {}
+        poll_events(last, 50, gaps)
+        assert list(gaps) == [last + 1]
+        gaps[last + 1] = time.monotonic() - 1  # rolled back: never turns up
+        assert poll_events(last + 2, 50, gaps) == ([], last + 2)
+        assert gaps == {}
+
+
+def test_cursor_round_trip():
+    assert format_cursor(12) == '12'
+    assert parse_cursor(format_cursor(12, {9, 7})) == (12, [7, 9])
+    assert parse_cursor('12.15') == (12, [])  # only ids below the cursor are gaps
+    assert parse_cursor('x') is None and parse_cursor(None) is None
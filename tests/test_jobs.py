@@ -0,0 +1,38 @@
+"""
+Background jobs run by worker processes started with the spawn method,
+each building its own app from a config import path, with the results
+kept in the database as on a separate Render worker service.
+"""
+import os
+from datetime import datetime
+
+from app import db, jobs
+from app.models import Job, JobArtifactChunk
+
+
+def test_spawned_workers_store_artifacts_in_database(seeded, login, tmp_path, monkeypatch):
+    # what the children's config.Config picks up (the same database, another "disk")
+    monkeypatch.setenv('DATABASE_URL', seeded.config['SQLALCHEMY_DATABASE_URI'])
+    monkeypatch.setenv('JOB_ARTIFACT_STORAGE', 'database')
+    monkeypatch.setenv('JOB_ARTIFACT_FOLDER', str(tmp_path / 'worker_jobs'))
+    seeded.config['JOB_ARTIFACT_STORAGE'] = 'database'
+    with seeded.app_context():
+        ids = [jobs.submit('report_csv', {'type': 'range', 'start': '2000-01-01', 'end': '2100-01-01'}).id
+               for _ in range(3)]
+        db.session.remove()
+        db.engine.dispose()
+        jobs.run_workers(seeded, workers=2, poll=0.1, once=True, config='config.Config', start_method='spawn')
+        done = Job.query.filter(Job.id.in_(ids)).all()
+        assert [job.status for job in done] == ['done'] * 3
+        assert all(job.artifact_path is None for job in done)
+        assert not any(job.worker.endswith(f':{os.getpid()}') for job in done)
+        assert db.session.query(JobArtifactChunk).filter(JobArtifactChunk.job_id.in_(ids)).count() >= 3
+
+    response = login('admin').get(f'/admin/jobs/{ids[0]}/download')
+    assert response.status_code == 200
+    lines = response.get_data().decode().splitlines()
+    assert len(lines) == 301  # header + every seeded order
+
+    with seeded.app_context():
+        assert jobs.cleanup_expired(now=datetime(2200, 1, 1)) == 3
+        assert db.session.query(JobArtifactChunk).count() == 0
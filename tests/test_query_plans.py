@@ -0,0 +1,40 @@
+"""
+Every hot query (app.query_plans.hot_queries) must be planned through its
+index, both on a database created from the models and on one whose
+indexes were built by the migrations.
+"""
+from sqlalchemy import text
+
+from app import db
+from app.migrations import upgrade
+from app.query_plans import check_query_plans
+
+
+def _assert_plans_use_indexes():
+    results = check_query_plans()
+    assert results
+    failures = [f"{name}: expected {index}, plan {plan}" for name, index, ok, plan in results if not ok]
+    assert not failures, '\n'.join(failures)
+
+
+def test_hot_queries_use_indexes(seeded):
+    with seeded.app_context():
+        db.session.execute(text('ANALYZE'))
+        _assert_plans_use_indexes()
+
+
+def test_hot_queries_use_indexes_after_migrations(seeded):
+    """Drop the migration-managed indexes and schema version, then upgrade from scratch."""
+    with seeded.app_context():
+        with db.engine.begin() as conn:
+            # sqlite_master rather than the inspector, which skips expression indexes
+            names = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' "
+                                      "AND tbl_name IN ('orders', 'customers') AND name LIKE 'ix_%'")).scalars().all()
+            for name in names:
+                conn.execute(text(f'DROP INDEX {name}'))
+            conn.execute(text('DELETE FROM schema_version'))
+        assert 'ix_customers_name_lower' in names
+
+        applied = upgrade()
+        assert applied[0] == 1
+        _assert_plans_use_indexes()
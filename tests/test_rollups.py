@@ -0,0 +1,26 @@
+from sqlalchemy import select
+
+from app import db
+from app.models import Order, OrderRollup
+from app.rollups import SUMS, rebuild_rollups
+
+
+def _rollups():
+    table = OrderRollup.__table__
+    rows = db.session.execute(select(table.c.day, table.c.staff_id, table.c.status, *[table.c[n] for n in SUMS]))
+    return {tuple(r[:3]): tuple(round(v or 0, 2) for v in r[3:]) for r in rows if r[3]}
+
+
+def test_expired_order_changes_land_in_the_right_rollup(seeded):
+    with seeded.app_context():
+        orders = Order.query.filter(Order.status == 'approved').order_by(Order.id).limit(2).all()
+        edited, deleted = orders
+        db.session.expire_all()
+        edited.status = 'completed'  # old status, day and staff were expired
+        edited.amount_advance = 100.0
+        db.session.delete(deleted)
+        db.session.commit()
+
+        incremental = _rollups()
+        rebuild_rollups()
+        assert incremental == _rollups()
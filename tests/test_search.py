@@ -0,0 +1,36 @@
+import re
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Order
+from app.search import ranked_order_ids
+
+
+def _day(days_ago):
+    return (datetime.utcnow() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+def test_ranked_search_filters_dates_before_limit(seeded):
+    with seeded.app_context():
+        word = db.session.get(Order, 1).product_name.split()[0]
+        date_from, date_to = _day(30), _day(20)
+        everything = ranked_order_ids(word, limit=1000)
+        in_range = {i for i in everything
+                    if date_from <= db.session.get(Order, i).created_at.strftime('%Y-%m-%d') <= date_to}
+        assert in_range and len(in_range) < len(everything)
+
+        ranked = ranked_order_ids(word, limit=1000, date_from=date_from, date_to=date_to)
+        assert set(ranked) == in_range
+        # a page smaller than the out-of-range matches still fills from the range
+        assert ranked_order_ids(word, limit=3, date_from=date_from, date_to=date_to) == ranked[:3]
+
+
+def test_relevance_listing_keeps_in_range_matches(seeded, login):
+    with seeded.app_context():
+        order = db.session.get(Order, 1)
+        word, day = order.product_name.split()[0], order.created_at.strftime('%Y-%m-%d')
+        expected = set(ranked_order_ids(word, limit=1000, date_from=day, date_to=day))
+    page = login('admin').get('/admin/orders', query_string={'q': word, 'sort': 'relevance', 'per_page': 1,
+                                                             'date_from': day, 'date_to': day})
+    shown = {int(i) for i in re.findall(rb'<tr data-order-id="(\d+)"', page.data)}
+    assert len(shown) == 1 and shown <= expected
@@ -0,0 +1,144 @@
+"""
+Photo parts are sniffed and size-checked as they stream in; other file
+parts in the same app (the order import's CSV) are left alone. Large
+synthetic uploads check that an accepted photo is stored under its
+streamed hash, that a request over UPLOAD_MAX_REQUEST_BYTES is cut off
+while it is still being received, and that parsing a big upload uses
+about the parser's buffer in memory.
+"""
+import hashlib
+import io
+import os
+import tracemalloc
+
+import pytest
+from flask import request
+from werkzeug.test import EnvironBuilder
+
+from app import db
+from app.images import HASH_LENGTH
+from app.models import Order, RESERVING_STATUSES
+
+MB = 1024 * 1024
+
+
+def _synthetic(mb):
+    """`mb` MB of random bytes that sniff as a JPEG."""
+    head = b'\xff\xd8\xff\xe0'
+    return head + os.urandom(mb * MB - len(head))
+
+
+def _jpeg():
+    """A real, several-MB JPEG."""
+    Image = pytest.importorskip('PIL.Image')
+    buf = io.BytesIO()
+    Image.effect_noise((3000, 2000), 60).convert('RGB').save(buf, 'JPEG', quality=92)
+    return buf.getvalue()
+
+
+def _temp_files(folder):
+    return [n for n in os.listdir(folder) if n.endswith('.tmp')]
+
+
+class _CountingStream(io.BytesIO):
+    """Request body that records how much of it the server read."""
+
+    def __init__(self, body):
+        super().__init__(body)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.consumed += len(data)
+        return data
+
+    def readinto(self, b):
+        n = super().readinto(b)
+        self.consumed += n
+        return n
+
+
+def _edit_form(order):
+    return {'customer_name': order.customer.name, 'phone': order.customer.phone, 'address': 'Somewhere',
+            'product_name': order.product_name, 'price': str(order.price), 'quantity': str(order.quantity),
+            'amount_advance': '0'}
+
+
+def test_bad_photos_are_rejected_and_csv_import_still_works(seeded, login, tmp_path):
+    seeded.config['UPLOAD_MAX_FILE_BYTES'] = 64 * 1024
+    client = login('admin')
+    with seeded.app_context():
+        order = Order.query.filter(Order.status.notin_(RESERVING_STATUSES)).first()
+        order_id, form, photos = order.id, _edit_form(order), len(order.photos)
+
+    before = set(os.listdir(tmp_path))
+    form['photos'] = [(io.BytesIO(b'MZ' + b'\0' * 4096), 'fake.jpg'),
+                      (io.BytesIO(b'\xff\xd8\xff\xe0' + b'\0' * (128 * 1024)), 'huge.jpg')]
+    response = client.post(f'/admin/order/{order_id}/edit', data=form, content_type='multipart/form-data',
+                           follow_redirects=True)
+    assert b'fake.jpg was not saved: not a JPEG, PNG, GIF or WebP image' in response.data
+    assert b'huge.jpg was not saved: larger than' in response.data
+    assert set(os.listdir(tmp_path)) == before  # nothing stored, no temp files left behind
+    with seeded.app_context():
+        assert len(db.session.get(Order, order_id).photos) == photos
+
+    csv = (b'customer_name,phone,address,product_name,price,quantity\n'
+           b'Meera,9876500001,Lane 1,Sherwani,1800,1\n'
+           b'Kabir,9876500002,Lane 2,Lehenga,2500,2\n')
+    response = client.post('/admin/orders/import', data={'file': (io.BytesIO(csv), 'orders.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b'Imported 2 order(s)' in response.data
+
+
+def _editable_order(app):
+    with app.app_context():
+        order = Order.query.filter(Order.status.notin_(RESERVING_STATUSES)).first()
+        return order.id, _edit_form(order)
+
+
+def test_large_photo_is_stored_under_its_streamed_hash(seeded, login, tmp_path):
+    photo = _jpeg()
+    assert len(photo) > 2 * MB
+    order_id, form = _editable_order(seeded)
+    form['photos'] = [(io.BytesIO(photo), 'big.jpg')]
+    response = login('admin').post(f'/admin/order/{order_id}/edit', data=form,
+                                   content_type='multipart/form-data')
+    assert response.status_code == 302
+    with seeded.app_context():
+        stored = db.session.get(Order, order_id).photos[-1].filename
+    assert stored.split('.')[0] == hashlib.sha256(photo).hexdigest()[:HASH_LENGTH]
+    assert os.path.isfile(tmp_path / stored)
+    assert not _temp_files(tmp_path)
+
+
+def test_request_over_quota_is_cut_off_while_receiving(seeded, login, tmp_path):
+    seeded.config['UPLOAD_MAX_REQUEST_BYTES'] = 5 * MB
+    order_id, form = _editable_order(seeded)
+    form['photos'] = [(io.BytesIO(_synthetic(3)), f'p{i}.jpg') for i in range(4)]
+    env = EnvironBuilder(method='POST', data=form).get_environ()
+    body = env['wsgi.input'].read()
+    stream = _CountingStream(body)
+
+    response = login('admin').open(EnvironBuilder(
+        path=f'/admin/order/{order_id}/edit', method='POST', input_stream=stream,
+        content_type=env['CONTENT_TYPE'], content_length=len(body)))
+    assert response.status_code == 413
+    assert stream.consumed < 7 * MB < len(body)  # stopped just past the quota, not at the end
+    assert not _temp_files(tmp_path)
+
+
+def test_streamed_upload_memory_stays_near_the_parser_buffer(app):
+    size = 32 * MB
+    app.config.update(UPLOAD_MAX_FILE_BYTES=64 * MB, UPLOAD_MAX_REQUEST_BYTES=64 * MB, MAX_CONTENT_LENGTH=None)
+    env = EnvironBuilder(path='/upload', method='POST',
+                         data={'photos': (io.BytesIO(_synthetic(32)), 'big.jpg')}).get_environ()
+    with app.request_context(env):
+        tracemalloc.start()
+        try:
+            upload = request.files['photos']
+            assert upload.stream.finish() and upload.stream.size == size
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert peak < MB // 2, f'peak {peak / 1024:.0f} KB for a {size // MB} MB upload'